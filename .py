@@ -1,5 +1,9 @@
-from app import app, db
+from app import create_app
+from app.migracoes import atualizar_banco
+
+app = create_app()
 
 with app.app_context():
-    db.create_all()
+    # o mesmo que `flask --app run atualizar-banco`: tabelas, colunas e índices que faltam
+    atualizar_banco()
     print("Banco de dados criado com sucesso!")
@@ -2,25 +2,66 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-import os
 
-app = Flask(__name__)
-# secret key should come from environment in production
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'mude_esta_chave_em_producao')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+from config import Config
+from app.dinheiro import ProvedorJSON
 
-db = SQLAlchemy(app)
+db = SQLAlchemy()
 
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'          # rota de login
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'     # rota de login
 login_manager.login_message_category = 'info'
 
-from app.models import Usuario
 
 @login_manager.user_loader
 def load_user(user_id):
+    from app.models import Usuario
     return Usuario.query.get(int(user_id))
 
-# importa routes no final para evitar circular imports
-from app import routes
+
+def create_app(config=Config):
+    # config: classe com os valores de Config (config.py) a sobrescrever, ex.: TesteConfig
+    app = Flask(__name__)
+    app.json = ProvedorJSON(app)   # Decimal (dinheiro) sai como número no JSON
+    app.config.from_object(Config)
+    if config is not Config:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+
+    # imports aqui evitam circular imports; resumo, versoes, busca e calendario registram
+    # listeners de sessão ao serem importados
+    from app import (resumo, versoes, busca, banco, carregamento, referencias, relatorios, migracoes,
+                     inicializacao, transferencia, estoque, idempotencia, agenda, calendario,
+                     lembretes, metricas)
+    from app.auth import auth
+    from app.rotas import BLUEPRINTS
+
+    # perfil do SQLite, caches e hooks por aplicação
+    banco.init_app(app)
+    carregamento.init_app(app)
+    referencias.init_app(app)
+    relatorios.init_app(app)
+    idempotencia.init_app(app)
+    agenda.init_app(app)
+    lembretes.init_app(app)
+
+    app.register_blueprint(auth)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+
+    # `flask reconstruir-resumo`, `atualizar-banco`, `verificar-indices`, `verificar-importacao`,
+    # `otimizar-banco`, `benchmark-escrita`, `copiar-banco`, `estresse-estoque`, `enviar-lembretes`
+    # e `verificar-consultas`
+    app.cli.add_command(resumo.reconstruir_resumo_command)
+    app.cli.add_command(migracoes.atualizar_banco_command)
+    app.cli.add_command(migracoes.verificar_indices_command)
+    app.cli.add_command(inicializacao.verificar_importacao_command)
+    app.cli.add_command(banco.otimizar_banco_command)
+    app.cli.add_command(banco.benchmark_escrita_command)
+    app.cli.add_command(transferencia.copiar_banco_command)
+    app.cli.add_command(estoque.estresse_estoque_command)
+    app.cli.add_command(lembretes.enviar_lembretes_command)
+    app.cli.add_command(metricas.verificar_consultas_command)
+    return app
@@ -0,0 +1,197 @@
+# app/agenda.py
+# Disponibilidade dos profissionais. O texto livre de Profissional.disponibilidade
+# ("seg-sex 09:00-18:00; sáb 8h-12h") vira expediente por dia da semana; cada
+# serviço tem duração (Servico.duracao_minutos). Os horários ocupados de um
+# profissional num dia ficam unidos e ordenados (Ocupacao), então conferir um
+# conflito ou achar o próximo horário livre é uma busca binária. As ocupações de
+# um período ficam em cache pela versão dos agendamentos e serviços
+# (versao_dados): a semana de todos os profissionais sai de uma consulta.
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Agendamento, Profissional, Servico, STATUS_CANCELADO
+from app.referencias import CacheReferencia
+from app.versoes import versoes
+
+DURACAO_PADRAO = 30     # minutos, para agendamento sem serviço
+DIAS_SEMANA = ('seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom')   # índice = date.weekday()
+
+_DIA = r'\b(?P<{}>dom|seg|ter|qua|qui|sex|sab)[a-z]*'
+_HORA = r'\b(?P<h{0}>\d{{1,2}})(?:[:h](?P<m{0}>\d{{2}}))?h?'
+_TOKENS = re.compile(
+    _DIA.format('de') + r'\s*(?:-|a|ate)\s*' + _DIA.format('ate')
+    + '|' + _DIA.format('dia')
+    + '|' + _HORA.format(1) + r'\s*(?:-|a|as|ate)\s*' + _HORA.format(2)
+)
+
+
+def minutos(hora):
+    # '09:30' -> 570; None se não for um horário
+    achado = re.fullmatch(r'\s*(\d{1,2})(?:[:h](\d{2}))?\s*', hora or '')
+    if not achado:
+        return None
+    h, m = int(achado.group(1)), int(achado.group(2) or 0)
+    return h * 60 + m if h < 24 and m < 60 else None
+
+
+def formatar_hora(total):
+    return f'{total // 60:02d}:{total % 60:02d}'
+
+
+def _unir(intervalos):
+    unidos = []
+    for inicio, fim in sorted(intervalos):
+        if unidos and inicio <= unidos[-1][1]:
+            unidos[-1][1] = max(unidos[-1][1], fim)
+        else:
+            unidos.append([inicio, fim])
+    return [tuple(i) for i in unidos]
+
+
+def ler_expediente(texto):
+    # {dia da semana: [(início, fim) em minutos]}; vazio se nada foi reconhecido.
+    # Horários valem para os dias citados antes deles; sem dia, para seg-sáb.
+    normal = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower()
+    normal = re.sub(r'-?feira', '', normal)
+    expediente = defaultdict(list)
+    dias, ultimo_foi_horario = [], False
+    for token in _TOKENS.finditer(normal):
+        if token.group('h1'):
+            inicio = minutos(f'{token.group("h1")}:{token.group("m1") or "00"}')
+            fim = minutos(f'{token.group("h2")}:{token.group("m2") or "00"}')
+            if inicio is not None and fim is not None and inicio < fim:
+                for dia in dias or range(6):
+                    expediente[dia].append((inicio, fim))
+            ultimo_foi_horario = True
+            continue
+        if ultimo_foi_horario:
+            dias, ultimo_foi_horario = [], False
+        if token.group('de'):
+            de, ate = DIAS_SEMANA.index(token.group('de')), DIAS_SEMANA.index(token.group('ate'))
+            dias += [(de + i) % 7 for i in range((ate - de) % 7 + 1)]
+        else:
+            dias.append(DIAS_SEMANA.index(token.group('dia')))
+    return {dia: _unir(intervalos) for dia, intervalos in expediente.items()}
+
+
+def expediente_de(profissional):
+    return ler_expediente(profissional.disponibilidade) or \
+        ler_expediente(current_app.config['AGENDA_EXPEDIENTE_PADRAO'])
+
+
+class Ocupacao:
+    # horários ocupados de um profissional num dia, unidos e ordenados
+    __slots__ = ('inicios', 'fins')
+
+    def __init__(self, intervalos=()):
+        unidos = _unir(intervalos)
+        self.inicios = [inicio for inicio, _ in unidos]
+        self.fins = [fim for _, fim in unidos]
+
+    def bloqueio(self, inicio, fim):
+        # fim do horário ocupado que cruza [inicio, fim), ou None se está livre
+        i = bisect_right(self.inicios, inicio)
+        if i and self.fins[i - 1] > inicio:
+            return self.fins[i - 1]
+        if i < len(self.inicios) and self.inicios[i] < fim:
+            return self.fins[i]
+        return None
+
+    def livres(self, expediente, duracao, passo, a_partir=0):
+        # inícios de horário livre, de `passo` em `passo` minutos dentro do expediente
+        horarios = []
+        for inicio, fim in expediente:
+            t = inicio + max(0, -(-(a_partir - inicio) // passo)) * passo
+            while t + duracao <= fim:
+                ocupado_ate = self.bloqueio(t, t + duracao)
+                if ocupado_ate is None:
+                    horarios.append(t)
+                    t += passo
+                else:
+                    t = inicio + -(-(ocupado_ate - inicio) // passo) * passo
+        return horarios
+
+
+def _intervalos(condicoes):
+    # {(profissional_id, dia): [(início, fim)]} dos agendamentos não cancelados
+    duracao = func.coalesce(Servico.duracao_minutos, DURACAO_PADRAO)
+    consulta = select(Agendamento.profissional_id, Agendamento.data, Agendamento.hora, duracao)\
+        .outerjoin(Servico, Servico.id == Agendamento.servico_id)\
+        .where(Agendamento.status != STATUS_CANCELADO, *condicoes)
+    intervalos = defaultdict(list)
+    for profissional_id, dia, hora, minutos_servico in db.session.execute(consulta):
+        inicio = minutos(hora)
+        if inicio is not None:
+            intervalos[(profissional_id, dia)].append((inicio, inicio + minutos_servico))
+    return intervalos
+
+
+def ocupacoes(profissional_ids, inicio, fim):
+    # {(profissional_id, dia): Ocupacao} de inicio a fim (inclusive)
+    atuais = versoes(Agendamento.__tablename__, Servico.__tablename__)
+    chave = (atuais[Agendamento.__tablename__], atuais[Servico.__tablename__],
+             tuple(sorted(profissional_ids)), inicio, fim)
+
+    def carregar():
+        intervalos = _intervalos([Agendamento.profissional_id.in_(profissional_ids),
+                                  Agendamento.data >= inicio, Agendamento.data <= fim])
+        return {dia: Ocupacao(lista) for dia, lista in intervalos.items()}
+    return _cache().obter(chave, carregar)
+
+
+def disponibilidade(profissionais, inicio, dias, duracao, passo):
+    # {profissional: {dia: [minutos de início livres]}}; hoje, só a partir de agora
+    fim = inicio + timedelta(days=dias - 1)
+    ocupado = ocupacoes([p.id for p in profissionais], inicio, fim)
+    agora = datetime.now()
+    vazia = Ocupacao()
+    resultado = {}
+    for profissional in profissionais:
+        expediente = expediente_de(profissional)
+        por_dia = {}
+        for i in range(dias):
+            dia = inicio + timedelta(days=i)
+            a_partir = agora.hour * 60 + agora.minute if dia == agora.date() else 0
+            if dia < agora.date():
+                por_dia[dia] = []
+                continue
+            por_dia[dia] = ocupado.get((profissional.id, dia), vazia).livres(
+                expediente.get(dia.weekday(), []), duracao, passo, a_partir)
+        resultado[profissional] = por_dia
+    return resultado
+
+
+def conflito(agendamento):
+    # True se o horário do agendamento (já na sessão) cruza outro do mesmo
+    # profissional no dia. Grava o agendamento e trava a linha do profissional
+    # (FOR UPDATE no PostgreSQL; no SQLite a escrita já trava o banco) até o
+    # commit, para dois agendamentos simultâneos não passarem juntos.
+    inicio = minutos(agendamento.hora)
+    if (not agendamento.profissional_id or agendamento.data is None or inicio is None
+            or agendamento.status == STATUS_CANCELADO):
+        return False
+    db.session.flush()
+    db.session.execute(select(Profissional.id).where(Profissional.id == agendamento.profissional_id)
+                       .with_for_update())
+    servico = db.session.get(Servico, agendamento.servico_id) if agendamento.servico_id else None
+    duracao = servico.duracao_minutos if servico and servico.duracao_minutos else DURACAO_PADRAO
+    condicoes = [Agendamento.profissional_id == agendamento.profissional_id, Agendamento.data == agendamento.data,
+                 Agendamento.id != agendamento.id]
+    intervalos = _intervalos(condicoes).get((int(agendamento.profissional_id), agendamento.data), [])
+    return Ocupacao(intervalos).bloqueio(inicio, inicio + duracao) is not None
+
+
+def _cache():
+    return current_app.extensions['agenda']
+
+
+def init_app(app):
+    # as chaves já trazem as versões; a validade só limita o tempo em memória
+    app.extensions['agenda'] = CacheReferencia(max_entradas=128, ttl=600)
@@ -1,59 +1,164 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_user, logout_user, login_required, current_user
-from .models import Usuario
-from . import db, login_manager
-from werkzeug.security import check_password_hash
+# app/auth.py
+# Login, cadastro e administração de usuários.
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask_login import login_required, current_user, login_user, logout_user
+from datetime import datetime
+
+from app import db
+from app.models import Usuario
+from app.decorators import admin_required
 
 auth = Blueprint('auth', __name__)
 
-@auth.route('/login', methods=['GET','POST'])
+
+# ---------------- LOGIN / LOGOUT ---------------- #
+@auth.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('principal.dashboard'))
+
     if request.method == 'POST':
-        username = request.form.get('username','').strip()
-        senha = request.form.get('senha','').strip()
-        if not username or not senha:
-            flash('Preencha usuário e senha.', 'warning')
-            return render_template('auth/login.html')
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '')
         user = Usuario.query.filter_by(username=username).first()
-        if user and user.checar_senha(senha):
-            login_user(user)
-            user.last_login = __import__('datetime').datetime.utcnow()
-            db.session.commit()
-            flash('Bem-vindo ' + user.username, 'success')
-            return redirect(url_for('index'))
-        flash('Credenciais inválidas.', 'danger')
-    return render_template('auth/login.html')
+        if user and user.checar_senha(password):
+            try:
+                user.last_login = datetime.utcnow()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+            login_user(user, remember=False)
+            flash('Login realizado com sucesso!', 'success')
+            return redirect(url_for('principal.dashboard'))
+        flash('Usuário ou senha inválidos', 'danger')
+    return render_template('login.html')
+
 
 @auth.route('/logout')
 @login_required
 def logout():
     logout_user()
-    flash('Desconectado.', 'info')
+    session.clear()  # garante limpeza completa da sessão
+    flash("Logout realizado com sucesso!", "success")
     return redirect(url_for('auth.login'))
 
-@auth.route('/register', methods=['GET','POST'])
+
+# ---------------- CADASTRO ---------------- #
+@auth.route('/cadastro', methods=['GET', 'POST'])
+def cadastro():
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '').strip()
+        if not username or not password:
+            flash('Preencha todos os campos.', 'warning')
+            return render_template('cadastro.html')
+        if Usuario.query.filter_by(username=username).first():
+            flash('Usuário já existe.', 'danger')
+            return render_template('cadastro.html')
+        
+        # Se for o primeiro usuário, torna admin
+        role = 'admin' if Usuario.query.first() is None else 'comum'
+        
+        usuario = Usuario(username=username, role=role)
+        usuario.set_senha(password)
+        try:
+            db.session.add(usuario)
+            db.session.commit()
+            flash(f'Usuário cadastrado com sucesso! {"Você é o administrador do sistema." if role=="admin" else ""}', 'success')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao cadastrar usuário: {e}', 'danger')
+    return render_template('cadastro.html')
+
+
+# ---------------- ADMINISTRAR USUÁRIOS ---------------- #
+@auth.route('/usuarios')
+@login_required
+@admin_required
+def listar_usuarios():
+    usuarios = Usuario.query.order_by(Usuario.username).all()
+    return render_template('usuarios/listar.html', usuarios=usuarios, user=current_user)
+
+@auth.route('/usuarios/novo', methods=['GET','POST'])
 @login_required
-def register():
-    # only admin can create users
-    if not current_user.is_authenticated or current_user.role != 'admin':
-        flash('Acesso negado.', 'danger')
-        return redirect(url_for('index'))
+@admin_required
+def novo_usuario():
     if request.method == 'POST':
         username = request.form.get('username','').strip()
         senha = request.form.get('senha','').strip()
         role = request.form.get('role','comum')
         if not username or not senha:
-            flash('Preencha usuário e senha.', 'warning')
-            return render_template('auth/register.html')
+            flash("Preencha usuário e senha.", "warning")
+            return render_template('usuarios/form.html', usuario=None)
         if Usuario.query.filter_by(username=username).first():
-            flash('Usuário já existe.', 'danger')
-            return render_template('auth/register.html')
+            flash("Usuário já existe.", "danger")
+            return render_template('usuarios/form.html', usuario=None)
         u = Usuario(username=username, role=role)
         u.set_senha(senha)
-        db.session.add(u)
+        try:
+            db.session.add(u)
+            db.session.commit()
+            flash("Usuário criado!", "success")
+            return redirect(url_for('auth.listar_usuarios'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao criar usuário: {e}", "danger")
+    return render_template('usuarios/form.html', usuario=None)
+
+@auth.route('/usuarios/editar/<int:id>', methods=['GET','POST'])
+@login_required
+def editar_usuario(id):
+    usuario = Usuario.query.get_or_404(id)
+
+    # Usuário comum só pode editar o próprio perfil
+    if current_user.role != 'admin' and current_user.id != usuario.id:
+        flash("Acesso negado!", "danger")
+        return redirect(url_for('principal.dashboard'))
+
+    if request.method == 'POST':
+        username = request.form.get('username','').strip()
+        senha = request.form.get('senha','').strip()
+        role = request.form.get('role','comum')
+
+        if current_user.role == 'admin':
+            if username:
+                usuario.username = username
+            usuario.role = role
+        if senha:
+            usuario.set_senha(senha)
+        try:
+            db.session.commit()
+            flash("Usuário atualizado!", "success")
+            if current_user.role == 'admin':
+                return redirect(url_for('auth.listar_usuarios'))
+            else:
+                return redirect(url_for('auth.meu_perfil'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar usuário: {e}", "danger")
+    return render_template('usuarios/form.html', usuario=usuario)
+
+@auth.route('/usuarios/excluir/<int:id>')
+@login_required
+@admin_required
+def excluir_usuario(id):
+    usuario = Usuario.query.get_or_404(id)
+    if usuario.id == current_user.id:
+        flash("Você não pode excluir o usuário logado.", "warning")
+        return redirect(url_for('auth.listar_usuarios'))
+    try:
+        db.session.delete(usuario)
         db.session.commit()
-        flash('Usuário criado!', 'success')
-        return redirect(url_for('listar_usuarios'))
-    return render_template('auth/register.html')
\ No newline at end of file
+        flash("Usuário excluído!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir usuário: {e}", "danger")
+    return redirect(url_for('auth.listar_usuarios'))
+
+
+# --- Página de perfil do usuário ---
+@auth.route('/meu-perfil')
+@login_required
+def meu_perfil():
+    return render_template('usuarios/perfil.html', usuario=current_user)
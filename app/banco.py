@@ -0,0 +1,149 @@
+# app/banco.py
+# Perfil de desempenho do SQLite, aplicado a cada conexão nova (SQLITE_PRAGMAS em
+# config.py): WAL deixa leituras e a escrita do caixa correrem juntas e, com
+# synchronous=NORMAL, o commit não espera fsync a cada transação; busy_timeout
+# faz uma escrita concorrente esperar a vez em vez de falhar com "database is locked".
+# A cada SQLITE_OTIMIZAR_INTERVALO segundos, uma conexão devolvida ao pool roda
+# PRAGMA optimize (atualiza as estatísticas do planejador só onde precisa).
+# `flask otimizar-banco` roda o ANALYZE completo e `flask benchmark-escrita` compara
+# a vazão de commits concorrentes com e sem o perfil.
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Usuario, MovimentoCaixa
+
+logger = logging.getLogger(__name__)
+
+
+def aplicar_pragmas(conexao_dbapi, pragmas):
+    cursor = conexao_dbapi.cursor()
+    try:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
+    finally:
+        cursor.close()
+
+
+class _Otimizacao:
+    # listener de checkin: no máximo uma vez por intervalo, em qualquer worker thread
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.proxima = time.monotonic() + intervalo
+        self._lock = threading.Lock()
+
+    def __call__(self, conexao_dbapi, registro):
+        if conexao_dbapi is None:   # conexão invalidada
+            return
+        agora = time.monotonic()
+        with self._lock:
+            if agora < self.proxima:
+                return
+            self.proxima = agora + self.intervalo
+        cursor = conexao_dbapi.cursor()
+        try:
+            cursor.execute('PRAGMA optimize')
+        except Exception as e:
+            logger.warning(f'PRAGMA optimize falhou: {e}')
+        finally:
+            cursor.close()
+
+
+def configurar_engine(engine, pragmas, intervalo_otimizacao=0):
+    if engine.dialect.name != 'sqlite':
+        return
+    if pragmas:
+        event.listen(engine, 'connect', lambda conexao, registro: aplicar_pragmas(conexao, pragmas))
+    if intervalo_otimizacao:
+        event.listen(engine, 'checkin', _Otimizacao(intervalo_otimizacao))
+
+
+def init_app(app):
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        configurar_engine(engine, app.config['SQLITE_PRAGMAS'], app.config['SQLITE_OTIMIZAR_INTERVALO'])
+
+
+# ---------------- Manutenção ---------------- #
+@click.command('otimizar-banco')
+@with_appcontext
+def otimizar_banco_command():
+    """Atualiza as estatísticas do SQLite (ANALYZE + PRAGMA optimize)."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo('Só se aplica ao SQLite.')
+        return
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('ANALYZE')
+        conn.exec_driver_sql('PRAGMA optimize')
+        conn.commit()
+    click.echo('Estatísticas atualizadas.')
+
+
+# ---------------- Benchmark ---------------- #
+def medir_escrita(pragmas, threads, commits):
+    # (commits por segundo, erros) de `threads` caixas lançando `commits` movimentos
+    # cada, um commit por lançamento, como em novo_movimento. O banco temporário fica
+    # na pasta instance, no mesmo disco do banco real (o custo do fsync depende dele).
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    pasta = tempfile.mkdtemp(prefix='benchmark-', dir=current_app.instance_path)
+    try:
+        engine = create_engine(f'sqlite:///{os.path.join(pasta, "bench.db")}', pool_size=threads)
+        configurar_engine(engine, pragmas)
+        db.metadata.create_all(engine)
+        with Session(engine) as session:
+            usuarios = [Usuario(username=f'caixa{i}', role='comum') for i in range(threads)]
+            for usuario in usuarios:
+                usuario.set_senha('benchmark')
+            session.add_all(usuarios)
+            session.commit()
+            ids = [u.id for u in usuarios]
+
+        erros = []
+
+        def caixa(usuario_id):
+            with Session(engine) as session:
+                for i in range(commits):
+                    session.add(MovimentoCaixa(tipo='entrada', forma_pagamento='pix', valor=10.0,
+                                               descricao=f'benchmark {i}', data=datetime.now(),
+                                               usuario_id=usuario_id))
+                    try:
+                        session.commit()
+                    except OperationalError:
+                        session.rollback()
+                        erros.append(usuario_id)
+
+        trabalhadores = [threading.Thread(target=caixa, args=(u,)) for u in ids]
+        inicio = time.perf_counter()
+        for t in trabalhadores:
+            t.start()
+        for t in trabalhadores:
+            t.join()
+        duracao = time.perf_counter() - inicio
+        engine.dispose()
+        return (threads * commits - len(erros)) / duracao, len(erros)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+@click.command('benchmark-escrita')
+@click.option('--threads', default=8, show_default=True, help='Caixas lançando ao mesmo tempo.')
+@click.option('--commits', default=200, show_default=True, help='Lançamentos por caixa.')
+@with_appcontext
+def benchmark_escrita_command(threads, commits):
+    """Compara a vazão de commits concorrentes no SQLite com e sem SQLITE_PRAGMAS."""
+    for nome, pragmas in (('padrão do SQLite', {}), ('SQLITE_PRAGMAS', current_app.config['SQLITE_PRAGMAS'])):
+        vazao, erros = medir_escrita(pragmas, threads, commits)
+        click.echo(f'{nome}: {vazao:.0f} commits/s, {erros} erros "database is locked"')
@@ -0,0 +1,142 @@
+# app/busca.py
+# Busca de clientes para o campo com autocompletar dos formulários.
+# No SQLite usa a tabela virtual FTS5 `cliente_busca` (rowid = cliente.id), mantida
+# pelos listeners abaixo a cada flush; números de telefone digitados sem formatação
+# saem do índice em cliente.telefone_digitos. Em outros bancos cai para ILIKE.
+import re
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Cliente, somente_digitos
+
+TABELA_BUSCA = 'cliente_busca'
+LIMITE_PADRAO = 10
+# bm25 custa por linha encontrada; com muitas correspondências ("a", "jo") só as
+# primeiras CANDIDATOS são ranqueadas, e o usuário refina digitando mais
+CANDIDATOS = 200
+# nome pesa mais que telefone/e-mail no ranking (bm25: menor = melhor)
+PESOS = (10.0, 3.0, 2.0, 3.0)
+
+
+def _sqlite(conn):
+    return conn.dialect.name == 'sqlite'
+
+
+def criar_tabela_busca(conn):
+    # True se a tabela foi criada agora (e precisa ser preenchida)
+    if not _sqlite(conn) or inspect(conn).has_table(TABELA_BUSCA):
+        return False
+    conn.exec_driver_sql(
+        f'CREATE VIRTUAL TABLE {TABELA_BUSCA} USING fts5('
+        'nome, telefone, email, telefone_digitos, usuario_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    return True
+
+
+def reconstruir_busca(conn):
+    conn.exec_driver_sql(f'DELETE FROM {TABELA_BUSCA}')
+    conn.exec_driver_sql(
+        f'INSERT INTO {TABELA_BUSCA} (rowid, nome, telefone, email, telefone_digitos, usuario_id) '
+        "SELECT id, nome, coalesce(telefone, ''), coalesce(email, ''), coalesce(telefone_digitos, ''), usuario_id "
+        'FROM cliente'
+    )
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _criar_busca(target, connection, **kw):
+    # db.create_all() (banco novo ou `flask atualizar-banco`) também cria a tabela FTS
+    if criar_tabela_busca(connection):
+        reconstruir_busca(connection)
+
+
+# ---------------- Sincronização ---------------- #
+@event.listens_for(Session, 'after_flush')
+def _busca_after_flush(session, flush_context):
+    alterados = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, Cliente)]
+    excluidos = [obj.id for obj in session.deleted if isinstance(obj, Cliente)]
+    if not alterados and not excluidos:
+        return
+    conn = session.connection()
+    if not _sqlite(conn) or not inspect(conn).has_table(TABELA_BUSCA):
+        return
+    remover = text(f'DELETE FROM {TABELA_BUSCA} WHERE rowid = :id')
+    for ident in excluidos + [obj.id for obj in alterados]:
+        conn.execute(remover, {'id': ident})
+    if alterados:
+        conn.execute(text(
+            f'INSERT INTO {TABELA_BUSCA} (rowid, nome, telefone, email, telefone_digitos, usuario_id) '
+            'VALUES (:id, :nome, :telefone, :email, :telefone_digitos, :usuario_id)'
+        ), [{
+            'id': c.id, 'nome': c.nome or '', 'telefone': c.telefone or '', 'email': c.email or '',
+            'telefone_digitos': c.telefone_digitos or '', 'usuario_id': c.usuario_id,
+        } for c in alterados])
+
+
+# ---------------- Consulta ---------------- #
+def _como_dict(linha):
+    return {'id': linha.id, 'nome': linha.nome, 'telefone': linha.telefone, 'email': linha.email}
+
+
+def buscar_clientes(texto, usuario_id=None, limite=LIMITE_PADRAO):
+    # [{'id', 'nome', 'telefone', 'email'}, ...] do mais para o menos relevante;
+    # usuario_id=None = admin, busca em todos os clientes
+    termos = re.findall(r'\w+', texto or '')
+    if not termos:
+        return []
+    conn = db.session.connection()
+    colunas = (Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email)
+    resultados = []
+
+    # Só número (com ou sem máscara): prefixo do telefone, pelo índice de dígitos
+    digitos = somente_digitos(texto)
+    so_telefone = len(digitos) >= 3 and not re.search(r'[^\d\s()+\-.]', texto)
+    if so_telefone:
+        if _sqlite(conn):
+            # faixa em vez de LIKE: o LIKE do SQLite ignora maiúsculas e não usa o índice
+            prefixo = (Cliente.telefone_digitos >= digitos) & (Cliente.telefone_digitos < digitos + ':')
+        else:
+            # a faixa dependeria da collation; no PostgreSQL o índice usa varchar_pattern_ops
+            prefixo = Cliente.telefone_digitos.startswith(digitos)
+        q = select(*colunas).where(prefixo)
+        if usuario_id is not None:
+            q = q.where(Cliente.usuario_id == usuario_id)
+        resultados = [_como_dict(l) for l in conn.execute(q.order_by(Cliente.telefone_digitos).limit(limite))]
+        if len(resultados) >= limite:
+            return resultados
+        # o resto vem de trechos do número (ex.: os últimos dígitos); DDD e
+        # pedaços curtos casariam com quase todos os clientes
+        termos = [t for t in termos if len(t) >= 3] or termos
+
+    if _sqlite(conn) and inspect(conn).has_table(TABELA_BUSCA):
+        # cada termo vira prefixo entre aspas ("ana"* "silv"*): o usuário digita aos poucos
+        consulta = ' '.join('"{}"*'.format(t.replace('"', '')) for t in termos)
+        if so_telefone:
+            consulta = '{telefone telefone_digitos} : (' + consulta + ')'
+        parametros = {'consulta': consulta, 'candidatos': CANDIDATOS, 'limite': limite + len(resultados)}
+        filtro_usuario = ''
+        if usuario_id is not None:
+            filtro_usuario = ' AND usuario_id = :usuario_id'
+            parametros['usuario_id'] = usuario_id
+        linhas = conn.execute(text(
+            'SELECT c.id, c.nome, c.telefone, c.email FROM ('
+            f'SELECT rowid AS id, bm25({TABELA_BUSCA}, {", ".join(map(str, PESOS))}) AS relevancia '
+            f'FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH :consulta{filtro_usuario} LIMIT :candidatos'
+            ') b JOIN cliente c ON c.id = b.id ORDER BY b.relevancia LIMIT :limite'
+        ), parametros)
+    else:
+        padrao = f'%{texto.strip()}%'
+        q = select(*colunas).where(
+            Cliente.nome.ilike(padrao) | Cliente.telefone.ilike(padrao) | Cliente.email.ilike(padrao)
+        )
+        if usuario_id is not None:
+            q = q.where(Cliente.usuario_id == usuario_id)
+        linhas = conn.execute(q.order_by(Cliente.nome).limit(limite + len(resultados)))
+
+    vistos = {r['id'] for r in resultados}
+    for linha in linhas:
+        if linha.id not in vistos:
+            resultados.append(_como_dict(linha))
+    return resultados[:limite]
@@ -0,0 +1,173 @@
+# app/calendario.py
+# Agenda em JSON para a tela de calendário, que consulta a cada poucos segundos.
+# Cada agendamento guarda em `versao_alteracao` a versão de `agendamento` em
+# versao_dados do flush que o criou ou alterou por último, e os excluídos deixam
+# um registro em `agendamento_excluido` com a mesma versão. O calendário pede
+# então só o que mudou desde a versão que já tem, numa busca pelo índice, em vez
+# de baixar a semana de novo; a resposta leva um ETag das versões, e uma consulta
+# sem nada novo recebe 304 sem ler agendamento nenhum. Renomear um cliente,
+# profissional ou serviço (ou mudar a duração do serviço) marca com a nova versão
+# os agendamentos que o mostram, para a alteração chegar também a quem pede `desde`.
+import hashlib
+
+from sqlalchemy import event, inspect, or_, select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models import Agendamento, AgendamentoExcluido, Cliente, Profissional, Servico, VersaoDados
+from app.agenda import DURACAO_PADRAO
+from app.versoes import versoes, incrementar_versoes
+
+TABELA = Agendamento.__tablename__
+RELACIONADAS = (Cliente.__tablename__, Profissional.__tablename__, Servico.__tablename__)
+# campos exibidos no calendário (como_dict) e a chave que liga cada um ao agendamento
+EXIBIDOS = {
+    Cliente: (Agendamento.__table__.c.cliente_id, ('nome',)),
+    Profissional: (Agendamento.__table__.c.profissional_id, ('nome',)),
+    Servico: (Agendamento.__table__.c.servico_id, ('nome', 'duracao_minutos')),
+}
+
+
+# ---------------- Versão de cada agendamento ---------------- #
+def _pendentes(session):
+    return session.info.setdefault('calendario_pendente',
+                                   {'alterados': set(), 'excluidos': [], 'referencias': [], 'diretos': False})
+
+
+@event.listens_for(Session, 'before_flush')
+def _calendario_before_flush(session, flush_context, instances):
+    # excluir cliente, profissional ou serviço anula a chave nos agendamentos
+    # durante o flush, fora de session.dirty
+    pendentes = _pendentes(session)
+    for obj in session.deleted:
+        if isinstance(obj, (Cliente, Profissional, Servico)):
+            pendentes['alterados'].update(obj.agendamentos)
+    # renomeados: os agendamentos são marcados por UPDATE na chave, sem carregá-los
+    for obj in session.dirty:
+        exibidos = EXIBIDOS.get(type(obj))
+        if exibidos and obj.id is not None:
+            coluna, campos = exibidos
+            estado = inspect(obj)
+            if any(estado.attrs[campo].history.has_changes() for campo in campos):
+                pendentes['referencias'].append((coluna, obj.id))
+
+
+@event.listens_for(Session, 'after_flush')
+def _calendario_after_flush(session, flush_context):
+    pendentes = _pendentes(session)
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Agendamento) and (obj in session.new or session.is_modified(obj, include_collections=False)):
+            pendentes['alterados'].add(obj)
+            pendentes['diretos'] = True
+    for obj in session.deleted:
+        if isinstance(obj, Agendamento):
+            pendentes['alterados'].discard(obj)
+            pendentes['excluidos'].append({'agendamento_id': obj.id, 'usuario_id': obj.usuario_id,
+                                           'profissional_id': obj.profissional_id, 'data': obj.data})
+            pendentes['diretos'] = True
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _calendario_after_flush_postexec(session, flush_context):
+    # depois de app/versoes.py incrementar a versão da tabela neste flush; a linha
+    # de versao_dados fica travada até o commit, então nenhuma outra transação
+    # grava a mesma versão
+    pendentes = session.info.pop('calendario_pendente', None)
+    if not pendentes or not (pendentes['alterados'] or pendentes['excluidos'] or pendentes['referencias']):
+        return
+    conn = session.connection()
+    if not pendentes['diretos']:
+        incrementar_versoes(conn, [TABELA])
+    versao = conn.scalar(select(VersaoDados.versao).where(VersaoDados.tabela == TABELA))
+    alterados = [obj for obj in pendentes['alterados'] if obj.id is not None]
+    if alterados:
+        tabela = Agendamento.__table__
+        conn.execute(tabela.update().where(tabela.c.id.in_([obj.id for obj in alterados]))
+                     .values(versao_alteracao=versao))
+        for obj in alterados:
+            set_committed_value(obj, 'versao_alteracao', versao)
+    if pendentes['referencias']:
+        tabela = Agendamento.__table__
+        conn.execute(tabela.update().where(or_(*(coluna == ident for coluna, ident in pendentes['referencias'])))
+                     .values(versao_alteracao=versao))
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Agendamento) and any(
+                    getattr(obj, coluna.key) == ident for coluna, ident in pendentes['referencias']):
+                set_committed_value(obj, 'versao_alteracao', versao)
+    if pendentes['excluidos']:
+        conn.execute(AgendamentoExcluido.__table__.insert(),
+                     [dict(excluido, versao=versao) for excluido in pendentes['excluidos']])
+
+
+# ---------------- Consulta ---------------- #
+def versoes_calendario():
+    # lida antes dos agendamentos: no PostgreSQL cada consulta vê os commits feitos
+    # até ali, então o que mudar no meio vem de novo na próxima consulta, e não se perde
+    return versoes(TABELA, *RELACIONADAS)
+
+
+def etag(atuais, *parametros):
+    chave = repr((sorted(atuais.items()),) + parametros)
+    return hashlib.sha1(chave.encode()).hexdigest()[:24]
+
+
+def _condicoes(usuario_id, profissional_id):
+    condicoes = []
+    if usuario_id is not None:
+        condicoes.append(Agendamento.usuario_id == usuario_id)
+    if profissional_id:
+        condicoes.append(Agendamento.profissional_id == profissional_id)
+    return condicoes
+
+
+def _consulta(*condicoes):
+    return Agendamento.query.options(
+        joinedload(Agendamento.cliente), joinedload(Agendamento.profissional), joinedload(Agendamento.servico)
+    ).filter(*condicoes)
+
+
+def agendamentos_do_periodo(inicio, fim, usuario_id=None, profissional_id=None):
+    # busca por intervalo de `data` (índices por data, por usuário e data ou por profissional e data)
+    return _consulta(Agendamento.data >= inicio, Agendamento.data <= fim,
+                     *_condicoes(usuario_id, profissional_id))\
+        .order_by(Agendamento.data, Agendamento.hora, Agendamento.id).all()
+
+
+def alteracoes_desde(versao, inicio, fim, usuario_id=None, profissional_id=None):
+    # (alterados no período, ids que saíram do período ou foram excluídos) depois de `versao`
+    alterados, removidos = [], []
+    condicoes = [Agendamento.versao_alteracao > versao]
+    if usuario_id is not None:
+        condicoes.append(Agendamento.usuario_id == usuario_id)
+    for agendamento in _consulta(*condicoes).order_by(Agendamento.data, Agendamento.hora, Agendamento.id):
+        no_periodo = agendamento.data is not None and inicio <= agendamento.data <= fim
+        if no_periodo and (not profissional_id or agendamento.profissional_id == profissional_id):
+            alterados.append(agendamento)
+        else:
+            removidos.append(agendamento.id)
+
+    excluidos = select(AgendamentoExcluido.agendamento_id, AgendamentoExcluido.data)\
+        .where(AgendamentoExcluido.versao > versao)
+    if usuario_id is not None:
+        excluidos = excluidos.where(AgendamentoExcluido.usuario_id == usuario_id)
+    removidos += [ident for ident, dia in db.session.execute(excluidos)
+                  if dia is None or inicio <= dia <= fim]
+    return alterados, sorted(set(removidos))
+
+
+def como_dict(agendamento):
+    def referencia(obj):
+        return {'id': obj.id, 'nome': obj.nome} if obj is not None else None
+    servico = agendamento.servico
+    return {
+        'id': agendamento.id,
+        'data': agendamento.data.isoformat() if agendamento.data else None,
+        'hora': agendamento.hora,
+        'duracao': servico.duracao_minutos if servico and servico.duracao_minutos else DURACAO_PADRAO,
+        'status': agendamento.status,
+        'observacao': agendamento.observacao,
+        'cliente': referencia(agendamento.cliente),
+        'profissional': referencia(agendamento.profissional),
+        'servico': referencia(servico),
+    }
@@ -0,0 +1,51 @@
+# app/carregamento.py
+# Contagem de lazy loads por requisição, ativa em modo debug ou testes.
+# Cada acesso a um relacionamento que não veio com selectinload/joinedload custa
+# uma consulta extra (N+1 no template). As views declaram quantos aceitam com
+# @orcamento_lazy_loads(n); acima disso o excesso vai para o log, ou vira erro
+# com app.config['LAZY_LOADS_ESTRITO'] = True (útil em testes).
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LAZY_LOADS_PADRAO = 20
+
+
+class LazyLoadsExcedidos(RuntimeError):
+    pass
+
+
+def orcamento_lazy_loads(limite):
+    def decorator(f):
+        f.orcamento_lazy_loads = limite
+        return f
+    return decorator
+
+
+def _ativo():
+    return has_request_context() and (current_app.debug or current_app.testing)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _contar_lazy_load(orm_execute_state):
+    # load_options só existe em SELECTs; session.execute(text(...)) e UPDATEs passam direto
+    if orm_execute_state.is_select and orm_execute_state.lazy_loaded_from is not None and _ativo():
+        g.lazy_loads = g.get('lazy_loads', 0) + 1
+
+
+def _verificar_lazy_loads(response):
+    if not _ativo():
+        return response
+    total = g.get('lazy_loads', 0)
+    view = current_app.view_functions.get(request.endpoint)
+    limite = getattr(view, 'orcamento_lazy_loads', LAZY_LOADS_PADRAO)
+    if total > limite:
+        mensagem = f'{request.endpoint}: {total} lazy loads (orçamento {limite})'
+        if current_app.config.get('LAZY_LOADS_ESTRITO'):
+            raise LazyLoadsExcedidos(mensagem)
+        current_app.logger.warning(mensagem)
+    return response
+
+
+def init_app(app):
+    app.after_request(_verificar_lazy_loads)
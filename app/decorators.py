@@ -7,6 +7,6 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or current_user.role != 'admin':
             flash("Acesso negado.", "danger")
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('principal.dashboard'))
         return f(*args, **kwargs)
     return decorated_function
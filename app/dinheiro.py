@@ -0,0 +1,60 @@
+# app/dinheiro.py
+# Valores em dinheiro gravados como centavos inteiros (coluna Dinheiro). No Python
+# eles circulam como Decimal de duas casas: as somas feitas no banco (SUM sobre
+# inteiros) e no código são exatas, sem o acúmulo de erro do float. A conversão
+# acontece nas bordas: ler_dinheiro() nos formulários, o formato "%.2f" nos
+# templates e ProvedorJSON nos gráficos, que recebem número e não texto.
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+CENTAVO = Decimal('0.01')
+
+
+def para_decimal(valor):
+    # float passa por str: Decimal(0.1) traria a imprecisão binária junto
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        valor = str(valor)
+    return Decimal(valor).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def ler_dinheiro(texto):
+    # '12,50', '12.50', ' 12 ' -> Decimal('12.50'); ValueError se não for número
+    try:
+        valor = para_decimal((texto or '').strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'valor inválido: {texto!r}')
+    if not valor.is_finite():
+        raise ValueError(f'valor inválido: {texto!r}')
+    return valor
+
+
+class Dinheiro(TypeDecorator):
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialect):
+        if valor is None:
+            return None
+        return int(para_decimal(valor) * 100)
+
+    def process_literal_param(self, valor, dialect):
+        return self.process_bind_param(valor, dialect)
+
+    def process_result_value(self, valor, dialect):
+        if valor is None:
+            return None
+        return Decimal(round(valor)).scaleb(-2)
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    # o padrão do Flask serializa Decimal como texto ("12.50")
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
@@ -0,0 +1,248 @@
+# app/estoque.py
+# Entradas e saídas de estoque seguras com vários caixas ao mesmo tempo. Ler a
+# quantidade, conferir e gravar o novo valor em Python deixa dois caixas
+# venderem a última unidade (os dois leem 1) ou um sobrescrever a baixa do outro.
+# Aqui a conferência e a baixa são um único UPDATE condicional, que o banco
+# executa com a linha travada; a MovimentacaoEstoque e o MovimentoCaixa da venda
+# entram na mesma transação. Alterações pelo ORM (edição do produto) são
+# protegidas pela versão do produto (version_id_col em Produto). vender_itens()
+# faz o mesmo para um carrinho inteiro, com as gravações em lote.
+# `flask estresse-estoque` vende e repõe em paralelo e confere o saldo final.
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import db
+from app.banco import configurar_engine
+from app.dinheiro import para_decimal
+from app.models import Usuario, Produto, MovimentacaoEstoque, MovimentoCaixa, VendaProduto
+from app.resumo import recalcular_dia
+from app.versoes import incrementar_versoes
+
+ENTRADA, SAIDA = 'entrada', 'saida'
+
+
+def movimentar_estoque(session, produto, tipo, quantidade, observacao=''):
+    # Soma ou tira `quantidade` do produto. A saída só acontece se houver estoque:
+    # devolve False sem alterar nada. Não faz commit; quem chama grava o restante
+    # da operação e confirma tudo junto.
+    tabela = Produto.__table__
+    atual = func.coalesce(tabela.c.quantidade, 0)
+    q = tabela.update().where(tabela.c.id == produto.id)
+    if tipo == SAIDA:
+        q = q.where(tabela.c.quantidade >= quantidade).values(quantidade=atual - quantidade)
+    else:
+        q = q.values(quantidade=atual + quantidade)
+    conn = session.connection()
+    if conn.execute(q.values(versao=tabela.c.versao + 1)).rowcount != 1:
+        return False
+    # a quantidade e a versão em memória ficaram velhas: relê no próximo acesso
+    session.expire(produto, ['quantidade', 'versao'])
+    session.add(MovimentacaoEstoque(produto_id=produto.id, tipo=tipo, quantidade=quantidade,
+                                    data=datetime.now(), observacao=observacao))
+    incrementar_versoes(conn, {tabela.name})
+    return True
+
+
+class EstoqueInsuficiente(ValueError):
+    pass
+
+
+def vender_itens(session, itens, usuario_id, forma_pagamento='', desconto_percentual=0, dono_id=None):
+    # Venda de um carrinho [(produto_id, quantidade), ...] numa transação só: uma
+    # consulta confere preços e estoque de todos os itens, um UPDATE baixa todos,
+    # e as VendaProduto e MovimentacaoEstoque entram em lote, com um único
+    # MovimentoCaixa do total. Devolve (movimento, nomes com estoque baixo).
+    # ValueError (EstoqueInsuficiente na falta de estoque) sem commit: quem chama
+    # faz rollback. `dono_id` limita aos produtos do usuário (None = todos).
+    pedidos = Counter()
+    for produto_id, quantidade in itens:
+        if quantidade <= 0:
+            raise ValueError('Quantidade inválida.')
+        pedidos[produto_id] += quantidade
+    if not pedidos:
+        raise ValueError('Nenhum item na venda.')
+    if not 0 <= desconto_percentual <= 100:
+        raise ValueError('Desconto inválido.')
+
+    tabela = Produto.__table__
+    conn = session.connection()
+    consulta = select(tabela.c.id, tabela.c.nome, tabela.c.preco, tabela.c.quantidade, tabela.c.quantidade_minima)\
+        .where(tabela.c.id.in_(pedidos))
+    if dono_id is not None:
+        consulta = consulta.where(tabela.c.usuario_id == dono_id)
+    produtos = {p.id: p for p in conn.execute(consulta)}
+    if len(produtos) != len(pedidos):
+        raise ValueError('Produto não encontrado.')
+    faltando = [p.nome for p in produtos.values() if (p.quantidade or 0) < pedidos[p.id]]
+    if faltando:
+        raise EstoqueInsuficiente(f'Estoque insuficiente: {", ".join(faltando)}.')
+
+    # a condição repete a conferência com as linhas travadas: se outro caixa vendeu
+    # entre a consulta e aqui, menos linhas são alteradas e a venda inteira é desfeita
+    pedido = case(pedidos, value=tabela.c.id)
+    baixa = tabela.update()\
+        .where(tabela.c.id.in_(pedidos), tabela.c.quantidade >= pedido)\
+        .values(quantidade=tabela.c.quantidade - pedido, versao=tabela.c.versao + 1)
+    if conn.execute(baixa).rowcount != len(pedidos):
+        raise EstoqueInsuficiente('Estoque insuficiente: outro caixa vendeu os mesmos produtos.')
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Produto) and obj.id in pedidos:
+            session.expire(obj, ['quantidade', 'versao'])
+
+    agora = datetime.now()
+    fator = 1 - para_decimal(desconto_percentual) / 100
+    valores = {produto_id: para_decimal(produtos[produto_id].preco * quantidade * fator)
+               for produto_id, quantidade in pedidos.items()}
+    descricao = 'Venda de produtos: ' + ', '.join(
+        f'{produtos[produto_id].nome} (x{quantidade})' for produto_id, quantidade in pedidos.items())
+    movimento = MovimentoCaixa(tipo='entrada', forma_pagamento=forma_pagamento, valor=sum(valores.values()),
+                               descricao=descricao[:200], data=agora, usuario_id=usuario_id)
+    session.add(movimento)
+    session.flush()
+
+    conn.execute(VendaProduto.__table__.insert(), [
+        dict(produto_id=produto_id, usuario_id=usuario_id, quantidade=quantidade,
+             valor_unitario=produtos[produto_id].preco, desconto_percentual=desconto_percentual,
+             valor_total=valores[produto_id], data=agora, movimento_id=movimento.id)
+        for produto_id, quantidade in pedidos.items()])
+    conn.execute(MovimentacaoEstoque.__table__.insert(),
+                 [dict(produto_id=produto_id, tipo=SAIDA, quantidade=quantidade, data=agora,
+                       observacao='Venda realizada') for produto_id, quantidade in pedidos.items()])
+    # os inserts em lote não passam pelo flush: versões e resumo do dia são atualizados aqui
+    incrementar_versoes(conn, {tabela.name, VendaProduto.__tablename__, MovimentacaoEstoque.__tablename__})
+    recalcular_dia(conn, agora.date(), usuario_id)
+
+    baixos = [p.nome for p in produtos.values()
+              if (p.quantidade or 0) - pedidos[p.id] <= (p.quantidade_minima or 0)]
+    return movimento, baixos
+
+
+# ---------------- Teste de estresse ---------------- #
+def _vender(engine, produto_id, usuario_id, vendas, resultados, modo):
+    resultado = Counter()
+    resultados.append(resultado)   # um contador por thread, somados no fim
+    with Session(engine) as session:
+        for _ in range(vendas):
+            try:
+                produto = session.get(Produto, produto_id)
+                if modo == 'condicional':
+                    vendeu = movimentar_estoque(session, produto, SAIDA, 1, 'estresse')
+                elif produto.quantidade >= 1:
+                    # leitura e escrita separadas, como era antes; a versão do produto detecta o conflito
+                    produto.quantidade -= 1
+                    session.add(MovimentacaoEstoque(produto_id=produto_id, tipo=SAIDA, quantidade=1,
+                                                    data=datetime.now(), observacao='estresse'))
+                    vendeu = True
+                else:
+                    vendeu = False
+                if vendeu:
+                    session.add(MovimentoCaixa(tipo='entrada', forma_pagamento='pix', valor=produto.preco,
+                                               descricao='estresse', data=datetime.now(), usuario_id=usuario_id))
+                session.commit()
+                resultado['vendidas' if vendeu else 'sem_estoque'] += 1
+            except (StaleDataError, OperationalError):
+                session.rollback()
+                resultado['conflitos'] += 1
+            finally:
+                session.expunge_all()
+
+
+def _repor(engine, produto_id, reposicoes, resultados):
+    resultado = Counter()
+    resultados.append(resultado)
+    with Session(engine) as session:
+        for _ in range(reposicoes):
+            try:
+                movimentar_estoque(session, session.get(Produto, produto_id), ENTRADA, 1, 'estresse')
+                session.commit()
+                resultado['repostas'] += 1
+            except OperationalError:
+                session.rollback()
+                resultado['conflitos'] += 1
+            finally:
+                session.expunge_all()
+
+
+def estressar_estoque(modo, threads, vendas, estoque_inicial):
+    # {contagens..., 'problemas': [...]}: `threads` caixas vendendo uma unidade por
+    # vez e metade disso repondo, num banco temporário com o perfil SQLITE_PRAGMAS
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    pasta = tempfile.mkdtemp(prefix='estresse-', dir=current_app.instance_path)
+    try:
+        engine = create_engine(f'sqlite:///{os.path.join(pasta, "estoque.db")}', pool_size=threads * 2)
+        configurar_engine(engine, current_app.config['SQLITE_PRAGMAS'])
+        db.metadata.create_all(engine)
+        with Session(engine) as session:
+            usuario = Usuario(username='estresse', role='comum')
+            usuario.set_senha('estresse')
+            session.add(usuario)
+            session.flush()
+            produto = Produto(nome='estresse', preco=1, quantidade=estoque_inicial, usuario_id=usuario.id)
+            session.add(produto)
+            session.commit()
+            usuario_id, produto_id = usuario.id, produto.id
+
+        resultados = []
+        trabalhadores = [threading.Thread(target=_vender, args=(engine, produto_id, usuario_id, vendas, resultados, modo))
+                         for _ in range(threads)]
+        trabalhadores += [threading.Thread(target=_repor, args=(engine, produto_id, vendas // 2, resultados))
+                          for _ in range(max(1, threads // 2))]
+        for t in trabalhadores:
+            t.start()
+        for t in trabalhadores:
+            t.join()
+
+        with Session(engine) as session:
+            final = session.scalar(select(Produto.quantidade).where(Produto.id == produto_id))
+            por_tipo = dict(session.execute(select(MovimentacaoEstoque.tipo, func.sum(MovimentacaoEstoque.quantidade))
+                                            .group_by(MovimentacaoEstoque.tipo)).all())
+            no_caixa = session.scalar(select(func.count(MovimentoCaixa.id)))
+        engine.dispose()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    resultado = sum(resultados, Counter())
+    problemas = []
+    esperado = estoque_inicial + resultado['repostas'] - resultado['vendidas']
+    if final != esperado:
+        problemas.append(f'estoque final {final}, esperado {esperado} (atualização perdida)')
+    if final < 0:
+        problemas.append(f'estoque negativo ({final})')
+    if por_tipo.get(SAIDA, 0) != resultado['vendidas'] or no_caixa != resultado['vendidas']:
+        problemas.append(f'{resultado["vendidas"]} vendas, {por_tipo.get(SAIDA, 0)} saídas de estoque '
+                         f'e {no_caixa} lançamentos no caixa')
+    if por_tipo.get(ENTRADA, 0) != resultado['repostas']:
+        problemas.append(f'{resultado["repostas"]} reposições e {por_tipo.get(ENTRADA, 0)} entradas de estoque')
+    contagens = {chave: resultado[chave] for chave in ('vendidas', 'sem_estoque', 'repostas', 'conflitos')}
+    return dict(contagens, final=final, problemas=problemas)
+
+
+@click.command('estresse-estoque')
+@click.option('--threads', default=8, show_default=True, help='Caixas vendendo ao mesmo tempo.')
+@click.option('--vendas', default=50, show_default=True, help='Tentativas de venda por caixa.')
+@click.option('--estoque', 'estoque_inicial', default=100, show_default=True, help='Estoque inicial do produto.')
+@with_appcontext
+def estresse_estoque_command(threads, vendas, estoque_inicial):
+    """Vende e repõe um produto em paralelo e falha se houver venda sem estoque ou baixa perdida."""
+    falhou = False
+    for modo, nome in (('condicional', 'UPDATE condicional'), ('versao', 'ORM com versão')):
+        r = estressar_estoque(modo, threads, vendas, estoque_inicial)
+        click.echo(f'{nome}: {r["vendidas"]} vendidas, {r["sem_estoque"]} sem estoque, {r["repostas"]} repostas, '
+                   f'{r["conflitos"]} conflitos, estoque final {r["final"]}')
+        for problema in r['problemas']:
+            click.echo(f'  {problema}', err=True)
+        falhou = falhou or bool(r['problemas'])
+    if falhou:
+        raise SystemExit(1)
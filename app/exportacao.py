@@ -0,0 +1,252 @@
+# app/exportacao.py
+# Exportação de lançamentos (caixa, agendamentos, vendas) em CSV ou XLSX, gerada
+# aos poucos: as linhas vêm do banco em lotes por um cursor de servidor
+# (stream_results) e cada lote vira um pedaço da resposta. A memória não cresce
+# com o período e o cabeçalho sai antes de a consulta começar.
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import Usuario, Cliente, Profissional, Servico, Produto, Agendamento, MovimentoCaixa, VendaProduto
+from app.paginacao import condicoes_periodo
+
+LOTE = 1000
+FORMATOS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# ---------------- Consultas ---------------- #
+def _movimentos(filtros, usuario_id):
+    q = select(
+        MovimentoCaixa.id, MovimentoCaixa.data, MovimentoCaixa.tipo, MovimentoCaixa.forma_pagamento,
+        MovimentoCaixa.descricao, MovimentoCaixa.valor, Usuario.username,
+    ).outerjoin(Usuario, Usuario.id == MovimentoCaixa.usuario_id)\
+     .where(*condicoes_periodo(MovimentoCaixa.data, filtros))
+    if usuario_id is not None:
+        q = q.where(MovimentoCaixa.usuario_id == usuario_id)
+    cabecalho = ['ID', 'Data', 'Tipo', 'Forma de pagamento', 'Descrição', 'Valor', 'Usuário']
+    return cabecalho, q.order_by(MovimentoCaixa.data, MovimentoCaixa.id)
+
+
+def _agendamentos(filtros, usuario_id):
+    cliente, profissional, servico = aliased(Cliente), aliased(Profissional), aliased(Servico)
+    q = select(
+        Agendamento.id, Agendamento.data, Agendamento.hora, cliente.nome, profissional.nome, servico.nome,
+        Agendamento.status, Agendamento.valor_pago, Agendamento.forma_pagamento, Agendamento.custo,
+        Agendamento.observacao, Usuario.username,
+    ).outerjoin(cliente, cliente.id == Agendamento.cliente_id)\
+     .outerjoin(profissional, profissional.id == Agendamento.profissional_id)\
+     .outerjoin(servico, servico.id == Agendamento.servico_id)\
+     .outerjoin(Usuario, Usuario.id == Agendamento.usuario_id)\
+     .where(*condicoes_periodo(Agendamento.data, filtros))
+    if usuario_id is not None:
+        q = q.where(Agendamento.usuario_id == usuario_id)
+    cabecalho = ['ID', 'Data', 'Hora', 'Cliente', 'Profissional', 'Serviço', 'Status', 'Valor pago',
+                 'Forma de pagamento', 'Custo', 'Observação', 'Usuário']
+    return cabecalho, q.order_by(Agendamento.data, Agendamento.id)
+
+
+def _vendas(filtros, usuario_id):
+    q = select(
+        VendaProduto.id, VendaProduto.data, Produto.nome, VendaProduto.quantidade, VendaProduto.valor_unitario,
+        VendaProduto.desconto_percentual, VendaProduto.valor_total, Usuario.username,
+    ).outerjoin(Produto, Produto.id == VendaProduto.produto_id)\
+     .outerjoin(Usuario, Usuario.id == VendaProduto.usuario_id)\
+     .where(*condicoes_periodo(VendaProduto.data, filtros))
+    if usuario_id is not None:
+        q = q.where(VendaProduto.usuario_id == usuario_id)
+    cabecalho = ['ID', 'Data', 'Produto', 'Quantidade', 'Valor unitário', 'Desconto (%)', 'Valor total', 'Usuário']
+    return cabecalho, q.order_by(VendaProduto.data, VendaProduto.id)
+
+
+EXPORTACOES = {
+    'movimentos': _movimentos,
+    'agendamentos': _agendamentos,
+    'vendas': _vendas,
+}
+
+
+def linhas_em_lotes(consulta, tamanho=LOTE):
+    resultado = db.session.execute(consulta, execution_options={'stream_results': True, 'yield_per': tamanho})
+    try:
+        yield from resultado.partitions(tamanho)
+    finally:
+        resultado.close()
+
+
+# ---------------- CSV ---------------- #
+def _texto_csv(valor):
+    # padrão do Excel em português: ';' separa colunas e ',' separa decimais
+    if valor is None:
+        return ''
+    if isinstance(valor, (Decimal, float)):
+        return f'{valor:.2f}'.replace('.', ',')
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, str) and valor[:1] in ('=', '+', '-', '@'):
+        return "'" + valor  # o Excel não interpreta a descrição como fórmula
+    return valor
+
+
+def gerar_csv(cabecalho, lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')  # BOM: o Excel reconhece o UTF-8
+    escritor.writerow(cabecalho)
+    yield buffer.getvalue()
+    for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([_texto_csv(v) for v in linha] for linha in lote)
+        yield buffer.getvalue()
+
+
+# ---------------- XLSX ---------------- #
+# Planilha mínima escrita direto no zip, sem biblioteca externa: o zipfile aceita
+# saída sem seek, então cada lote comprimido é entregue assim que sai do deflate.
+_ARQUIVOS_FIXOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Dados" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'
+    ),
+    # estilos: 0 padrão, 1 data e hora, 2 data, 3 valor com duas casas
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+class _SaidaSemSeek(io.RawIOBase):
+    # destino do zip: acumula os bytes escritos até o gerador entregá-los
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def drenar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _coluna(indice):
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celula(ref, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime):
+        serial = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c r="{ref}" s="1"><v>{serial!r}</v></c>'
+    if isinstance(valor, date):
+        return f'<c r="{ref}" s="2"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    if isinstance(valor, Decimal):
+        return f'<c r="{ref}" s="3"><v>{valor}</v></c>'
+    if isinstance(valor, float):
+        return f'<c r="{ref}" s="3"><v>{valor!r}</v></c>'
+    if isinstance(valor, int):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def _linha(numero, valores):
+    celulas = ''.join(_celula(f'{_coluna(i)}{numero}', v) for i, v in enumerate(valores))
+    return f'<row r="{numero}">{celulas}</row>'
+
+
+def gerar_xlsx(cabecalho, lotes):
+    saida = _SaidaSemSeek()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in _ARQUIVOS_FIXOS.items():
+            pacote.writestr(nome, conteudo)
+        with pacote.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _linha(1, cabecalho)
+            ).encode())
+            yield saida.drenar()
+            numero = 1
+            for lote in lotes:
+                xml = []
+                for linha in lote:
+                    numero += 1
+                    xml.append(_linha(numero, linha))
+                planilha.write(''.join(xml).encode())
+                yield saida.drenar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.drenar()
+
+
+GERADORES = {'csv': gerar_csv, 'xlsx': gerar_xlsx}
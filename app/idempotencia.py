@@ -0,0 +1,138 @@
+# app/idempotencia.py
+# Envios repetidos (duplo clique, reenvio do navegador, retry de cliente JSON) dos
+# POSTs que lançam no caixa. O formulário traz uma chave única gerada ao renderizar
+# (campo `chave_idempotencia`; clientes JSON mandam o cabeçalho Idempotency-Key).
+# O primeiro envio grava a chave na mesma transação dos lançamentos e, no fim, a
+# resposta; um envio com a mesma chave recebe essa resposta sem gravar nada, numa
+# busca pelo índice único (usuario_id, chave). Dois envios simultâneos: o segundo
+# espera o primeiro no índice único e repete a resposta dele. Chaves com mais de
+# IDEMPOTENCIA_TTL segundos são apagadas de tempos em tempos.
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, flash, jsonify, make_response, redirect, request, url_for
+from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import ChaveIdempotencia
+
+CABECALHO = 'Idempotency-Key'
+CAMPO = 'chave_idempotencia'
+
+
+def nova_chave():
+    return uuid.uuid4().hex
+
+
+def _chave_da_requisicao():
+    chave = (request.headers.get(CABECALHO) or request.form.get(CAMPO) or '').strip()
+    return chave[:64] or None
+
+
+def _buscar(chave):
+    return db.session.execute(
+        select(ChaveIdempotencia.codigo, ChaveIdempotencia.destino, ChaveIdempotencia.corpo)
+        .where(ChaveIdempotencia.usuario_id == current_user.id, ChaveIdempotencia.chave == chave)
+    ).first()
+
+
+def _aguardar(chave, limite=5.0):
+    # o primeiro envio confirma os lançamentos e grava a resposta logo em seguida
+    fim = time.monotonic() + limite
+    gravada = _buscar(chave)
+    while gravada is not None and gravada.codigo is None and time.monotonic() < fim:
+        db.session.rollback()   # nova leitura, fora do snapshot anterior
+        time.sleep(0.05)
+        gravada = _buscar(chave)
+    return gravada
+
+
+def _repetir(gravada):
+    codigo, destino, corpo = gravada
+    if codigo is None:
+        # o primeiro envio ainda não terminou de responder
+        if request.is_json:
+            return jsonify({'erro': 'Requisição em andamento.'}), 409
+        flash('Este envio já está sendo processado.', 'info')
+        return redirect(request.referrer or url_for('principal.dashboard'))
+    if destino is None:
+        return current_app.response_class(corpo, status=codigo, mimetype='application/json')
+    flash('Este envio já foi processado.', 'info')
+    return redirect(destino, code=codigo)
+
+
+def _gravar(chave, resposta):
+    # guarda redirects e JSON (exceto erro do servidor); outras respostas, como o
+    # formulário devolvido com erro, liberam a chave para um novo envio
+    tabela = ChaveIdempotencia.__table__
+    onde = (tabela.c.usuario_id == current_user.id) & (tabela.c.chave == chave)
+    if resposta.is_json and resposta.status_code < 500:
+        db.session.execute(tabela.update().where(onde).values(
+            codigo=resposta.status_code, corpo=resposta.get_data(as_text=True)))
+    elif resposta.status_code in (301, 302, 303, 307, 308):
+        db.session.execute(tabela.update().where(onde).values(
+            codigo=resposta.status_code, destino=resposta.location))
+    else:
+        db.session.execute(tabela.delete().where(onde))
+    db.session.commit()
+
+
+def idempotente(view):
+    # depois do @login_required; sem chave na requisição, a view roda normalmente
+    @wraps(view)
+    def envolvida(*args, **kwargs):
+        chave = _chave_da_requisicao() if request.method == 'POST' else None
+        if chave is None:
+            return view(*args, **kwargs)
+        _limpeza().talvez_limpar()
+        gravada = _aguardar(chave)
+        if gravada is not None:
+            return _repetir(gravada)
+        db.session.add(ChaveIdempotencia(usuario_id=current_user.id, chave=chave, endpoint=request.endpoint,
+                                         criada_em=datetime.utcnow()))
+        try:
+            # reserva a chave; o commit da view a confirma junto com os lançamentos
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return _repetir(_aguardar(chave))
+        resposta = make_response(view(*args, **kwargs))
+        _gravar(chave, resposta)
+        return resposta
+    return envolvida
+
+
+# ---------------- Limpeza ---------------- #
+class _Limpeza:
+    # apaga as chaves vencidas no máximo uma vez por intervalo, em qualquer thread
+    def __init__(self, ttl, intervalo):
+        self.ttl = ttl
+        self.intervalo = intervalo
+        self.proxima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def talvez_limpar(self):
+        agora = time.monotonic()
+        with self._lock:
+            if agora < self.proxima:
+                return
+            self.proxima = agora + self.intervalo
+        limite = datetime.utcnow() - timedelta(seconds=self.ttl)
+        db.session.execute(ChaveIdempotencia.__table__.delete()
+                           .where(ChaveIdempotencia.criada_em < limite))
+        db.session.commit()
+
+
+def _limpeza():
+    return current_app.extensions['idempotencia']
+
+
+def init_app(app):
+    ttl = app.config['IDEMPOTENCIA_TTL']
+    app.extensions['idempotencia'] = _Limpeza(ttl, min(ttl, 3600))
+    app.jinja_env.globals['chave_idempotencia'] = nova_chave
@@ -0,0 +1,52 @@
+# app/inicializacao.py
+# Orçamento de tempo de importação da aplicação (create_app), que é o custo de subir cada
+# worker. As bibliotecas de PDF (xhtml2pdf puxa reportlab, html5lib...) só são
+# importadas na primeira geração de relatório; `flask verificar-importacao` mede
+# com `python -X importtime` num processo novo e falha se elas voltarem a ser
+# carregadas na inicialização ou se o tempo passar do limite.
+import os
+import subprocess
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+# carregados sob demanda em app/relatorios.py
+MODULOS_SOB_DEMANDA = ('xhtml2pdf', 'reportlab', 'html5lib', 'pypdf')
+EXECUCOES = 3  # vale a mais rápida: a primeira paga o cache de disco frio
+
+
+def medir_importacao():
+    # (milissegundos, nomes dos módulos importados) ao subir a aplicação num processo novo
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=os.path.dirname(current_app.root_path), capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    modulos = set()
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        modulos.add(nome.strip())
+        if not nome[1:].startswith(' '):  # só o nível de cima; os internos já estão somados
+            total_us += int(acumulado)
+    return total_us / 1000, modulos
+
+
+@click.command('verificar-importacao')
+@with_appcontext
+def verificar_importacao_command():
+    """Falha se importar o app passar do limite ou carregar as bibliotecas de PDF."""
+    limite = current_app.config['IMPORTACAO_LIMITE_MS']
+    medicoes = [medir_importacao() for _ in range(EXECUCOES)]
+    tempo, modulos = min(medicoes, key=lambda m: m[0])
+    pesados = sorted({m.split('.')[0] for m in modulos} & set(MODULOS_SOB_DEMANDA))
+    if pesados:
+        click.echo(f'Importados na inicialização: {", ".join(pesados)}', err=True)
+    if tempo > limite:
+        click.echo(f'Importação levou {tempo:.0f} ms (limite {limite} ms).', err=True)
+    if pesados or tempo > limite:
+        raise SystemExit(1)
+    click.echo(f'Importação em {tempo:.0f} ms (limite {limite} ms).')
@@ -0,0 +1,313 @@
+# app/lembretes.py
+# Lembretes dos agendamentos do dia seguinte, em lote. Uma consulta (índice de
+# data e status) traz os agendamentos com cliente, serviço e profissional, as
+# mensagens são montadas de uma vez e gravadas na tabela `lembrete`, que é ao
+# mesmo tempo a fila e o registro de entrega. Uma thread por processo envia os
+# pendentes pelo enviador configurado (LEMBRETES_ENVIADOR) e reagenda as falhas com
+# espera crescente até LEMBRETES_TENTATIVAS. Cada envio é reservado com um UPDATE
+# condicional antes de sair, então vários workers (ou o `flask enviar-lembretes` do
+# cron) não mandam o mesmo lembrete duas vezes; uma reserva abandonada (processo
+# morto no meio) volta para a fila depois de PRAZO_RESERVA.
+# O limite de LEMBRETES_POR_MINUTO vale para todos os processos juntos: a mesma
+# reserva só passa se o banco tiver menos que isso em `reservado_em` no último
+# minuto. Dentro de cada processo, Limite ainda espaça os envios por igual.
+import importlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.versoes import incrementar_versoes
+from app.models import (
+    Agendamento, Lembrete, STATUS_AGENDADO, somente_digitos,
+    LEMBRETE_PENDENTE, LEMBRETE_ENVIANDO, LEMBRETE_ENVIADO, LEMBRETE_FALHOU
+)
+
+PRAZO_RESERVA = timedelta(minutes=10)
+JANELA = timedelta(minutes=1)
+LOTE = 50
+ESPERA_OCIOSA = 300     # segundos entre conferências da fila sem nada agendado
+
+
+class FalhaPermanente(Exception):
+    # o enviador levanta quando repetir não adianta (ex.: número inexistente)
+    pass
+
+
+def telefone_whatsapp(telefone):
+    # só dígitos, com o 55 do Brasil quando o número veio sem o código do país
+    digitos = somente_digitos(telefone)
+    if digitos and len(digitos) <= 11:
+        digitos = '55' + digitos
+    return digitos
+
+
+# ---------------- Enviadores ---------------- #
+class EnviadorArquivo:
+    # não envia nada: acrescenta cada mensagem como uma linha JSON num arquivo
+    # (testes e homologação). Um enviador de verdade segue a mesma interface:
+    # recebe a app no construtor e levanta exceção em enviar() se falhar.
+    def __init__(self, app):
+        self.caminho = app.config['LEMBRETES_ARQUIVO'] or os.path.join(app.instance_path, 'lembretes.jsonl')
+        self._lock = threading.Lock()
+
+    def enviar(self, telefone, mensagem):
+        linha = json.dumps({'telefone': telefone, 'mensagem': mensagem, 'em': datetime.now().isoformat()},
+                           ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + '\n')
+
+
+ENVIADORES = {'arquivo': EnviadorArquivo}
+
+
+def carregar_enviador(app):
+    nome = app.config['LEMBRETES_ENVIADOR']
+    if nome in ENVIADORES:
+        return ENVIADORES[nome](app)
+    modulo, _, classe = nome.partition(':')
+    if not classe:
+        raise ValueError(f"LEMBRETES_ENVIADOR inválido: {nome!r} (use 'arquivo' ou 'modulo:Classe')")
+    return getattr(importlib.import_module(modulo), classe)(app)
+
+
+class Limite:
+    # espaça os envios deste processo a 1/`por_minuto` de minuto (0 = sem espera);
+    # o teto entre processos é conferido no banco, em _reservar
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self.proximo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(0.0, self.proximo - agora)
+            self.proximo = max(self.proximo, agora) + self.intervalo
+        if espera:
+            time.sleep(espera)
+
+
+# ---------------- Enfileiramento ---------------- #
+def _campos(agendamento):
+    return {
+        'cliente': agendamento.cliente.nome if agendamento.cliente else '',
+        'data': agendamento.data.strftime('%d/%m/%Y'),
+        'hora': agendamento.hora or '',
+        'servico': agendamento.servico.nome if agendamento.servico else '',
+        'profissional': agendamento.profissional.nome if agendamento.profissional else '',
+    }
+
+
+def enfileirar_lembretes(dia, usuario_id=None):
+    # (enfileirados, sem telefone). Agendamentos do dia que já têm lembrete ficam de fora.
+    consulta = Agendamento.query.options(
+        joinedload(Agendamento.cliente), joinedload(Agendamento.servico), joinedload(Agendamento.profissional)
+    ).filter(Agendamento.data == dia, Agendamento.status == STATUS_AGENDADO)
+    if usuario_id is not None:
+        consulta = consulta.filter(Agendamento.usuario_id == usuario_id)
+    ja_enfileirados = set(db.session.execute(
+        select(Lembrete.agendamento_id).where(Lembrete.dia == dia)).scalars())
+
+    modelo = current_app.config['LEMBRETES_MENSAGEM']
+    agora = datetime.now()
+    linhas, sem_telefone = [], 0
+    for agendamento in consulta.order_by(Agendamento.hora, Agendamento.id):
+        if agendamento.id in ja_enfileirados:
+            continue
+        telefone = telefone_whatsapp(agendamento.cliente.telefone if agendamento.cliente else '')
+        linha = {
+            'agendamento_id': agendamento.id, 'usuario_id': agendamento.usuario_id, 'dia': dia,
+            'telefone': telefone or None, 'mensagem': modelo.format(**_campos(agendamento)),
+            'criado_em': agora, 'tentativas': 0,
+            'status': LEMBRETE_PENDENTE, 'proxima_tentativa': agora, 'erro': None,
+        }
+        if not telefone:
+            # fica no registro, para aparecer quem não foi avisado
+            sem_telefone += 1
+            linha.update(status=LEMBRETE_FALHOU, proxima_tentativa=None, erro='Cliente sem telefone.')
+        linhas.append(linha)
+    if not linhas:
+        return 0, 0
+    try:
+        db.session.execute(insert(Lembrete), linhas)
+        db.session.commit()
+    except IntegrityError:
+        # outro envio enfileirou o mesmo dia ao mesmo tempo
+        db.session.rollback()
+        return 0, 0
+    return len(linhas) - sem_telefone, sem_telefone
+
+
+def despachar():
+    # depois de enfileirar: envia já (LEMBRETES_SINCRONO, testes) ou acorda a thread
+    fila = _fila()
+    if current_app.config['LEMBRETES_SINCRONO']:
+        processar_pendentes(fila.enviador(), fila.limite)
+    else:
+        fila.acordar()
+
+
+# ---------------- Envio ---------------- #
+def _reservar(ident, agora, por_minuto):
+    # True se este processo ficou com o envio; False se outro ficou ou se o limite
+    # por minuto (de todos os processos) já foi atingido
+    tabela = Lembrete.__table__
+    condicoes = [
+        tabela.c.id == ident,
+        tabela.c.status.in_((LEMBRETE_PENDENTE, LEMBRETE_ENVIANDO)),
+        tabela.c.proxima_tentativa <= agora,
+    ]
+    if por_minuto:
+        # a linha de versao_dados fica travada até o commit: uma reserva por vez, e a
+        # contagem de cada uma já vê as anteriores (no PostgreSQL também)
+        incrementar_versoes(db.session.connection(), [tabela.name])
+        recentes = select(func.count()).where(tabela.c.reservado_em > agora - JANELA).scalar_subquery()
+        condicoes.append(recentes < por_minuto)
+    resultado = db.session.execute(tabela.update().where(*condicoes).values(
+        status=LEMBRETE_ENVIANDO, tentativas=tabela.c.tentativas + 1,
+        proxima_tentativa=agora + PRAZO_RESERVA, reservado_em=agora))
+    db.session.commit()
+    return resultado.rowcount == 1
+
+
+def _espera_do_limite(por_minuto):
+    # segundos até vagar um envio no minuto corrente; 0 se o limite não foi atingido
+    if not por_minuto:
+        return 0
+    agora = datetime.now()
+    recentes = db.session.execute(
+        select(Lembrete.reservado_em).where(Lembrete.reservado_em > agora - JANELA)
+        .order_by(Lembrete.reservado_em).limit(por_minuto)
+    ).scalars().all()
+    db.session.commit()
+    if len(recentes) < por_minuto:
+        return 0
+    return max(0.1, (recentes[0] + JANELA - agora).total_seconds())
+
+
+def processar_pendentes(enviador, limite):
+    # envia os lembretes vencidos; devolve quantos foram enviados
+    tentativas = current_app.config['LEMBRETES_TENTATIVAS']
+    espera = current_app.config['LEMBRETES_ESPERA']
+    por_minuto = current_app.config['LEMBRETES_POR_MINUTO']
+    tabela = Lembrete.__table__
+    enviados = 0
+    while True:
+        agora = datetime.now()
+        lote = db.session.execute(
+            select(Lembrete.id, Lembrete.telefone, Lembrete.mensagem, Lembrete.tentativas)
+            .where(Lembrete.status.in_((LEMBRETE_PENDENTE, LEMBRETE_ENVIANDO)),
+                   Lembrete.proxima_tentativa <= agora)
+            .order_by(Lembrete.proxima_tentativa).limit(LOTE)
+        ).all()
+        db.session.commit()
+        if not lote:
+            return enviados
+        for ident, telefone, mensagem, feitas in lote:
+            limite.aguardar()
+            while not (reservado := _reservar(ident, datetime.now(), por_minuto)):
+                pausa = _espera_do_limite(por_minuto)
+                if not pausa:
+                    break       # outro processo ficou com este
+                time.sleep(pausa)
+            if not reservado:
+                continue
+            try:
+                enviador.enviar(telefone, mensagem)
+            except Exception as e:
+                erro = (str(e) or e.__class__.__name__)[:500]
+                if isinstance(e, FalhaPermanente) or feitas + 1 >= tentativas:
+                    valores = {'status': LEMBRETE_FALHOU, 'proxima_tentativa': None, 'erro': erro}
+                else:
+                    proxima = datetime.now() + timedelta(seconds=espera * 2 ** feitas)
+                    valores = {'status': LEMBRETE_PENDENTE, 'proxima_tentativa': proxima, 'erro': erro}
+            else:
+                valores = {'status': LEMBRETE_ENVIADO, 'proxima_tentativa': None, 'erro': None,
+                           'enviado_em': datetime.now()}
+                enviados += 1
+            db.session.execute(tabela.update().where(tabela.c.id == ident).values(**valores))
+            db.session.commit()
+
+
+def _segundos_ate_proximo():
+    proxima = db.session.scalar(select(func.min(Lembrete.proxima_tentativa)).where(
+        Lembrete.status.in_((LEMBRETE_PENDENTE, LEMBRETE_ENVIANDO))))
+    db.session.commit()
+    if proxima is None:
+        return ESPERA_OCIOSA
+    return min(ESPERA_OCIOSA, max(1.0, (proxima - datetime.now()).total_seconds()))
+
+
+# ---------------- Fila por aplicação ---------------- #
+class Fila:
+    # thread de envio, criada no primeiro enfileiramento (depois do fork dos workers)
+    def __init__(self, app):
+        self.app = app
+        self.limite = Limite(app.config['LEMBRETES_POR_MINUTO'])
+        self._enviador = None
+        self._thread = None
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+
+    def enviador(self):
+        with self._lock:
+            if self._enviador is None:
+                self._enviador = carregar_enviador(self.app)
+            return self._enviador
+
+    def acordar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._rodar, name='lembretes', daemon=True)
+                self._thread.start()
+        self._evento.set()
+
+    def _rodar(self):
+        while True:
+            self._evento.clear()
+            with self.app.app_context():
+                try:
+                    processar_pendentes(self.enviador(), self.limite)
+                    espera = _segundos_ate_proximo()
+                except Exception:
+                    self.app.logger.exception('Falha ao enviar lembretes')
+                    db.session.rollback()
+                    espera = 60
+                finally:
+                    db.session.remove()
+            self._evento.wait(espera)
+
+
+def _fila():
+    return current_app.extensions['lembretes']
+
+
+def init_app(app):
+    app.extensions['lembretes'] = Fila(app)
+
+
+@click.command('enviar-lembretes')
+@click.option('--dia', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Data dos agendamentos (padrão: amanhã).')
+@with_appcontext
+def enviar_lembretes_command(dia):
+    """Enfileira os lembretes do dia e envia os pendentes (para o cron)."""
+    dia = dia.date() if dia else date.today() + timedelta(days=1)
+    enfileirados, sem_telefone = enfileirar_lembretes(dia)
+    # no cron não há thread de envio: os pendentes (também os de outros dias) saem aqui
+    fila = _fila()
+    enviados = processar_pendentes(fila.enviador(), fila.limite)
+    click.echo(f'{enfileirados} lembretes para {dia:%d/%m/%Y} ({sem_telefone} clientes sem telefone); '
+               f'{enviados} enviados agora.')
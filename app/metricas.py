@@ -0,0 +1,174 @@
+# app/metricas.py
+# Agregações do dashboard: cada card/gráfico sai de poucas consultas agrupadas,
+# em número fixo, independente do volume de agendamentos, vendas e caixa.
+# `flask verificar-consultas` conta os comandos SQL de calcular_metricas e falha
+# se passarem de CONSULTAS_DASHBOARD.
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, select
+
+from app import db
+from app.models import (
+    Usuario, Servico, Produto, Agendamento, VendaProduto, ResumoDiario, STATUS_CONCLUIDO
+)
+from app.resumo import FORMAS_PAGAMENTO
+
+# resumo (cards, pagamentos e meses), funcionário, serviço e produto
+CONSULTAS_DASHBOARD = 4
+
+
+def add_months(dt, months):
+    y = dt.year + (dt.month - 1 + months) // 12
+    m = (dt.month - 1 + months) % 12 + 1
+    return date(y, m, 1)
+
+
+def ultimos_meses(hoje, quantidade=6):
+    # [(primeiro_dia, ultimo_dia), ...] do mais antigo para o mês atual
+    meses = []
+    for i in range(quantidade - 1, -1, -1):
+        primeiro_dia = add_months(hoje.replace(day=1), -i)
+        ultimo_dia = add_months(primeiro_dia, 1) - timedelta(days=1)
+        meses.append((primeiro_dia, ultimo_dia))
+    return meses
+
+
+def _inicio_dia(d):
+    return datetime.combine(d, datetime.min.time())
+
+
+def _inicio_dia_seguinte(d):
+    # limite exclusivo (< meia-noite do dia seguinte): não depende da precisão
+    # de segundos/microssegundos com que cada banco guarda o DateTime
+    return _inicio_dia(d + timedelta(days=1))
+
+
+def calcular_metricas(data_inicio, data_fim, hoje, usuario_id=None):
+    # Retorna os valores usados por dashboard.html.
+    # usuario_id restringe tudo aos registros do usuário; None = visão de admin.
+    # Os totais por dia/usuário vêm do ResumoDiario; só as quebras por serviço e
+    # por produto, que o resumo não guarda, leem os lançamentos.
+    dt_inicio = _inicio_dia(data_inicio)
+    dt_fim = _inicio_dia_seguinte(data_fim)
+    meses = ultimos_meses(hoje)
+
+    no_periodo = ResumoDiario.dia.between(data_inicio, data_fim)
+
+    def no_periodo_sum(coluna):
+        return func.sum(case((no_periodo, coluna)))
+
+    # ---------------- Cards, formas de pagamento e série mensal ---------------- #
+    colunas = [
+        no_periodo_sum(ResumoDiario.agendamentos),
+        no_periodo_sum(ResumoDiario.receita_servicos - ResumoDiario.custo_servicos),
+    ]
+    colunas += [no_periodo_sum(getattr(ResumoDiario, f'entradas_{forma}')) for forma in FORMAS_PAGAMENTO]
+    colunas.append(no_periodo_sum(ResumoDiario.entradas_outras))
+    for primeiro_dia, ultimo_dia in meses:
+        colunas.append(func.sum(case(
+            (ResumoDiario.dia.between(primeiro_dia, ultimo_dia),
+             ResumoDiario.receita_servicos + ResumoDiario.entradas)
+        )))
+    # Um único intervalo cobrindo período e meses, para a busca seguir pelo índice
+    q = db.session.query(*colunas).filter(ResumoDiario.dia.between(
+        min(data_inicio, meses[0][0]), max(data_fim, meses[-1][1])
+    ))
+    if usuario_id is not None:
+        q = q.filter(ResumoDiario.usuario_id == usuario_id)
+    linha = [v or 0 for v in q.one()]
+    agendamentos, lucro_servicos = linha[0], linha[1]
+    n = len(FORMAS_PAGAMENTO)
+    formas_pagamento = dict(zip(FORMAS_PAGAMENTO, linha[2:2 + n]))
+    if linha[2 + n]:
+        formas_pagamento['outras'] = linha[2 + n]
+    faturamento_mensal = linha[3 + n:]
+
+    # ---------------- Faturamento por funcionário ---------------- #
+    q = db.session.query(
+        Usuario.username,
+        func.sum(ResumoDiario.receita_servicos)
+    ).join(Usuario, Usuario.id == ResumoDiario.usuario_id)\
+     .filter(no_periodo).group_by(Usuario.username)\
+     .having(func.sum(ResumoDiario.agendamentos_concluidos) > 0)
+    if usuario_id is not None:
+        q = q.filter(ResumoDiario.usuario_id == usuario_id)
+    faturamento_funcionario = {nome: valor or 0 for nome, valor in q.all()}
+
+    no_periodo_ag = Agendamento.data.between(data_inicio, data_fim)
+    concluido = Agendamento.status == STATUS_CONCLUIDO
+
+    # ---------------- Faturamento por serviço ---------------- #
+    q = db.session.query(
+        Servico.nome,
+        func.sum(func.coalesce(Agendamento.valor_pago, 0))
+    ).join(Servico, Servico.id == Agendamento.servico_id)\
+     .filter(no_periodo_ag, concluido).group_by(Servico.nome)
+    if usuario_id is not None:
+        q = q.filter(Agendamento.usuario_id == usuario_id)
+    faturamento_servico = {nome: valor or 0 for nome, valor in q.all()}
+
+    # ---------------- Produtos: lucro e faturamento ---------------- #
+    # Produto ainda não tem coluna de custo, então o lucro é a própria receita
+    # das vendas cujo produto ainda existe.
+    no_periodo_venda = (VendaProduto.data >= dt_inicio) & (VendaProduto.data < dt_fim)
+
+    q = db.session.query(
+        Produto.nome,
+        func.sum(func.coalesce(VendaProduto.valor_total, 0))
+    ).join(Produto, Produto.id == VendaProduto.produto_id)\
+     .filter(no_periodo_venda).group_by(Produto.nome)
+    if usuario_id is not None:
+        q = q.filter(VendaProduto.usuario_id == usuario_id)
+    faturamento_produto = {nome: valor or 0 for nome, valor in q.all()}
+    lucro_produtos = sum(faturamento_produto.values())
+
+    total_servicos = sum(faturamento_servico.values())
+    total_produtos = sum(faturamento_produto.values())
+
+    return {
+        'agendamentos': agendamentos,
+        'faturamento_geral': (lucro_servicos or 0) + (lucro_produtos or 0),
+        'faturamento_mensal': faturamento_mensal,
+        'meses': [p.strftime('%b/%Y') for p, _ in meses],
+        'faturamento_funcionario': faturamento_funcionario,
+        'faturamento_servico': faturamento_servico,
+        'faturamento_produto': faturamento_produto,
+        'comparativo_servico_produto': [total_servicos, total_produtos],
+        'formas_pagamento': formas_pagamento,
+    }
+
+
+# ---------------- Verificação ---------------- #
+def contar_consultas(funcao, *args, **kwargs):
+    # quantos comandos SQL a chamada envia ao banco
+    comandos = []
+
+    def contar(conn, cursor, comando, parametros, contexto, executemany):
+        comandos.append(comando)
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        funcao(*args, **kwargs)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return len(comandos)
+
+
+@click.command('verificar-consultas')
+@with_appcontext
+def verificar_consultas_command():
+    """Falha se o dashboard passar de CONSULTAS_DASHBOARD consultas."""
+    hoje = date.today()
+    usuario = db.session.scalar(select(Usuario.id).order_by(Usuario.id).limit(1))
+    falhou = False
+    for usuario_id in (None, usuario):
+        for dias in (0, 30, 365 * 3):
+            total = contar_consultas(calcular_metricas, hoje - timedelta(days=dias), hoje, hoje,
+                                     usuario_id=usuario_id)
+            escopo = 'admin' if usuario_id is None else f'usuário {usuario_id}'
+            click.echo(f'{escopo}, {dias + 1} dias: {total} consultas')
+            falhou = falhou or total > CONSULTAS_DASHBOARD
+    if falhou:
+        click.echo(f'O dashboard passou de {CONSULTAS_DASHBOARD} consultas.', err=True)
+        raise SystemExit(1)
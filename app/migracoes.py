@@ -0,0 +1,362 @@
+# app/migracoes.py
+# Atualização de bancos existentes (instance/site.db) sem perder dados:
+# `flask atualizar-banco` cria tabelas, colunas e índices que faltarem e normaliza dados antigos
+# (status dos agendamentos, valores em reais -> centavos, origem dos lançamentos do caixa).
+# `flask verificar-indices` confere, via EXPLAIN QUERY PLAN sobre uma cópia vazia
+# do schema, que as consultas mais usadas continuam resolvidas por índice.
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Float, MetaData, Numeric, create_engine, select, func, text, bindparam, literal
+from sqlalchemy.schema import CreateTable
+
+from app import db
+from app.dinheiro import Dinheiro
+from app.models import (
+    Cliente, Produto, Servico, OrdemServico, Agendamento, AgendamentoExcluido, MovimentoCaixa, VendaProduto,
+    MovimentacaoEstoque, ResumoDiario, Lembrete,
+    STATUS_AGENDADO, STATUS_AGENDAMENTO, STATUS_CONCLUIDO, normalizar_status, somente_digitos
+)
+from app.paginacao import POR_PAGINA
+from app.resumo import reconstruir_resumo
+
+
+def adicionar_colunas(conn):
+    # create_all também não acrescenta colunas novas a tabelas que já existem
+    inspetor = db.inspect(conn)
+    adicionadas = []
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        existentes = {c['name'] for c in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes:
+                continue
+            ddl = f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {coluna.type.compile(dialect=conn.dialect)}'
+            if not coluna.nullable and coluna.default is not None and coluna.default.is_scalar:
+                valor = literal(coluna.default.arg, coluna.type).compile(
+                    dialect=conn.dialect, compile_kwargs={'literal_binds': True})
+                ddl += f' NOT NULL DEFAULT {valor}'
+            conn.exec_driver_sql(ddl)
+            adicionadas.append(f'{tabela.name}.{coluna.name}')
+    return adicionadas
+
+
+def preencher_telefone_digitos(conn):
+    tabela = Cliente.__table__
+    if not db.inspect(conn).has_table(tabela.name):
+        return 0    # banco novo: o create_all cria a tabela já com a coluna
+    linhas = conn.execute(select(tabela.c.id, tabela.c.telefone).where(
+        tabela.c.telefone_digitos.is_(None), tabela.c.telefone.isnot(None)
+    )).all()
+    valores = [{'b_id': ident, 'b_digitos': somente_digitos(telefone) or None} for ident, telefone in linhas]
+    if valores:
+        conn.execute(tabela.update().where(tabela.c.id == bindparam('b_id'))
+                     .values(telefone_digitos=bindparam('b_digitos')), valores)
+    return len(valores)
+
+
+def criar_indices(conn):
+    # create_all não cria índices novos em tabelas que já existem
+    criados = []
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            if not db.inspect(conn).has_index(tabela.name, indice.name):
+                indice.create(conn)
+                criados.append(indice.name)
+    return criados
+
+
+def normalizar_status_agendamentos(conn):
+    # Status era texto livre ('Concluído', ' concluido ', ...). Lê como texto puro,
+    # já que valores fora do Enum não podem ser carregados pela coluna mapeada.
+    alterados = 0
+    valores = conn.execute(text('SELECT DISTINCT status FROM agendamento')).scalars().all()
+    for valor in valores:
+        if valor in STATUS_AGENDAMENTO:
+            continue
+        if valor is None:
+            resultado = conn.execute(text('UPDATE agendamento SET status = :novo WHERE status IS NULL'),
+                                     {'novo': normalizar_status(valor)})
+        else:
+            resultado = conn.execute(text('UPDATE agendamento SET status = :novo WHERE status = :antigo'),
+                                     {'novo': normalizar_status(valor), 'antigo': valor})
+        alterados += resultado.rowcount
+    return alterados
+
+
+def colunas_em_reais(conn):
+    # {tabela: [colunas Dinheiro que no banco ainda são REAL/FLOAT, em reais]}
+    inspetor = db.inspect(conn)
+    pendentes = {}
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        tipos = {c['name']: c['type'] for c in inspetor.get_columns(tabela.name)}
+        colunas = [c.name for c in tabela.columns
+                   if isinstance(c.type, Dinheiro) and isinstance(tipos.get(c.name), (Float, Numeric))]
+        if colunas:
+            pendentes[tabela] = colunas
+    return pendentes
+
+
+def _centavos(coluna):
+    return f'CAST(ROUND({coluna} * 100) AS INTEGER)'
+
+
+def converter_para_centavos(conn):
+    # Valores em dinheiro eram Float (reais); passam a centavos inteiros. Só
+    # converte colunas ainda REAL, então rodar de novo não multiplica outra vez.
+    pendentes = colunas_em_reais(conn)
+    for tabela, colunas in pendentes.items():
+        if conn.dialect.name != 'sqlite':
+            for coluna in colunas:
+                conn.exec_driver_sql(f'ALTER TABLE {tabela.name} ALTER COLUMN {coluna} '
+                                     f'TYPE INTEGER USING {_centavos(coluna)}')
+            continue
+        # O SQLite não altera o tipo de uma coluna: recria a tabela com o schema
+        # atual, copia convertendo e troca os nomes. Os índices vão junto com a
+        # tabela antiga e criar_indices os refaz em seguida.
+        copia = MetaData()
+        for t in db.metadata.sorted_tables:
+            t.to_metadata(copia)
+        nova = tabela.to_metadata(copia, name=f'{tabela.name}_centavos')
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS {nova.name}')
+        conn.execute(CreateTable(nova))
+        nomes = [c.name for c in tabela.columns]
+        valores = [_centavos(n) if n in colunas else n for n in nomes]
+        conn.exec_driver_sql(f'INSERT INTO {nova.name} ({", ".join(nomes)}) '
+                             f'SELECT {", ".join(valores)} FROM {tabela.name}')
+        conn.exec_driver_sql(f'DROP TABLE {tabela.name}')
+        conn.exec_driver_sql(f'ALTER TABLE {nova.name} RENAME TO {tabela.name}')
+    return [f'{tabela.name}.{coluna}' for tabela, colunas in pendentes.items() for coluna in colunas]
+
+
+def _vincular_por_id_na_descricao(conn, ja_vinculados):
+    # 'Serviço realizado (Agendamento ID:12) - ...' (edição do agendamento)
+    mov, ag = MovimentoCaixa.__table__, Agendamento.__table__
+    candidatos = {}
+    for ident, descricao in conn.execute(
+            select(mov.c.id, mov.c.descricao)
+            .where(mov.c.agendamento_id.is_(None), mov.c.descricao.like('%Agendamento ID:%'))
+            .order_by(mov.c.id)):
+        achado = re.search(r'Agendamento ID:\s*(\d+)', descricao)
+        if achado and int(achado.group(1)) not in ja_vinculados:
+            candidatos.setdefault(int(achado.group(1)), ident)   # repetidos: fica o primeiro
+    ids = list(candidatos)
+    existentes = set()
+    for i in range(0, len(ids), 500):
+        existentes.update(conn.execute(select(ag.c.id).where(ag.c.id.in_(ids[i:i + 500]))).scalars())
+    return {candidatos[agendamento_id]: agendamento_id for agendamento_id in existentes}
+
+
+def _vincular_por_servico(conn, ja_vinculados):
+    # 'Serviço: Corte' (conclusão): só o nome do serviço e o valor. Liga quando há
+    # exatamente um agendamento concluído com o mesmo serviço, valor e dia.
+    mov, ag, servico = MovimentoCaixa.__table__, Agendamento.__table__, Servico.__table__
+    agendamentos = defaultdict(list)
+    for ident, nome, valor, dia in conn.execute(
+            select(ag.c.id, servico.c.nome, ag.c.valor_pago, ag.c.data)
+            .join(servico, servico.c.id == ag.c.servico_id)
+            .where(ag.c.status == STATUS_CONCLUIDO)):
+        if ident not in ja_vinculados:
+            agendamentos[(f'Serviço: {nome}', valor, dia)].append(ident)
+    movimentos = defaultdict(list)
+    for ident, descricao, valor, data in conn.execute(
+            select(mov.c.id, mov.c.descricao, mov.c.valor, mov.c.data)
+            .where(mov.c.agendamento_id.is_(None), mov.c.descricao.like('Serviço: %'))):
+        if data is not None:
+            movimentos[(descricao, valor, data.date())].append(ident)
+    return {idents[0]: agendamentos[chave][0] for chave, idents in movimentos.items()
+            if len(idents) == 1 and len(agendamentos.get(chave, ())) == 1}
+
+
+def vincular_movimentos(conn):
+    # Lançamentos antigos só citavam a origem na descrição. Preenche
+    # movimento_caixa.agendamento_id e venda_produto.movimento_id onde a origem é
+    # identificável sem ambiguidade; os demais ficam sem vínculo. Antes de
+    # criar_indices, que cria o índice único de agendamento_id.
+    mov, venda = MovimentoCaixa.__table__, VendaProduto.__table__
+    ja_vinculados = set(conn.execute(select(mov.c.agendamento_id)
+                                     .where(mov.c.agendamento_id.isnot(None))).scalars())
+    vinculos = _vincular_por_id_na_descricao(conn, ja_vinculados)
+    ja_vinculados.update(vinculos.values())
+    vinculos.update(_vincular_por_servico(conn, ja_vinculados))
+    if vinculos:
+        conn.execute(mov.update().where(mov.c.id == bindparam('b_id'))
+                     .values(agendamento_id=bindparam('b_agendamento')),
+                     [{'b_id': m, 'b_agendamento': a} for m, a in vinculos.items()])
+
+    # vendas: o lançamento do mesmo usuário gravado no mesmo instante
+    m = mov.alias()
+    lancamento = select(func.min(m.c.id)).where(
+        m.c.usuario_id == venda.c.usuario_id, m.c.data == venda.c.data,
+        m.c.descricao.like('Venda de produto%')).scalar_subquery()
+    vendas = conn.execute(venda.update().where(venda.c.movimento_id.is_(None), lancamento.isnot(None))
+                          .values(movimento_id=lancamento)).rowcount
+    return len(vinculos), vendas
+
+
+def atualizar_banco():
+    # colunas antes do create_all: a tabela de busca é preenchida a partir delas
+    conn = db.session.connection()
+    colunas = adicionar_colunas(conn)
+    preencher_telefone_digitos(conn)
+    db.session.commit()
+
+    resumo_existia = db.inspect(db.engine).has_table(ResumoDiario.__tablename__)
+    db.create_all()
+    conn = db.session.connection()
+    status_alterados = normalizar_status_agendamentos(conn)
+    # depois do status: a tabela recriada já tem a restrição do Enum
+    convertidas = converter_para_centavos(conn)
+    vinculados = vincular_movimentos(conn)
+    criados = criar_indices(conn)
+    if criados:
+        # estatísticas novas para o planejador escolher os índices
+        conn.exec_driver_sql('ANALYZE')
+    db.session.commit()
+    if status_alterados or not resumo_existia:
+        # resumo recém-criado ou UPDATEs acima, que não passam pelos listeners
+        reconstruir_resumo()
+    return colunas, convertidas, criados, status_alterados, vinculados
+
+
+# ---------------- Consultas que precisam de índice ---------------- #
+# Listas paginadas sem filtro: percorrem o índice de ordenação inteiro (SCAN ...
+# USING INDEX), mas param no LIMIT da página. Só estas podem ter SCAN no plano.
+VARREDURAS_LIMITADAS = {'caixa: movimentos (admin)', 'estoque: movimentações'}
+
+
+def consultas_quentes():
+    hoje = date.today()
+    inicio = hoje - timedelta(days=30)
+    dt_inicio = datetime.combine(inicio, datetime.min.time())
+    dt_fim = datetime.combine(hoje + timedelta(days=1), datetime.min.time())
+    usuario = 1
+    agendamento = 1
+    return {
+        'dashboard: resumo do período (admin)':
+            select(func.sum(ResumoDiario.entradas)).where(ResumoDiario.dia.between(inicio, hoje)),
+        'dashboard: resumo do período (usuário)':
+            select(func.sum(ResumoDiario.entradas)).where(
+                ResumoDiario.usuario_id == usuario, ResumoDiario.dia.between(inicio, hoje)),
+        'dashboard: agendamentos por serviço (admin)':
+            select(Agendamento.servico_id, func.sum(Agendamento.valor_pago))
+            .where(Agendamento.data.between(inicio, hoje), Agendamento.status == STATUS_CONCLUIDO)
+            .group_by(Agendamento.servico_id),
+        'dashboard: agendamentos por serviço (usuário)':
+            select(Agendamento.servico_id, func.sum(Agendamento.valor_pago))
+            .where(Agendamento.usuario_id == usuario, Agendamento.data.between(inicio, hoje),
+                   Agendamento.status == STATUS_CONCLUIDO)
+            .group_by(Agendamento.servico_id),
+        'dashboard: vendas por produto':
+            select(VendaProduto.produto_id, func.sum(VendaProduto.valor_total))
+            .where(VendaProduto.data >= dt_inicio, VendaProduto.data < dt_fim).group_by(VendaProduto.produto_id),
+        'caixa: entradas do período':
+            select(func.sum(MovimentoCaixa.valor))
+            .where(MovimentoCaixa.tipo == 'entrada', MovimentoCaixa.data >= dt_inicio, MovimentoCaixa.data < dt_fim),
+        'caixa: movimentos do usuário':
+            select(MovimentoCaixa.id).where(MovimentoCaixa.usuario_id == usuario)
+            .order_by(MovimentoCaixa.data.desc()),
+        'caixa: movimentos (admin)':
+            select(MovimentoCaixa.id).order_by(MovimentoCaixa.data.desc()).limit(POR_PAGINA + 1),
+        'despesas':
+            select(MovimentoCaixa.id).where(MovimentoCaixa.tipo == 'saida')
+            .order_by(MovimentoCaixa.data.desc()),
+        'relatório geral':
+            select(MovimentoCaixa.id).where(MovimentoCaixa.data >= dt_inicio, MovimentoCaixa.data < dt_fim)
+            .order_by(MovimentoCaixa.data.asc()),
+        'clientes do usuário':
+            select(Cliente.id).where(Cliente.usuario_id == usuario, Cliente.nome > '')
+            .order_by(Cliente.nome, Cliente.id),
+        'busca de cliente por telefone':
+            select(Cliente.id).where(Cliente.usuario_id == usuario, Cliente.telefone_digitos >= '119',
+                                     Cliente.telefone_digitos < '119:'),
+        'busca de cliente por telefone (admin)':
+            select(Cliente.id).where(Cliente.telefone_digitos >= '119', Cliente.telefone_digitos < '119:'),
+        'produtos do usuário':
+            select(Produto.id).where(Produto.usuario_id == usuario, Produto.nome > '')
+            .order_by(Produto.nome, Produto.id),
+        'ordens de serviço':
+            select(OrdemServico.id).where(OrdemServico.data < dt_fim)
+            .order_by(OrdemServico.data.desc(), OrdemServico.id.desc()),
+        'estoque: movimentações':
+            select(MovimentacaoEstoque.id).order_by(MovimentacaoEstoque.data.desc()).limit(POR_PAGINA + 1),
+        'agenda: horários ocupados dos profissionais':
+            select(Agendamento.hora).where(Agendamento.profissional_id == 1,
+                                           Agendamento.data >= inicio, Agendamento.data <= hoje),
+        'calendário: agendamentos alterados desde uma versão':
+            select(Agendamento.id).where(Agendamento.versao_alteracao > 100),
+        'calendário: agendamentos excluídos desde uma versão':
+            select(AgendamentoExcluido.agendamento_id).where(AgendamentoExcluido.versao > 100),
+        'lembretes: agendamentos do dia':
+            select(Agendamento.id).where(Agendamento.data == hoje, Agendamento.status == STATUS_AGENDADO),
+        'lembretes: fila de envio':
+            select(Lembrete.id).where(Lembrete.status == 'pendente', Lembrete.proxima_tentativa <= dt_fim)
+            .order_by(Lembrete.proxima_tentativa),
+        'lembretes: envios no último minuto':
+            select(func.count()).where(Lembrete.reservado_em > dt_inicio),
+        'lembretes: registro do usuário':
+            select(Lembrete.id).where(Lembrete.usuario_id == usuario).order_by(Lembrete.criado_em.desc()),
+        'caixa: lançamento do agendamento':
+            select(MovimentoCaixa.id).where(MovimentoCaixa.agendamento_id == agendamento),
+        'resumo: recálculo de agendamentos do dia':
+            select(func.count(Agendamento.id)).where(Agendamento.data == hoje, Agendamento.usuario_id == usuario),
+    }
+
+
+def verificar_planos():
+    # {nome: [linhas do plano com SCAN]}. Só busca pelo índice (SEARCH) passa: SCAN
+    # ... USING INDEX também lê o índice inteiro e filtra depois. Exceção: as
+    # VARREDURAS_LIMITADAS, se o SCAN for por índice e a consulta tiver LIMIT. Usa
+    # um SQLite em memória sem estatísticas, para o resultado depender só do schema
+    # e não do volume de dados.
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    problemas = {}
+    with engine.connect() as conn:
+        for nome, consulta in consultas_quentes().items():
+            compilada = consulta.compile(dialect=conn.dialect)
+            parametros = tuple(str(compilada.params[k]) for k in compilada.positiontup)
+            plano = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compilada), parametros).fetchall()
+            limitada = nome in VARREDURAS_LIMITADAS and 'LIMIT' in str(compilada)
+            varreduras = [linha[-1] for linha in plano if linha[-1].startswith('SCAN')
+                          and not (limitada and 'INDEX' in linha[-1])]
+            if varreduras:
+                problemas[nome] = varreduras
+    engine.dispose()
+    return problemas
+
+
+@click.command('atualizar-banco')
+@with_appcontext
+def atualizar_banco_command():
+    """Cria tabelas, colunas e índices que faltam no banco atual."""
+    colunas, convertidas, criados, status_alterados, (agendamentos, vendas) = atualizar_banco()
+    for nome in colunas:
+        click.echo(f'Coluna criada: {nome}')
+    for nome in convertidas:
+        click.echo(f'Convertida para centavos: {nome}')
+    for nome in criados:
+        click.echo(f'Índice criado: {nome}')
+    if status_alterados:
+        click.echo(f'Status normalizado em {status_alterados} agendamentos.')
+    if agendamentos or vendas:
+        click.echo(f'Origem preenchida em {agendamentos} lançamentos de agendamento e {vendas} vendas.')
+    click.echo('Banco atualizado.')
+
+
+@click.command('verificar-indices')
+@with_appcontext
+def verificar_indices_command():
+    """Falha se alguma consulta crítica não for resolvida por busca no índice."""
+    problemas = verificar_planos()
+    for nome, varreduras in problemas.items():
+        click.echo(f'{nome}: {"; ".join(varreduras)}', err=True)
+    if problemas:
+        raise SystemExit(1)
+    click.echo('Todas as consultas usam índice.')
@@ -1,5 +1,8 @@
 from . import db
+from .dinheiro import Dinheiro
 from datetime import datetime
+import unicodedata
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
@@ -7,7 +10,7 @@ from flask_login import UserMixin
 class Usuario(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    senha_hash = db.Column(db.String(128), nullable=False)
+    senha_hash = db.Column(db.String(256), nullable=False)  # scrypt do werkzeug passa de 128
     role = db.Column(db.String(20), default='comum')  # comum ou admin
     last_login = db.Column(db.DateTime, nullable=True)
 
@@ -31,11 +34,23 @@ class Usuario(db.Model, UserMixin):
         return check_password_hash(self.senha_hash, senha)
 
 # ----------------- Clientes ----------------- #
+def somente_digitos(valor):
+    return ''.join(c for c in (valor or '') if c in '0123456789')
+
 class Cliente(db.Model):
+    __table_args__ = (
+        db.Index('ix_cliente_usuario_nome', 'usuario_id', 'nome'),
+        db.Index('ix_cliente_usuario_telefone', 'usuario_id', 'telefone_digitos',
+                 postgresql_ops={'telefone_digitos': 'varchar_pattern_ops'}),
+        db.Index('ix_cliente_telefone', 'telefone_digitos',
+                 postgresql_ops={'telefone_digitos': 'varchar_pattern_ops'}),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     nome = db.Column(db.String(100), nullable=False)
     telefone = db.Column(db.String(20))
+    telefone_digitos = db.Column(db.String(20))  # só os dígitos, para busca por telefone
     email = db.Column(db.String(100))
     observacoes = db.Column(db.Text)
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
@@ -45,6 +60,11 @@ class Cliente(db.Model):
     ordens_servico = db.relationship('OrdemServico', backref='cliente', lazy=True)
     notas_fiscais = db.relationship('NotaFiscal', backref='cliente', lazy=True)
 
+    @validates('telefone')
+    def _validar_telefone(self, chave, valor):
+        self.telefone_digitos = somente_digitos(valor) or None
+        return valor
+
 # ----------------- Profissionais ----------------- #
 class Profissional(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -64,7 +84,8 @@ class Servico(db.Model):
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     nome = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.Text)
-    preco_padrao = db.Column(db.Float)
+    preco_padrao = db.Column(Dinheiro)
+    duracao_minutos = db.Column(db.Integer, nullable=False, default=30)   # ocupa a agenda (app/agenda.py)
 
     agendamentos = db.relationship('Agendamento', backref='servico', lazy=True)
     servicos_realizados = db.relationship('ServicoRealizado', backref='servico', lazy=True)
@@ -72,20 +93,49 @@ class Servico(db.Model):
 
 # ----------------- Produtos ----------------- #
 class Produto(db.Model):
+    __table_args__ = (db.Index('ix_produto_usuario_nome', 'usuario_id', 'nome'),)
+
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     nome = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.Text)
-    preco = db.Column(db.Float, nullable=False)
+    preco = db.Column(Dinheiro, nullable=False)
     quantidade = db.Column(db.Integer, default=0)
     quantidade_minima = db.Column(db.Integer, default=0)
+    # trava otimista: todo UPDATE pelo ORM confere e incrementa; a baixa de
+    # estoque (app/estoque.py) incrementa no mesmo UPDATE condicional
+    versao = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {'version_id_col': versao}
 
     vendas = db.relationship('VendaProduto', backref='produto', lazy=True)
     movimentacoes = db.relationship('MovimentacaoEstoque', backref='produto', lazy=True)
     produtos_usados = db.relationship('ProdutoUsado', backref='produto', lazy=True)
 
 # ----------------- Agendamentos ----------------- #
+STATUS_AGENDADO = 'agendado'
+STATUS_CONCLUIDO = 'concluido'
+STATUS_CANCELADO = 'cancelado'
+STATUS_AGENDAMENTO = (STATUS_AGENDADO, STATUS_CONCLUIDO, STATUS_CANCELADO)
+
+def normalizar_status(valor):
+    # 'Concluído', ' concluido ' etc. -> 'concluido'; vazio ou desconhecido -> 'agendado'
+    texto = unicodedata.normalize('NFKD', valor or '').encode('ascii', 'ignore').decode().strip().lower()
+    if 'conclu' in texto:
+        return STATUS_CONCLUIDO
+    if 'cancel' in texto:
+        return STATUS_CANCELADO
+    return STATUS_AGENDADO
+
 class Agendamento(db.Model):
+    __table_args__ = (
+        db.Index('ix_agendamento_usuario_data_status', 'usuario_id', 'data', 'status'),
+        db.Index('ix_agendamento_data_status', 'data', 'status'),
+        db.Index('ix_agendamento_cliente', 'cliente_id'),
+        db.Index('ix_agendamento_profissional_data', 'profissional_id', 'data'),
+        db.Index('ix_agendamento_versao_alteracao', 'versao_alteracao'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'))
@@ -93,40 +143,73 @@ class Agendamento(db.Model):
     servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'))
     data = db.Column(db.Date)
     hora = db.Column(db.String(10))
-    valor_pago = db.Column(db.Float)
+    valor_pago = db.Column(Dinheiro)
     forma_pagamento = db.Column(db.String(20))
-    status = db.Column(db.String(20), default='agendado')
+    status = db.Column(
+        db.Enum(*STATUS_AGENDAMENTO, name='status_agendamento', native_enum=False,
+                create_constraint=True, length=20),
+        nullable=False, default=STATUS_AGENDADO
+    )
     observacao = db.Column(db.Text)
-    custo = db.Column(db.Float, default=0.0)
+    custo = db.Column(Dinheiro, default=0)
+    # versão de `agendamento` em versao_dados na última alteração (app/calendario.py)
+    versao_alteracao = db.Column(db.Integer, nullable=False, default=0)
+
+    # lançamento no caixa gerado ao concluir (no máximo um por agendamento)
+    movimento_caixa = db.relationship('MovimentoCaixa', backref='agendamento', uselist=False, lazy=True)
+
+    @validates('status')
+    def _validar_status(self, chave, valor):
+        return normalizar_status(valor)
 
 # ----------------- Venda de produtos ----------------- #
 class VendaProduto(db.Model):
+    __table_args__ = (
+        db.Index('ix_venda_produto_usuario_data', 'usuario_id', 'data'),
+        db.Index('ix_venda_produto_data', 'data'),
+        db.Index('ix_venda_produto_produto', 'produto_id'),
+        db.Index('ix_venda_produto_movimento', 'movimento_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'))
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     quantidade = db.Column(db.Integer, nullable=False)
-    valor_unitario = db.Column(db.Float, nullable=False)
+    valor_unitario = db.Column(Dinheiro, nullable=False)
     desconto_percentual = db.Column(db.Float, default=0)
-    valor_total = db.Column(db.Float, nullable=False)
+    valor_total = db.Column(Dinheiro, nullable=False)
     data = db.Column(db.DateTime, default=datetime.utcnow)
+    # lançamento do caixa da venda; uma venda com vários produtos tem um só
+    movimento_id = db.Column(db.Integer, db.ForeignKey('movimento_caixa.id'))
 
 # ----------------- Movimentações de caixa ----------------- #
 class MovimentoCaixa(db.Model):
+    __table_args__ = (
+        db.Index('ix_movimento_caixa_tipo_data_usuario', 'tipo', 'data', 'usuario_id'),
+        db.Index('ix_movimento_caixa_usuario_data', 'usuario_id', 'data'),
+        db.Index('ix_movimento_caixa_data', 'data'),
+        db.Index('ix_movimento_caixa_agendamento', 'agendamento_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     tipo = db.Column(db.String(10))
     forma_pagamento = db.Column(db.String(20))
-    valor = db.Column(db.Float)
+    valor = db.Column(Dinheiro)
     descricao = db.Column(db.String(200))
     data = db.Column(db.DateTime, default=datetime.utcnow)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    # origem do lançamento, em vez de procurar o ID na descrição
+    agendamento_id = db.Column(db.Integer, db.ForeignKey('agendamento.id'))
+
+    vendas = db.relationship('VendaProduto', backref='movimento', lazy=True)
 
 # ----------------- Caixa ----------------- #
 class Caixa(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data_abertura = db.Column(db.DateTime, default=datetime.utcnow)
     data_fechamento = db.Column(db.DateTime, nullable=True)
-    saldo_inicial = db.Column(db.Float, default=0)
-    saldo_final = db.Column(db.Float, default=0)
+    saldo_inicial = db.Column(Dinheiro, default=0)
+    saldo_final = db.Column(Dinheiro, default=0)
     status = db.Column(db.String(10), default='aberto')
     usuario_abertura = db.Column(db.Integer, db.ForeignKey('usuario.id'))
     usuario_fechamento = db.Column(db.Integer, db.ForeignKey('usuario.id'))
@@ -134,6 +217,11 @@ class Caixa(db.Model):
 
 # ----------------- Movimentação de estoque ----------------- #
 class MovimentacaoEstoque(db.Model):
+    __table_args__ = (
+        db.Index('ix_movimentacao_estoque_data', 'data'),
+        db.Index('ix_movimentacao_estoque_produto', 'produto_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'))
     tipo = db.Column(db.String(10))
@@ -149,7 +237,7 @@ class ServicoRealizado(db.Model):
     profissional_id = db.Column(db.Integer, db.ForeignKey('profissional.id'))
     servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'))
     data = db.Column(db.Date)
-    valor_pago = db.Column(db.Float)
+    valor_pago = db.Column(Dinheiro)
     produtos_usados = db.relationship('ProdutoUsado', backref='servico_realizado', lazy=True)
 
 # ----------------- Produtos usados em serviços ----------------- #
@@ -161,6 +249,8 @@ class ProdutoUsado(db.Model):
 
 # ----------------- Ordem de Serviço ----------------- #
 class OrdemServico(db.Model):
+    __table_args__ = (db.Index('ix_ordem_servico_data', 'data'),)
+
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'))
     servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'))
@@ -172,7 +262,7 @@ class OrdemServico(db.Model):
 class NotaFiscal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'))
-    valor_total = db.Column(db.Float)
+    valor_total = db.Column(Dinheiro)
     data_emissao = db.Column(db.DateTime, default=datetime.utcnow)
     descricao = db.Column(db.String(200))
 
@@ -181,7 +271,7 @@ class Transacao(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     tipo = db.Column(db.String(10))
-    valor = db.Column(db.Float)
+    valor = db.Column(Dinheiro)
     descricao = db.Column(db.String(200))
     data = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -190,7 +280,7 @@ class MetaFinanceira(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     titulo = db.Column(db.String(100), nullable=False)
-    valor = db.Column(db.Float, nullable=False)
+    valor = db.Column(Dinheiro, nullable=False)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
 
 # ----------------- Avisos ----------------- #
@@ -199,7 +289,7 @@ class Aviso(db.Model):
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     titulo = db.Column(db.String(100))
     data_vencimento = db.Column(db.Date)
-    valor = db.Column(db.Float)
+    valor = db.Column(Dinheiro)
     tipo = db.Column(db.String(10))
     pago = db.Column(db.Boolean, default=False)
 
@@ -209,3 +299,99 @@ class BackupLog(db.Model):
     data = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(50))
     caminho = db.Column(db.String(200))
+
+# ----------------- Resumo diário (agregado) ----------------- #
+# Mantido por app/resumo.py a cada flush; reconstruído com `flask reconstruir-resumo`.
+class ResumoDiario(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'usuario_id'),
+        db.Index('ix_resumo_diario_usuario_dia', 'usuario_id', 'dia'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+
+    # Agendamentos
+    agendamentos = db.Column(db.Integer, default=0)
+    agendamentos_concluidos = db.Column(db.Integer, default=0)
+    receita_servicos = db.Column(Dinheiro, default=0)
+    custo_servicos = db.Column(Dinheiro, default=0)
+
+    # Caixa
+    entradas = db.Column(Dinheiro, default=0)
+    entradas_pix = db.Column(Dinheiro, default=0)
+    entradas_cartao_debito = db.Column(Dinheiro, default=0)
+    entradas_cartao_credito = db.Column(Dinheiro, default=0)
+    entradas_dinheiro = db.Column(Dinheiro, default=0)
+    entradas_outras = db.Column(Dinheiro, default=0)
+    saidas = db.Column(Dinheiro, default=0)
+
+    # Venda de produtos
+    vendas_produtos = db.Column(db.Integer, default=0)
+    itens_vendidos = db.Column(db.Integer, default=0)
+    receita_produtos = db.Column(Dinheiro, default=0)
+
+# ----------------- Versão dos dados ----------------- #
+# Contador por tabela, incrementado por app/versoes.py a cada flush que a altera.
+class VersaoDados(db.Model):
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# Agendamentos excluídos, para o calendário saber o que sumiu desde uma versão
+# (app/calendario.py). Gravados pelo listener de flush, nunca pela aplicação.
+class AgendamentoExcluido(db.Model):
+    __table_args__ = (
+        db.Index('ix_agendamento_excluido_versao', 'versao'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    agendamento_id = db.Column(db.Integer, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    profissional_id = db.Column(db.Integer)
+    data = db.Column(db.Date)
+    versao = db.Column(db.Integer, nullable=False)
+
+# ----------------- Lembretes ----------------- #
+# Fila e registro de envio dos lembretes de agendamento (app/lembretes.py).
+LEMBRETE_PENDENTE, LEMBRETE_ENVIANDO, LEMBRETE_ENVIADO, LEMBRETE_FALHOU = 'pendente', 'enviando', 'enviado', 'falhou'
+
+
+class Lembrete(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'agendamento_id'),    # no máximo um lembrete por agendamento e dia
+        db.Index('ix_lembrete_status_proxima', 'status', 'proxima_tentativa'),
+        db.Index('ix_lembrete_usuario_criado', 'usuario_id', 'criado_em'),
+        db.Index('ix_lembrete_reservado_em', 'reservado_em'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    agendamento_id = db.Column(db.Integer, db.ForeignKey('agendamento.id', ondelete='SET NULL'))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    dia = db.Column(db.Date, nullable=False)               # data do agendamento
+    telefone = db.Column(db.String(20))
+    mensagem = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=LEMBRETE_PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.String(500))
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    proxima_tentativa = db.Column(db.DateTime)              # enquanto pendente ou enviando
+    reservado_em = db.Column(db.DateTime)                   # última tentativa; conta no limite por minuto
+    enviado_em = db.Column(db.DateTime)
+
+# ----------------- Idempotência ----------------- #
+# Resposta de cada POST de lançamento, pela chave que o cliente mandou (app/idempotencia.py).
+class ChaveIdempotencia(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'chave'),
+        db.Index('ix_chave_idempotencia_criada_em', 'criada_em'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    chave = db.Column(db.String(64), nullable=False)
+    endpoint = db.Column(db.String(100))
+    codigo = db.Column(db.Integer)          # status HTTP gravado; NULL = ainda processando
+    destino = db.Column(db.String(500))     # Location, se a resposta foi um redirect
+    corpo = db.Column(db.Text)              # corpo, se a resposta foi JSON
+    criada_em = db.Column(db.DateTime, default=datetime.utcnow)
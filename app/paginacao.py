@@ -0,0 +1,125 @@
+# app/paginacao.py
+# Paginação por chave (keyset) e filtros aplicados no SQL para as listagens.
+# A página seguinte começa depois do último (coluna, id) exibido, então o custo
+# não cresce com o número de páginas como acontece com OFFSET.
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+from flask import request
+from sqlalchemy import or_, tuple_, literal
+
+from app import db
+
+POR_PAGINA = 50
+CAMPOS_FILTRO = ('data_inicio', 'data_fim', 'q', 'status', 'tipo')
+
+
+class Pagina:
+    def __init__(self, itens, proximo=None, primeira=True):
+        self.itens = itens
+        self.proximo = proximo      # cursor da próxima página (None = última)
+        self.primeira = primeira
+
+
+# ---------------- Cursor ---------------- #
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+
+def _desserializar(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return datetime.fromisoformat(valor['dt'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+    return valor
+
+
+def codificar_cursor(valor, ident):
+    bruto = json.dumps([_serializar(valor), ident]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    # (valor, id) ou None se o cursor estiver ausente ou adulterado
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, ident = json.loads(bruto)
+        return _desserializar(valor), int(ident)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginar(query, coluna, id_coluna, desc=True, cursor=None, por_pagina=POR_PAGINA):
+    # Linhas com a coluna de ordenação nula vêm depois de todas as outras, num
+    # segmento à parte: um OR com IS NULL impediria a busca pelo índice.
+    chave = decodificar_cursor(cursor)
+    ordem_id = id_coluna.desc() if desc else id_coluna.asc()
+    itens = []
+
+    if chave is None or chave[0] is not None:
+        q = query.filter(coluna.isnot(None))
+        if chave is not None:
+            posicao = tuple_(coluna, id_coluna)
+            # valores com o tipo das colunas, para datas serem gravadas no mesmo formato
+            alvo = tuple_(literal(chave[0], coluna.type), literal(chave[1], id_coluna.type))
+            q = q.filter(posicao < alvo if desc else posicao > alvo)
+        ordem = coluna.desc() if desc else coluna.asc()
+        itens = q.order_by(ordem, ordem_id).limit(por_pagina + 1).all()
+
+    if len(itens) <= por_pagina:
+        q = query.filter(coluna.is_(None))
+        if chave is not None and chave[0] is None:
+            q = q.filter(id_coluna < chave[1] if desc else id_coluna > chave[1])
+        itens += q.order_by(ordem_id).limit(por_pagina + 1 - len(itens)).all()
+
+    proximo = None
+    if len(itens) > por_pagina:
+        itens = itens[:por_pagina]
+        ultimo = itens[-1]
+        proximo = codificar_cursor(getattr(ultimo, coluna.key), getattr(ultimo, id_coluna.key))
+    return Pagina(itens, proximo, primeira=chave is None)
+
+
+# ---------------- Filtros ---------------- #
+def ler_filtros():
+    return {campo: (request.args.get(campo) or '').strip() for campo in CAMPOS_FILTRO}
+
+
+def _data(texto):
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def condicoes_periodo(coluna, filtros):
+    inicio = _data(filtros.get('data_inicio'))
+    fim = _data(filtros.get('data_fim'))
+    condicoes = []
+    if isinstance(coluna.type, db.DateTime):
+        if inicio:
+            condicoes.append(coluna >= datetime.combine(inicio, datetime.min.time()))
+        if fim:
+            condicoes.append(coluna < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+    else:
+        if inicio:
+            condicoes.append(coluna >= inicio)
+        if fim:
+            condicoes.append(coluna <= fim)
+    return condicoes
+
+
+def condicao_texto(filtros, *colunas):
+    texto = filtros.get('q')
+    if not texto:
+        return None
+    padrao = f'%{texto}%'
+    return or_(*[c.ilike(padrao) for c in colunas])
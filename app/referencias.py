@@ -0,0 +1,88 @@
+# app/referencias.py
+# Cache das listas dos selects dos formulários (clientes, profissionais, serviços
+# e produtos). Cada lista é guardada por escopo (usuario_id; None = admin, vê
+# tudo) como tuplas (id, nome). A chave leva a versão da tabela (versao_dados):
+# depois de qualquer commit que altere a tabela, todos os processos (workers)
+# passam a errar o cache e releem, sem precisar avisar uns aos outros. A validade
+# (TTL) e o número máximo de listas (LRU) só limitam a memória.
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+
+from app import db
+from app.models import Cliente, Profissional, Servico, Produto
+from app.versoes import versoes
+
+Opcao = namedtuple('Opcao', 'id nome')
+
+MODELOS_REFERENCIA = {
+    'clientes': Cliente,
+    'profissionais': Profissional,
+    'servicos': Servico,
+    'produtos': Produto,
+}
+
+
+class CacheReferencia:
+    def __init__(self, max_entradas=256, ttl=300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl                  # segundos
+        self._dados = OrderedDict()     # chave -> (expira_em, valor), do menos para o mais usado
+        self._lock = threading.Lock()
+
+    def obter(self, chave, carregar):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is not None and item[0] > agora:
+                self._dados.move_to_end(chave)
+                return item[1]
+        # a versão na chave foi lida antes: o valor carregado é no mínimo dela
+        valor = carregar()
+        with self._lock:
+            self._dados[chave] = (agora + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+
+def init_app(app):
+    # um cache por aplicação: instâncias de teste em paralelo não se misturam
+    app.extensions['referencias'] = CacheReferencia(
+        max_entradas=app.config['CACHE_REFERENCIA_MAX'],
+        ttl=app.config['CACHE_REFERENCIA_TTL'],
+    )
+
+
+def _cache():
+    return current_app.extensions['referencias']
+
+
+def opcoes(nome, usuario_id=None, versao=None):
+    # versao: de versoes(), se quem chama já leu (listas_referencia lê todas de uma vez)
+    modelo = MODELOS_REFERENCIA[nome]
+    tabela = modelo.__tablename__
+    if versao is None:
+        versao = versoes(tabela)[tabela]
+
+    def carregar():
+        q = db.session.query(modelo.id, modelo.nome)
+        if usuario_id is not None:
+            q = q.filter(modelo.usuario_id == usuario_id)
+        return tuple(Opcao(*linha) for linha in q.order_by(modelo.nome, modelo.id))
+
+    return _cache().obter((nome, usuario_id, versao), carregar)
+
+
+def listas_referencia(*nomes, usuario_id=None):
+    # {'clientes': (...), ...}, pronto para passar ao render_template
+    atuais = versoes(*(MODELOS_REFERENCIA[nome].__tablename__ for nome in nomes))
+    return {nome: opcoes(nome, usuario_id, atuais[MODELOS_REFERENCIA[nome].__tablename__])
+            for nome in nomes}
@@ -0,0 +1,399 @@
+# app/relatorios.py
+# Geração dos relatórios em PDF fora da requisição. A rota monta o HTML (consultas
+# rápidas) e o xhtml2pdf, que leva segundos em períodos longos, roda num pool de
+# processos. O PDF pronto fica guardado pela chave (tipo, período, escopo, versão
+# dos dados); repetir o mesmo relatório não renderiza de novo enquanto os
+# lançamentos não mudarem.
+# Estado e resultado de cada tarefa ficam em arquivos (RELATORIOS_PASTA, padrão
+# instance/relatorios: <chave>.json e <chave>.pdf), então qualquer worker acompanha
+# e entrega o que outro gerou. A pasta fica abaixo de RELATORIOS_DISCO_MB (saem os
+# PDFs mais antigos) e nada passa de RETENCAO_ARQUIVOS. A memória de cada processo
+# guarda só os PDFs pequenos mais pedidos (RELATORIOS_CACHE_MB); maiores são
+# servidos do arquivo.
+# Relatórios grandes são gerados em partes (enfileirar_em_partes): cada parte vira
+# um PDF separado, gravado em disco, e no fim os PDFs são concatenados depois da
+# página de resumo. A memória fica limitada ao tamanho da parte.
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from flask import current_app, make_response, send_file
+
+from app.versoes import versoes
+
+# tabelas lidas por cada relatório: mudou alguma, muda a chave
+TABELAS_POR_RELATORIO = {
+    'geral': ('movimento_caixa',),
+    'por_cliente': ('agendamento', 'cliente'),
+    'por_servico': ('agendamento', 'servico'),
+}
+
+PENDENTE, PRONTO, ERRO, EXPIRADO = 'pendente', 'pronto', 'erro', 'expirado'
+RETENCAO_ARQUIVOS = 24 * 3600   # segundos que estado e PDF ficam na pasta
+INTERVALO_LIMPEZA = 600
+PRAZO_GERACAO = 30 * 60         # tarefa pendente sem notícia há mais que isso: o worker morreu
+_CHAVE = re.compile(r'[0-9a-f]{32}')
+
+
+def gerar_pdf(html):
+    # roda num processo do pool; o import fica aqui para não pesar nos workers web
+    from xhtml2pdf import pisa
+    pdf = BytesIO()
+    pisa.CreatePDF(html, dest=pdf)
+    return pdf.getvalue()
+
+
+def juntar_pdfs(caminhos):
+    # também roda no pool: concatena os PDFs das partes, na ordem
+    from pypdf import PdfWriter
+    escritor = PdfWriter()
+    for caminho in caminhos:
+        escritor.append(caminho)
+    saida = BytesIO()
+    escritor.write(saida)
+    return saida.getvalue()
+
+
+def resposta_pdf(conteudo, nome_arquivo):
+    response = make_response(conteudo)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'inline; filename={nome_arquivo}'
+    return response
+
+
+# ---------------- Cache dos PDFs ---------------- #
+class CachePdf:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._dados = OrderedDict()     # ident -> bytes, do menos para o mais usado
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def obter(self, ident):
+        with self._lock:
+            conteudo = self._dados.get(ident)
+            if conteudo is not None:
+                self._dados.move_to_end(ident)
+            return conteudo
+
+    def guardar(self, ident, conteudo):
+        # maiores que o limite ficam só no arquivo
+        if len(conteudo) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._dados.pop(ident, None)
+            if anterior is not None:
+                self._total -= len(anterior)
+            self._dados[ident] = conteudo
+            self._total += len(conteudo)
+            while self._total > self.max_bytes:
+                _, removido = self._dados.popitem(last=False)
+                self._total -= len(removido)
+
+
+# ---------------- Tarefas ---------------- #
+class Tarefa:
+    CAMPOS = ('ident', 'usuario_id', 'nome_arquivo', 'origem', 'concluida', 'erro',
+              'partes_total', 'partes_prontas', 'atualizada_em')
+
+    def __init__(self, ident, usuario_id, nome_arquivo, origem=None):
+        self.ident = ident
+        self.usuario_id = usuario_id    # escopo do relatório (None = admin)
+        self.nome_arquivo = nome_arquivo
+        self.origem = origem            # URL que gera o relatório de novo
+        self.concluida = False
+        self.erro = None
+        self.partes_total = None        # só nos relatórios gerados em partes
+        self.partes_prontas = 0
+        self.atualizada_em = time.time()
+
+    def abandonada(self):
+        return not self.concluida and time.time() - self.atualizada_em > PRAZO_GERACAO
+
+
+# ---------------- Estado por aplicação ---------------- #
+# O pool de processos é do processo todo; a pasta e o cache em memória são de cada
+# aplicação (create_app). TesteConfig usa uma pasta temporária por aplicação, para
+# instâncias de teste em paralelo não verem PDFs umas das outras.
+class Registro:
+    def __init__(self, pasta, max_bytes, max_disco):
+        self.pasta = pasta
+        self.cache = CachePdf(max_bytes)
+        self.max_disco = max_disco
+        self._proxima_limpeza = 0.0
+        os.makedirs(pasta, exist_ok=True)
+
+    def caminho(self, ident, extensao):
+        return os.path.join(self.pasta, f'{ident}.{extensao}')
+
+    def _gravar(self, ident, extensao, conteudo):
+        # grava ao lado e troca de uma vez: outro worker nunca lê um arquivo pela metade
+        descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, self.caminho(ident, extensao))
+
+    def gravar_estado(self, tarefa):
+        tarefa.atualizada_em = time.time()
+        dados = {campo: getattr(tarefa, campo) for campo in Tarefa.CAMPOS}
+        self._gravar(tarefa.ident, 'json', json.dumps(dados).encode())
+
+    def ler_estado(self, ident):
+        try:
+            with open(self.caminho(ident, 'json'), encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        tarefa = Tarefa(dados['ident'], dados['usuario_id'], dados['nome_arquivo'])
+        for campo in Tarefa.CAMPOS:
+            setattr(tarefa, campo, dados.get(campo, getattr(tarefa, campo)))
+        return tarefa
+
+    def gravar_pdf(self, ident, conteudo):
+        self._gravar(ident, 'pdf', conteudo)
+        self.cache.guardar(ident, conteudo)
+        self.limpar_antigos(manter=ident)
+
+    def tem_pdf(self, ident):
+        return self.cache.obter(ident) is not None or os.path.exists(self.caminho(ident, 'pdf'))
+
+    def _remover(self, caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass    # outro worker apagou antes
+
+    def limpar_antigos(self, manter=None):
+        # Sem `manter` (ao registrar tarefas) roda no máximo a cada INTERVALO_LIMPEZA;
+        # depois de gravar um PDF (manter = o que acabou de sair) roda sempre, para
+        # a pasta não passar de max_disco.
+        agora = time.time()
+        if manter is None and agora < self._proxima_limpeza:
+            return
+        self._proxima_limpeza = agora + INTERVALO_LIMPEZA
+        grupos = {}     # ident -> [mtime mais recente, bytes, caminhos, tem PDF]
+        total = 0
+        for nome in os.listdir(self.pasta):
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            if agora - info.st_mtime > RETENCAO_ARQUIVOS:
+                self._remover(caminho)
+                continue
+            total += info.st_size
+            ident, extensao = os.path.splitext(nome)
+            if extensao not in ('.pdf', '.json'):
+                continue    # .tmp ainda sendo gravado
+            grupo = grupos.setdefault(ident, [0.0, 0, [], False])
+            grupo[0] = max(grupo[0], info.st_mtime)
+            grupo[1] += info.st_size
+            grupo[2].append(caminho)
+            grupo[3] = grupo[3] or extensao == '.pdf'
+        if total <= self.max_disco:
+            return
+        # saem os PDFs prontos mais antigos, com o estado; tarefas em andamento ficam
+        for ident, (_, tamanho, caminhos, tem_pdf) in sorted(grupos.items(), key=lambda item: item[1][0]):
+            if total <= self.max_disco:
+                break
+            if not tem_pdf or ident == manter:
+                continue
+            for caminho in caminhos:
+                self._remover(caminho)
+            total -= tamanho
+
+
+def init_app(app):
+    pasta = app.config['RELATORIOS_PASTA']
+    if pasta is None:
+        pasta = tempfile.mkdtemp(prefix='relatorios-')
+    elif not pasta:
+        pasta = os.path.join(app.instance_path, 'relatorios')
+    app.extensions['relatorios'] = Registro(pasta, app.config['RELATORIOS_CACHE_MB'] * 1024 * 1024,
+                                            app.config['RELATORIOS_DISCO_MB'] * 1024 * 1024)
+
+
+def _registro():
+    return current_app.extensions['relatorios']
+
+
+_lock = threading.Lock()
+_pool = None
+
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=current_app.config['RELATORIOS_PROCESSOS'])
+        return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def _submeter(funcao, *args):
+    try:
+        return _executor().submit(funcao, *args)
+    except BrokenProcessPool:
+        # um worker morreu (ex.: falta de memória): recria o pool uma vez
+        _descartar_pool()
+        return _executor().submit(funcao, *args)
+
+
+def _sincrono():
+    # testes e ambientes sem multiprocessing
+    return current_app.config['RELATORIOS_SINCRONO']
+
+
+def chave_relatorio(tipo, inicio, fim, usuario_id):
+    # identificador estável da combinação relatório + dados atuais
+    chave = (tipo, str(inicio), str(fim), usuario_id,
+             tuple(sorted(versoes(*TABELAS_POR_RELATORIO[tipo]).items())))
+    return hashlib.sha256(repr(chave).encode()).hexdigest()[:32]
+
+
+def resposta_relatorio(ident, nome_arquivo):
+    # o PDF pronto (da memória ou do arquivo), ou None se ainda não existe
+    registro = _registro()
+    conteudo = registro.cache.obter(ident)
+    if conteudo is not None:
+        return resposta_pdf(conteudo, nome_arquivo)
+    caminho = registro.caminho(ident, 'pdf')
+    try:
+        tamanho = os.path.getsize(caminho)
+        if tamanho > registro.cache.max_bytes:
+            resposta = send_file(caminho, mimetype='application/pdf', download_name=nome_arquivo)
+            resposta.headers['Content-Disposition'] = f'inline; filename={nome_arquivo}'
+            return resposta
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+    except OSError:
+        return None
+    registro.cache.guardar(ident, conteudo)
+    return resposta_pdf(conteudo, nome_arquivo)
+
+
+def _concluir(registro, tarefa, gerar):
+    # pode rodar no callback do pool, fora do app context: recebe o registro pronto
+    try:
+        registro.gravar_pdf(tarefa.ident, gerar())
+    except Exception as e:
+        tarefa.erro = str(e) or e.__class__.__name__
+    tarefa.concluida = True
+    registro.gravar_estado(tarefa)
+
+
+def _registrar(ident, usuario_id, nome_arquivo, origem):
+    # (tarefa, nova). Pedidos iguais enquanto o primeiro roda, neste ou em outro
+    # worker, reaproveitam a mesma tarefa
+    registro = _registro()
+    with _lock:
+        registro.limpar_antigos()
+        tarefa = registro.ler_estado(ident)
+        if tarefa is not None and tarefa.erro is None:
+            if (tarefa.concluida and registro.tem_pdf(ident)) or not (tarefa.concluida or tarefa.abandonada()):
+                return tarefa, False
+        tarefa = Tarefa(ident, usuario_id, nome_arquivo, origem)
+        registro.gravar_estado(tarefa)
+        return tarefa, True
+
+
+def enfileirar(ident, usuario_id, nome_arquivo, html, origem=None):
+    tarefa, nova = _registrar(ident, usuario_id, nome_arquivo, origem)
+    if not nova:
+        return tarefa
+    registro = _registro()
+    if _sincrono():
+        _concluir(registro, tarefa, lambda: gerar_pdf(html))
+        return tarefa
+    futuro = _submeter(gerar_pdf, html)
+    futuro.add_done_callback(lambda f: _concluir(registro, tarefa, f.result))
+    return tarefa
+
+
+def _gerar_em_partes(tarefa, htmls):
+    # Cada HTML vira um PDF gravado numa pasta temporária; no máximo
+    # 2 x RELATORIOS_PROCESSOS partes ficam em memória ao mesmo tempo.
+    em_andamento = 2 * current_app.config['RELATORIOS_PROCESSOS']
+    registro = _registro()
+    with tempfile.TemporaryDirectory(prefix='relatorio-') as pasta:
+        caminhos = []
+        pendentes = deque()
+
+        def gravar(caminho, conteudo):
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            tarefa.partes_prontas += 1
+            registro.gravar_estado(tarefa)   # progresso visível para os outros workers
+
+        for indice, html in enumerate(htmls):
+            caminho = os.path.join(pasta, f'{indice:05d}.pdf')
+            caminhos.append(caminho)
+            if _sincrono():
+                gravar(caminho, gerar_pdf(html))
+                continue
+            pendentes.append((caminho, _submeter(gerar_pdf, html)))
+            while len(pendentes) >= em_andamento:
+                caminho_pronto, futuro = pendentes.popleft()
+                gravar(caminho_pronto, futuro.result())
+        while pendentes:
+            caminho_pronto, futuro = pendentes.popleft()
+            gravar(caminho_pronto, futuro.result())
+
+        if _sincrono():
+            return juntar_pdfs(caminhos)
+        return _submeter(juntar_pdfs, caminhos).result()
+
+
+def enfileirar_em_partes(ident, usuario_id, nome_arquivo, htmls, total_partes, origem=None):
+    # htmls: iterável com o HTML de cada parte, na ordem (resumo primeiro). É
+    # consumido numa thread com app context próprio, então não pode depender
+    # da requisição (current_user, request).
+    tarefa, nova = _registrar(ident, usuario_id, nome_arquivo, origem)
+    if not nova:
+        return tarefa
+    tarefa.partes_total = total_partes
+    registro = _registro()
+    registro.gravar_estado(tarefa)
+    app = current_app._get_current_object()
+
+    def executar():
+        with app.app_context():
+            _concluir(registro, tarefa, lambda: _gerar_em_partes(tarefa, htmls))
+
+    if _sincrono():
+        executar()
+    else:
+        threading.Thread(target=executar, name=f'relatorio-{ident[:8]}', daemon=True).start()
+    return tarefa
+
+
+def obter_tarefa(ident, usuario_id):
+    # só quem tem o mesmo escopo do relatório enxerga a tarefa
+    if not _CHAVE.fullmatch(ident):
+        return None
+    tarefa = _registro().ler_estado(ident)
+    if tarefa is None or tarefa.usuario_id != usuario_id:
+        return None
+    return tarefa
+
+
+def estado(tarefa):
+    if not tarefa.concluida:
+        return EXPIRADO if tarefa.abandonada() else PENDENTE
+    if tarefa.erro is not None:
+        return ERRO
+    return PRONTO if _registro().tem_pdf(tarefa.ident) else EXPIRADO
@@ -0,0 +1,213 @@
+# app/resumo.py
+# Manutenção do ResumoDiario. A cada flush, os pares (dia, usuario_id) tocados por
+# Agendamento, MovimentoCaixa ou VendaProduto são recalculados a partir dos
+# lançamentos daquele dia, na mesma transação. `flask reconstruir-resumo` refaz tudo.
+# A linha do par é travada (upsert) antes da soma: duas transações no mesmo dia e
+# usuário (PostgreSQL) fazem uma depois da outra, e a segunda soma já vê a primeira.
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Date, event, func, case, select, insert, update, delete, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from app import db
+from app.models import (
+    Agendamento, MovimentoCaixa, VendaProduto, Produto, ResumoDiario, STATUS_CONCLUIDO
+)
+
+FORMAS_PAGAMENTO = ['pix', 'cartao_debito', 'cartao_credito', 'dinheiro']
+
+MODELOS_RESUMIDOS = (Agendamento, MovimentoCaixa, VendaProduto)
+
+
+class dia_de(FunctionElement):
+    # parte de data de um DateTime: date(x) no SQLite, CAST(x AS DATE) nos demais
+    type = Date()
+    name = 'dia_de'
+    inherit_cache = True
+
+
+@compiles(dia_de)
+def _dia_de(element, compiler, **kw):
+    return f'CAST({compiler.process(element.clauses, **kw)} AS DATE)'
+
+
+@compiles(dia_de, 'sqlite')
+def _dia_de_sqlite(element, compiler, **kw):
+    # no SQLite o CAST AS DATE vira número (só o ano)
+    return f'date({compiler.process(element.clauses, **kw)})'
+
+
+def _como_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+def _zerado():
+    return {
+        'agendamentos': 0, 'agendamentos_concluidos': 0,
+        'receita_servicos': 0, 'custo_servicos': 0,
+        'entradas': 0, 'entradas_pix': 0, 'entradas_cartao_debito': 0,
+        'entradas_cartao_credito': 0, 'entradas_dinheiro': 0, 'entradas_outras': 0,
+        'saidas': 0,
+        'vendas_produtos': 0, 'itens_vendidos': 0, 'receita_produtos': 0,
+    }
+
+
+def _agregar(conn, dia=None, usuario_id=None):
+    # {(dia, usuario_id): valores}; sem filtros agrega a base inteira
+    resumo = {}
+
+    def linha(d, u):
+        return resumo.setdefault((_como_data(d), u), _zerado())
+
+    def filtro_datetime(coluna):
+        inicio = datetime.combine(dia, datetime.min.time())
+        return [coluna >= inicio, coluna < inicio + timedelta(days=1)]
+
+    concluido = Agendamento.status == STATUS_CONCLUIDO
+
+    # ---------------- Agendamentos ---------------- #
+    q = select(
+        Agendamento.data, Agendamento.usuario_id,
+        func.count(Agendamento.id),
+        func.count(case((concluido, Agendamento.id))),
+        func.sum(case((concluido, func.coalesce(Agendamento.valor_pago, 0)))),
+        func.sum(case((concluido, func.coalesce(Agendamento.custo, 0)))),
+    ).where(Agendamento.data.isnot(None)).group_by(Agendamento.data, Agendamento.usuario_id)
+    if dia is not None:
+        q = q.where(Agendamento.data == dia)
+    if usuario_id is not None:
+        q = q.where(Agendamento.usuario_id == usuario_id)
+    for d, u, total, concluidos, receita, custo in conn.execute(q):
+        r = linha(d, u)
+        r['agendamentos'] = total
+        r['agendamentos_concluidos'] = concluidos
+        r['receita_servicos'] = receita or 0
+        r['custo_servicos'] = custo or 0
+
+    # ---------------- Caixa ---------------- #
+    dia_mov = dia_de(MovimentoCaixa.data)
+    q = select(
+        dia_mov, MovimentoCaixa.usuario_id, MovimentoCaixa.tipo, MovimentoCaixa.forma_pagamento,
+        func.sum(func.coalesce(MovimentoCaixa.valor, 0)),
+    ).where(MovimentoCaixa.data.isnot(None))\
+     .group_by(dia_mov, MovimentoCaixa.usuario_id, MovimentoCaixa.tipo, MovimentoCaixa.forma_pagamento)
+    if dia is not None:
+        q = q.where(*filtro_datetime(MovimentoCaixa.data))
+    if usuario_id is not None:
+        q = q.where(MovimentoCaixa.usuario_id == usuario_id)
+    for d, u, tipo, forma, valor in conn.execute(q):
+        r = linha(d, u)
+        if tipo == 'entrada':
+            r['entradas'] += valor or 0
+            chave = f'entradas_{forma}' if forma in FORMAS_PAGAMENTO else 'entradas_outras'
+            r[chave] += valor or 0
+        elif tipo == 'saida':
+            r['saidas'] += valor or 0
+
+    # ---------------- Venda de produtos ---------------- #
+    # Vendas de produto excluído (produto_id nulo) não entram, como no dashboard.
+    dia_venda = dia_de(VendaProduto.data)
+    q = select(
+        dia_venda, VendaProduto.usuario_id,
+        func.count(VendaProduto.id),
+        func.sum(func.coalesce(VendaProduto.quantidade, 0)),
+        func.sum(func.coalesce(VendaProduto.valor_total, 0)),
+    ).where(VendaProduto.data.isnot(None), VendaProduto.produto_id.isnot(None))\
+     .group_by(dia_venda, VendaProduto.usuario_id)
+    if dia is not None:
+        q = q.where(*filtro_datetime(VendaProduto.data))
+    if usuario_id is not None:
+        q = q.where(VendaProduto.usuario_id == usuario_id)
+    for d, u, vendas, itens, receita in conn.execute(q):
+        r = linha(d, u)
+        r['vendas_produtos'] = vendas
+        r['itens_vendidos'] = itens or 0
+        r['receita_produtos'] = receita or 0
+
+    return {k: v for k, v in resumo.items() if k[1] is not None}
+
+
+# INSERT ... ON CONFLICT de cada banco suportado
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _travar_linha(conn, dia, usuario_id):
+    # cria a linha ou, se já existe, trava; se outra transação acabou de inserir a
+    # mesma, espera o commit dela em vez de falhar na restrição única
+    inserir = UPSERTS[conn.dialect.name](ResumoDiario).values(dia=dia, usuario_id=usuario_id, **_zerado())
+    conn.execute(inserir.on_conflict_do_update(
+        index_elements=['dia', 'usuario_id'], set_={'dia': inserir.excluded.dia}))
+
+
+def recalcular_dia(conn, dia, usuario_id):
+    _travar_linha(conn, dia, usuario_id)
+    par = [ResumoDiario.dia == dia, ResumoDiario.usuario_id == usuario_id]
+    valores = _agregar(conn, dia=dia, usuario_id=usuario_id).get((dia, usuario_id))
+    if valores:
+        conn.execute(update(ResumoDiario).where(*par).values(**valores))
+    else:
+        conn.execute(delete(ResumoDiario).where(*par))
+
+
+def reconstruir_resumo():
+    conn = db.session.connection()
+    conn.execute(delete(ResumoDiario))
+    linhas = [dict(dia=d, usuario_id=u, **valores) for (d, u), valores in _agregar(conn).items()]
+    if linhas:
+        conn.execute(insert(ResumoDiario), linhas)
+    db.session.commit()
+    return len(linhas)
+
+
+# ---------------- Manutenção incremental ---------------- #
+def _chaves(obj):
+    # (dia, usuario_id) atual e, se o registro foi editado, os anteriores
+    estado = inspect(obj)
+    dias = [obj.data] + list(estado.attrs.data.history.deleted)
+    usuarios = [obj.usuario_id] + list(estado.attrs.usuario_id.history.deleted)
+    return {
+        (_como_data(d), u)
+        for d in dias if d is not None
+        for u in usuarios if u is not None
+    }
+
+
+@event.listens_for(Session, 'before_flush')
+def _resumo_before_flush(session, flush_context, instances):
+    # Excluir um produto anula produto_id das vendas durante o flush, fora de session.dirty
+    pendentes = session.info.setdefault('resumo_pendente', set())
+    for obj in session.deleted:
+        if isinstance(obj, Produto):
+            for venda in obj.vendas:
+                pendentes |= _chaves(venda)
+
+
+@event.listens_for(Session, 'after_flush')
+def _resumo_after_flush(session, flush_context):
+    pendentes = session.info.pop('resumo_pendente', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, MODELOS_RESUMIDOS):
+            pendentes |= _chaves(obj)
+    if not pendentes:
+        return
+    conn = session.connection()
+    for dia, usuario_id in pendentes:
+        recalcular_dia(conn, dia, usuario_id)
+
+
+@click.command('reconstruir-resumo')
+@with_appcontext
+def reconstruir_resumo_command():
+    """Recalcula todo o ResumoDiario a partir dos lançamentos (backfill)."""
+    db.create_all()
+    total = reconstruir_resumo()
+    click.echo(f'Resumo diário reconstruído: {total} linhas.')
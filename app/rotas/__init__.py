@@ -0,0 +1,12 @@
+# app/rotas/__init__.py
+# Blueprints por área do sistema, registrados em create_app (app/__init__.py).
+from app.rotas import principal, cadastros, agendamentos, estoque, caixa, relatorios
+
+BLUEPRINTS = (
+    principal.bp,
+    cadastros.bp,
+    agendamentos.bp,
+    estoque.bp,
+    caixa.bp,
+    relatorios.bp,
+)
@@ -0,0 +1,400 @@
+# app/rotas/agendamentos.py
+# Agendamentos, ordens de serviço e lembretes aos clientes.
+from urllib.parse import quote
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import (
+    Cliente, Agendamento, Lembrete, MovimentoCaixa, OrdemServico, Profissional, Servico, STATUS_CONCLUIDO,
+    STATUS_AGENDAMENTO
+)
+from app.agenda import conflito, disponibilidade, formatar_hora, DURACAO_PADRAO
+from app import calendario
+from app.lembretes import enfileirar_lembretes, despachar, telefone_whatsapp
+from app.dinheiro import ler_dinheiro
+from app.paginacao import paginar, ler_filtros, condicoes_periodo, condicao_texto
+from app.carregamento import orcamento_lazy_loads
+from app.referencias import listas_referencia
+from app.idempotencia import idempotente
+
+bp = Blueprint('agendamentos', __name__)
+
+
+# ---------------- ORDENS DE SERVIÇO ---------------- #
+@bp.route('/ordens')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_ordens():
+    filtros = ler_filtros()
+    query = OrdemServico.query.filter(*condicoes_periodo(OrdemServico.data, filtros))\
+        .options(joinedload(OrdemServico.cliente), joinedload(OrdemServico.servico))
+    if filtros['status']:
+        query = query.filter(OrdemServico.status == filtros['status'])
+    texto = condicao_texto(filtros, OrdemServico.descricao)
+    if texto is not None:
+        query = query.filter(texto)
+    pagina = paginar(query, OrdemServico.data, OrdemServico.id, cursor=request.args.get('cursor'))
+    return render_template('ordens/listar.html', ordens=pagina.itens, pagina=pagina, filtros=filtros)
+
+
+@bp.route('/ordens/nova', methods=['GET', 'POST'])
+@login_required
+def nova_ordem():
+    listas = listas_referencia('servicos', usuario_id=None if current_user.role == 'admin' else current_user.id)
+    if request.method == 'POST':
+        ordem = OrdemServico(
+            cliente_id=request.form.get('cliente_id'),
+            servico_id=request.form.get('servico_id'),
+            descricao=request.form.get('descricao', '').strip(),
+            status=request.form.get('status', '').strip()
+        )
+        try:
+            db.session.add(ordem)
+            db.session.commit()
+            flash("Ordem de serviço criada!", "success")
+            return redirect(url_for('agendamentos.listar_ordens'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao criar ordem: {e}", "danger")
+    return render_template('ordens/form.html', ordem=None, **listas)
+
+
+@bp.route('/ordens/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_ordem(id):
+    ordem = OrdemServico.query.get_or_404(id)
+    listas = listas_referencia('servicos', usuario_id=None if current_user.role == 'admin' else current_user.id)
+    if request.method == 'POST':
+        ordem.cliente_id = request.form.get('cliente_id')
+        ordem.servico_id = request.form.get('servico_id')
+        ordem.descricao = request.form.get('descricao', '').strip()
+        ordem.status = request.form.get('status', '').strip()
+        try:
+            db.session.commit()
+            flash("Ordem de serviço atualizada!", "success")
+            return redirect(url_for('agendamentos.listar_ordens'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar ordem: {e}", "danger")
+    return render_template('ordens/form.html', ordem=ordem, **listas)
+
+
+@bp.route('/ordens/excluir/<int:id>')
+@login_required
+def excluir_ordem(id):
+    ordem = OrdemServico.query.get_or_404(id)
+    try:
+        db.session.delete(ordem)
+        db.session.commit()
+        flash("Ordem de serviço excluída!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir ordem: {e}", "danger")
+    return redirect(url_for('agendamentos.listar_ordens'))
+
+
+# ---------------- LEMBRETE ---------------- #
+@bp.route('/enviar-lembrete/<int:cliente_id>')
+@login_required
+def enviar_lembrete(cliente_id):
+    cliente = Cliente.query.get_or_404(cliente_id)
+    mensagem = f"Olá, {cliente.nome}! Lembrete: você tem um agendamento em breve no nosso salão."
+    url_whatsapp = f"https://api.whatsapp.com/send?phone={telefone_whatsapp(cliente.telefone)}&text={quote(mensagem)}"
+    return redirect(url_whatsapp)
+
+
+@bp.route('/lembretes')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_lembretes():
+    # registro de entrega: fila, enviados e falhas
+    filtros = ler_filtros()
+    query = Lembrete.query.filter(*condicoes_periodo(Lembrete.dia, filtros))
+    if current_user.role != 'admin':
+        query = query.filter(Lembrete.usuario_id == current_user.id)
+    if filtros['status']:
+        query = query.filter(Lembrete.status == filtros['status'])
+    pagina = paginar(query, Lembrete.criado_em, Lembrete.id, cursor=request.args.get('cursor'))
+    amanha = date.today() + timedelta(days=1)
+    return render_template('lembretes/listar.html', lembretes=pagina.itens, pagina=pagina, filtros=filtros,
+                           amanha=amanha)
+
+
+@bp.route('/lembretes/enfileirar', methods=['POST'])
+@login_required
+def enfileirar_lembretes_dia():
+    # todos os agendamentos do dia (padrão amanhã) de uma vez, enviados em segundo plano
+    try:
+        dia = datetime.strptime(request.form['dia'], "%Y-%m-%d").date() \
+            if request.form.get('dia') else date.today() + timedelta(days=1)
+    except ValueError:
+        flash("Data inválida.", "danger")
+        return redirect(url_for('agendamentos.listar_lembretes'))
+    enfileirados, sem_telefone = enfileirar_lembretes(
+        dia, usuario_id=None if current_user.role == 'admin' else current_user.id)
+    if enfileirados:
+        despachar()
+    mensagem = f"{enfileirados} lembretes de {dia.strftime('%d/%m/%Y')} na fila de envio."
+    if sem_telefone:
+        mensagem += f" {sem_telefone} clientes sem telefone."
+    flash(mensagem, "success" if enfileirados else "info")
+    return redirect(url_for('agendamentos.listar_lembretes'))
+
+
+# ---------------- AGENDAMENTOS ---------------- #
+@bp.route('/agendamentos')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_agendamentos():
+    # admin vê tudo, usuário comum só os seus
+    filtros = ler_filtros()
+    query = Agendamento.query.options(
+        joinedload(Agendamento.cliente), joinedload(Agendamento.profissional), joinedload(Agendamento.servico)
+    )
+    if current_user.role != 'admin':
+        query = query.filter(Agendamento.usuario_id == current_user.id)
+    query = query.filter(*condicoes_periodo(Agendamento.data, filtros))
+    if filtros['status'] in STATUS_AGENDAMENTO:
+        query = query.filter(Agendamento.status == filtros['status'])
+    texto = condicao_texto(filtros, Cliente.nome)
+    if texto is not None:
+        query = query.join(Cliente, Cliente.id == Agendamento.cliente_id).filter(texto)
+    pagina = paginar(query, Agendamento.data, Agendamento.id, cursor=request.args.get('cursor'))
+    agendamentos = pagina.itens
+    listas = listas_referencia('profissionais', 'servicos',
+                               usuario_id=None if current_user.role == 'admin' else current_user.id)
+    return render_template('agendamentos/listar.html', agendamentos=agendamentos, pagina=pagina, filtros=filtros, **listas)
+
+
+@bp.route('/agendamentos/novo', methods=['GET', 'POST'])
+@login_required
+def novo_agendamento():
+    listas = listas_referencia('profissionais', 'servicos',
+                               usuario_id=None if current_user.role == 'admin' else current_user.id)
+    if request.method == 'POST':
+        try:
+            data_str = request.form.get('data')
+            data_convertida = datetime.strptime(data_str, "%Y-%m-%d").date() if data_str else None
+            ag = Agendamento(
+                usuario_id=current_user.id,  # atribui usuário logado
+                cliente_id=request.form.get('cliente_id'),
+                profissional_id=request.form.get('profissional_id'),
+                servico_id=request.form.get('servico_id'),
+                data=data_convertida,
+                hora=request.form.get('hora'),
+                valor_pago=ler_dinheiro(request.form.get('valor_pago', '0')),
+                status=request.form.get('status', ''),
+                observacao=request.form.get('observacao', '').strip(),
+                forma_pagamento=request.form.get('forma_pagamento', '').strip()
+            )
+            db.session.add(ag)
+            if conflito(ag):
+                db.session.rollback()
+                flash("O profissional já tem um agendamento nesse horário.", "warning")
+                return render_template('agendamentos/form.html', agendamento=None, **listas)
+            db.session.commit()
+            flash("Agendamento criado!", "success")
+            return redirect(url_for('agendamentos.listar_agendamentos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao criar agendamento. Verifique os dados. ({e})", "danger")
+    return render_template('agendamentos/form.html', agendamento=None, **listas)
+
+
+def _ler_periodo():
+    # ?inicio=AAAA-MM-DD (padrão hoje) e ?dias= (padrão 7); ValueError se inválidos
+    inicio = datetime.strptime(request.args['inicio'], "%Y-%m-%d").date() \
+        if request.args.get('inicio') else date.today()
+    return inicio, int(request.args.get('dias', 7))
+
+
+@bp.route('/agendamentos/disponibilidade')
+@login_required
+def disponibilidade_agenda():
+    # horários livres em JSON: ?inicio=AAAA-MM-DD&dias=7&servico_id=&profissional_id=&passo=
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    try:
+        inicio, dias = _ler_periodo()
+        passo = int(request.args.get('passo', current_app.config['AGENDA_PASSO_MINUTOS']))
+    except ValueError:
+        return jsonify({'erro': 'Parâmetros inválidos.'}), 400
+    if not 1 <= dias <= 31 or passo < 5:
+        return jsonify({'erro': 'Use de 1 a 31 dias e passo de pelo menos 5 minutos.'}), 400
+
+    duracao = DURACAO_PADRAO
+    servico_id = request.args.get('servico_id', type=int)
+    if servico_id:
+        servicos = Servico.query.filter_by(id=servico_id)
+        if usuario_id is not None:
+            servicos = servicos.filter_by(usuario_id=usuario_id)
+        duracao = servicos.first_or_404().duracao_minutos or DURACAO_PADRAO
+
+    profissionais = Profissional.query
+    if usuario_id is not None:
+        profissionais = profissionais.filter_by(usuario_id=usuario_id)
+    profissional_id = request.args.get('profissional_id', type=int)
+    if profissional_id:
+        profissionais = profissionais.filter_by(id=profissional_id)
+    livres = disponibilidade(profissionais.order_by(Profissional.nome).all(), inicio, dias, duracao, passo)
+    return jsonify({
+        'inicio': inicio.isoformat(),
+        'dias': dias,
+        'duracao': duracao,
+        'profissionais': [
+            {'id': p.id, 'nome': p.nome,
+             'horarios': {dia.isoformat(): [formatar_hora(m) for m in inicios] for dia, inicios in por_dia.items()}}
+            for p, por_dia in livres.items()
+        ],
+    })
+
+
+@bp.route('/agendamentos/calendario')
+@login_required
+@orcamento_lazy_loads(0)
+def calendario_agenda():
+    # agendamentos do período em JSON: ?inicio=AAAA-MM-DD&dias=7&profissional_id=&desde=
+    # Com ?desde=<versao da resposta anterior> vêm só os alterados e os ids removidos.
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    try:
+        inicio, dias = _ler_periodo()
+        desde = int(request.args['desde']) if request.args.get('desde') else None
+    except ValueError:
+        return jsonify({'erro': 'Parâmetros inválidos.'}), 400
+    if not 1 <= dias <= 31:
+        return jsonify({'erro': 'Use de 1 a 31 dias.'}), 400
+    fim = inicio + timedelta(days=dias - 1)
+    profissional_id = request.args.get('profissional_id', type=int)
+
+    atuais = calendario.versoes_calendario()
+    versao = atuais[calendario.TABELA]
+    if desde is not None and desde > versao:
+        desde = None    # versão de outro banco (restaurado, recriado): manda tudo
+    etag = calendario.etag(atuais, usuario_id, inicio, fim, profissional_id, desde)
+    if request.if_none_match.contains(etag):
+        resposta = current_app.response_class(status=304)
+    elif desde is None:
+        agendamentos = calendario.agendamentos_do_periodo(inicio, fim, usuario_id, profissional_id)
+        resposta = jsonify({
+            'versao': versao, 'inicio': inicio.isoformat(), 'fim': fim.isoformat(), 'completo': True,
+            'agendamentos': [calendario.como_dict(a) for a in agendamentos],
+        })
+    else:
+        alterados, removidos = calendario.alteracoes_desde(desde, inicio, fim, usuario_id, profissional_id)
+        resposta = jsonify({
+            'versao': versao, 'inicio': inicio.isoformat(), 'fim': fim.isoformat(), 'completo': False,
+            'desde': desde, 'agendamentos': [calendario.como_dict(a) for a in alterados], 'removidos': removidos,
+        })
+    # o navegador sempre confere com o servidor, mandando If-None-Match
+    resposta.set_etag(etag)
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    return resposta
+
+
+@bp.route('/agendamentos/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_agendamento(id):
+    agendamento = Agendamento.query.get_or_404(id)
+    # permissão: só dono ou admin
+    if agendamento.usuario_id != current_user.id and current_user.role != 'admin':
+        flash("Você não tem permissão para editar este agendamento.", "danger")
+        return redirect(url_for('agendamentos.listar_agendamentos'))
+
+    listas = listas_referencia('profissionais', 'servicos',
+                               usuario_id=None if current_user.role == 'admin' else current_user.id)
+    if request.method == 'POST':
+        try:
+            agendamento.status = request.form.get('status', '')
+            agendamento.cliente_id = request.form.get('cliente_id')
+            agendamento.profissional_id = request.form.get('profissional_id')
+            agendamento.servico_id = request.form.get('servico_id')
+            data_str = request.form.get('data')
+            agendamento.data = datetime.strptime(data_str, "%Y-%m-%d").date() if data_str else agendamento.data
+            agendamento.hora = request.form.get('hora')
+            agendamento.valor_pago = ler_dinheiro(request.form.get('valor_pago', '0'))
+            agendamento.observacao = request.form.get('observacao', '').strip()
+            agendamento.forma_pagamento = request.form.get('forma_pagamento', '').strip()
+            if conflito(agendamento):
+                db.session.rollback()
+                flash("O profissional já tem um agendamento nesse horário.", "warning")
+                return render_template('agendamentos/form.html', agendamento=agendamento, **listas)
+
+            # cria movimento no caixa caso mude para concluído
+            if agendamento.status == STATUS_CONCLUIDO:
+                _lancar_no_caixa(agendamento, f"Serviço realizado (Agendamento ID:{agendamento.id}) - "
+                                              f"Cliente: {getattr(agendamento.cliente, 'nome', '')}")
+
+            db.session.commit()
+            flash("Agendamento atualizado com sucesso!", "success")
+            return redirect(url_for('agendamentos.listar_agendamentos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar agendamento: {e}", "danger")
+    return render_template('agendamentos/form.html', agendamento=agendamento, **listas)
+
+
+def _lancar_no_caixa(agendamento, descricao):
+    # busca pelo índice único de agendamento_id; se já existe, não duplica
+    if MovimentoCaixa.query.filter_by(agendamento_id=agendamento.id).first() is None:
+        db.session.add(MovimentoCaixa(
+            tipo='entrada',
+            forma_pagamento=agendamento.forma_pagamento,
+            valor=agendamento.valor_pago or 0,
+            descricao=descricao,
+            data=datetime.now(),
+            usuario_id=agendamento.usuario_id,
+            agendamento_id=agendamento.id,
+        ))
+
+
+@bp.route('/agendamentos/excluir/<int:id>')
+@login_required
+def excluir_agendamento(id):
+    agendamento = Agendamento.query.get_or_404(id)
+    if agendamento.usuario_id != current_user.id and current_user.role != 'admin':
+        flash("Você não tem permissão para excluir este agendamento.", "danger")
+        return redirect(url_for('agendamentos.listar_agendamentos'))
+    try:
+        db.session.delete(agendamento)
+        db.session.commit()
+        flash("Agendamento excluído com sucesso!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir agendamento: {e}", "danger")
+    return redirect(url_for('agendamentos.listar_agendamentos'))
+
+
+@bp.route('/agendamento/concluir/<int:id>', methods=['GET', 'POST'])
+@login_required
+@idempotente
+def concluir_agendamento(id):
+    agendamento = Agendamento.query.get_or_404(id)
+    if agendamento.usuario_id != current_user.id and current_user.role != 'admin':
+        flash("Você não tem permissão para concluir este agendamento.", "danger")
+        return redirect(url_for('agendamentos.listar_agendamentos'))
+
+    if request.method == 'POST':
+        try:
+            valor_pago = ler_dinheiro(request.form.get('valor_pago', '0'))
+            forma_pagamento = request.form.get('forma_pagamento', '')
+
+            # Atualiza status do agendamento
+            agendamento.status = STATUS_CONCLUIDO
+            agendamento.valor_pago = valor_pago
+            agendamento.forma_pagamento = forma_pagamento
+
+            # no máximo uma entrada no caixa por agendamento
+            _lancar_no_caixa(agendamento, f"Serviço: {getattr(agendamento.servico, 'nome', '')}")
+
+            db.session.commit()
+            flash('Agendamento concluído e registrado no caixa!', 'success')
+            return redirect(url_for('agendamentos.listar_agendamentos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao concluir agendamento: {e}', 'danger')
+
+    return render_template('agendamentos/concluir.html', agendamento=agendamento)
@@ -0,0 +1,256 @@
+# app/rotas/cadastros.py
+# Cadastros básicos: clientes, profissionais e serviços.
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
+
+from app import db
+from app.models import Cliente, Profissional, Agendamento, MovimentoCaixa, Servico
+from app.dinheiro import ler_dinheiro
+from app.paginacao import POR_PAGINA, paginar, ler_filtros, condicao_texto
+from app.totais import totais_caixa
+from app.carregamento import orcamento_lazy_loads
+from app.busca import buscar_clientes, LIMITE_PADRAO
+
+bp = Blueprint('cadastros', __name__)
+
+
+# ---------------- CLIENTES ---------------- #
+@bp.route('/clientes')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_clientes():
+    filtros = ler_filtros()
+    # o card de cada cliente lista os agendamentos e o serviço de cada um
+    query = Cliente.query.filter_by(usuario_id=current_user.id)\
+        .options(selectinload(Cliente.agendamentos).joinedload(Agendamento.servico))
+    texto = condicao_texto(filtros, Cliente.nome, Cliente.telefone, Cliente.email)
+    if texto is not None:
+        query = query.filter(texto)
+    pagina = paginar(query, Cliente.nome, Cliente.id, desc=False, cursor=request.args.get('cursor'))
+
+    profissionais = Profissional.query.filter_by(usuario_id=current_user.id).all()
+    servicos = Servico.query.filter_by(usuario_id=current_user.id).all()
+
+    # Só as despesas mais recentes; a lista completa fica em /despesas
+    filtro_despesas = (MovimentoCaixa.usuario_id == current_user.id, MovimentoCaixa.tipo == 'saida')
+    despesas = MovimentoCaixa.query.filter(*filtro_despesas)\
+        .order_by(MovimentoCaixa.data.desc(), MovimentoCaixa.id.desc()).limit(POR_PAGINA).all()
+    total_despesas = totais_caixa(usuario_id=current_user.id, condicoes=filtro_despesas)['saidas']
+
+    return render_template('clientes/listar.html',
+                           clientes=pagina.itens,
+                           pagina=pagina,
+                           filtros=filtros,
+                           profissionais=profissionais,
+                           servicos=servicos,
+                           despesas=despesas,
+                           total_despesas=total_despesas)
+
+@bp.route('/clientes/buscar')
+@login_required
+def buscar_clientes_json():
+    # autocompletar de cliente nos formulários de agendamento e ordem de serviço
+    limite = min(request.args.get('limite', LIMITE_PADRAO, type=int), 50)
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    return jsonify(buscar_clientes(request.args.get('q', ''), usuario_id=usuario_id, limite=limite))
+
+@bp.route('/clientes/novo', methods=['GET', 'POST'])
+@login_required
+def novo_cliente():
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        telefone = request.form.get('telefone', '').strip()
+        email = request.form.get('email', '').strip()
+        observacoes = request.form.get('observacoes', '').strip()
+        if not nome or not telefone:
+            flash("Nome e telefone são obrigatórios.", "warning")
+            return render_template('clientes/form.html', cliente=None)
+        cliente = Cliente(
+            nome=nome, 
+            telefone=telefone, 
+            email=email, 
+            observacoes=observacoes,
+            usuario_id=current_user.id
+        )
+        try:
+            db.session.add(cliente)
+            db.session.commit()
+            flash("Cliente cadastrado com sucesso!", "success")
+            return redirect(url_for('cadastros.listar_clientes'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao cadastrar cliente: {e}", "danger")
+    return render_template('clientes/form.html', cliente=None)
+
+@bp.route('/clientes/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_cliente(id):
+    cliente = Cliente.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    if request.method == 'POST':
+        cliente.nome = request.form.get('nome', '').strip()
+        cliente.telefone = request.form.get('telefone', '').strip()
+        cliente.email = request.form.get('email', '').strip()
+        cliente.observacoes = request.form.get('observacoes', '').strip()
+        try:
+            db.session.commit()
+            flash("Cliente atualizado com sucesso!", "success")
+            return redirect(url_for('cadastros.listar_clientes'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar cliente: {e}", "danger")
+    return render_template('clientes/form.html', cliente=cliente)
+
+@bp.route('/clientes/excluir/<int:id>')
+@login_required
+def excluir_cliente(id):
+    cliente = Cliente.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    try:
+        db.session.delete(cliente)
+        db.session.commit()
+        flash("Cliente excluído com sucesso!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir cliente: {e}", "danger")
+    return redirect(url_for('cadastros.listar_clientes'))
+
+
+# ---------------- PROFISSIONAIS ---------------- #
+@bp.route('/profissionais')
+@login_required
+def listar_profissionais():
+    profissionais = Profissional.query.filter_by(usuario_id=current_user.id).all()
+    return render_template('profissionais/listar.html', profissionais=profissionais)
+
+@bp.route('/profissionais/novo', methods=['GET', 'POST'])
+@login_required
+def novo_profissional():
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        especialidades = request.form.get('especialidades', '').strip()
+        disponibilidade = request.form.get('disponibilidade', '').strip()
+        contato = request.form.get('contato', '').strip()
+        if not nome:
+            flash("Nome é obrigatório.", "warning")
+            return render_template('profissionais/form.html', profissional=None)
+        prof = Profissional(
+            nome=nome, 
+            especialidades=especialidades, 
+            disponibilidade=disponibilidade, 
+            contato=contato,
+            usuario_id=current_user.id
+        )
+        try:
+            db.session.add(prof)
+            db.session.commit()
+            flash("Profissional cadastrado!", "success")
+            return redirect(url_for('cadastros.listar_profissionais'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao cadastrar profissional: {e}", "danger")
+    return render_template('profissionais/form.html', profissional=None)
+
+@bp.route('/profissionais/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_profissional(id):
+    profissional = Profissional.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    if request.method == 'POST':
+        profissional.nome = request.form.get('nome', '').strip()
+        profissional.especialidades = request.form.get('especialidades', '').strip()
+        profissional.disponibilidade = request.form.get('disponibilidade', '').strip()
+        profissional.contato = request.form.get('contato', '').strip()
+        try:
+            db.session.commit()
+            flash("Profissional atualizado!", "success")
+            return redirect(url_for('cadastros.listar_profissionais'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar profissional: {e}", "danger")
+    return render_template('profissionais/form.html', profissional=profissional)
+
+@bp.route('/profissionais/excluir/<int:id>')
+@login_required
+def excluir_profissional(id):
+    profissional = Profissional.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    try:
+        db.session.delete(profissional)
+        db.session.commit()
+        flash("Profissional excluído!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir profissional: {e}", "danger")
+    return redirect(url_for('cadastros.listar_profissionais'))
+
+
+# ---------------- SERVIÇOS ---------------- #
+def _ler_duracao(atual=30):
+    try:
+        duracao = int(request.form.get('duracao_minutos', atual))
+    except (TypeError, ValueError):
+        return atual
+    return duracao if duracao > 0 else atual
+
+
+@bp.route('/servicos')
+@login_required
+def listar_servicos():
+    servicos = Servico.query.filter_by(usuario_id=current_user.id).order_by(Servico.nome).all()
+    return render_template('servicos/listar.html', servicos=servicos)
+
+@bp.route('/servicos/novo', methods=['GET', 'POST'])
+@login_required
+def novo_servico():
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        preco = request.form.get('preco', '0').replace(',', '.')
+        descricao = request.form.get('descricao', '').strip()
+        if not nome or not preco:
+            flash("Nome e preço são obrigatórios.", "warning")
+            return render_template('servicos/form.html', servico=None)
+        s = Servico(
+            nome=nome, 
+            preco_padrao=ler_dinheiro(preco), 
+            descricao=descricao,
+            duracao_minutos=_ler_duracao(),
+            usuario_id=current_user.id
+        )
+        try:
+            db.session.add(s)
+            db.session.commit()
+            flash("Serviço cadastrado!", "success")
+            return redirect(url_for('cadastros.listar_servicos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao cadastrar serviço: {e}", "danger")
+    return render_template('servicos/form.html', servico=None)
+
+@bp.route('/servicos/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_servico(id):
+    servico = Servico.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    if request.method == 'POST':
+        servico.nome = request.form.get('nome', '').strip()
+        servico.preco_padrao = ler_dinheiro(request.form.get('preco', '0'))
+        servico.descricao = request.form.get('descricao', '').strip()
+        servico.duracao_minutos = _ler_duracao(servico.duracao_minutos)
+        try:
+            db.session.commit()
+            flash("Serviço atualizado!", "success")
+            return redirect(url_for('cadastros.listar_servicos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar serviço: {e}", "danger")
+    return render_template('servicos/form.html', servico=servico)
+
+@bp.route('/servicos/excluir/<int:id>')
+@login_required
+def excluir_servico(id):
+    servico = Servico.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    try:
+        db.session.delete(servico)
+        db.session.commit()
+        flash("Serviço excluído!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir serviço: {e}", "danger")
+    return redirect(url_for('cadastros.listar_servicos'))
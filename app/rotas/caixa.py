@@ -0,0 +1,362 @@
+# app/rotas/caixa.py
+# Caixa: abertura/fechamento, lançamentos, vendas de produtos e despesas.
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from datetime import datetime
+
+from app import db
+from app.models import MovimentoCaixa, Caixa
+from app.dinheiro import ler_dinheiro
+from app.estoque import vender_itens, EstoqueInsuficiente
+from app.paginacao import paginar, ler_filtros, condicoes_periodo, condicao_texto
+from app.totais import totais_caixa
+from app.carregamento import orcamento_lazy_loads
+from app.referencias import listas_referencia
+from app.idempotencia import idempotente
+
+bp = Blueprint('caixa', __name__)
+
+
+# ------- DESPESAS (MovimentoCaixa tipo='saida') -------
+@bp.route('/despesas')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_despesas():
+    filtros = ler_filtros()
+    condicoes = [MovimentoCaixa.tipo == 'saida'] + condicoes_periodo(MovimentoCaixa.data, filtros)
+    texto = condicao_texto(filtros, MovimentoCaixa.descricao)
+    if texto is not None:
+        condicoes.append(texto)
+    pagina = paginar(MovimentoCaixa.query.filter(*condicoes), MovimentoCaixa.data, MovimentoCaixa.id,
+                     cursor=request.args.get('cursor'))
+
+    # Soma total das despesas filtradas, no banco
+    total_despesas = totais_caixa(condicoes=condicoes)['saidas']
+
+    return render_template('despesas/listar.html', despesas=pagina.itens, pagina=pagina,
+                           filtros=filtros, total_despesas=total_despesas)
+
+
+@bp.route('/despesas/nova', methods=['GET','POST'])
+@login_required
+def nova_despesa():
+    if request.method == 'POST':
+        descricao = request.form.get('descricao','').strip()
+        try:
+            valor = ler_dinheiro(request.form.get('valor', '0'))
+        except Exception:
+            valor = 0
+        data = request.form.get('data')
+        try:
+            date_obj = datetime.strptime(data, "%Y-%m-%d %H:%M") if ' ' in data else datetime.strptime(data, "%Y-%m-%d")
+        except Exception:
+            date_obj = datetime.utcnow()
+        desp = MovimentoCaixa(tipo='saida', forma_pagamento=request.form.get('forma_pagamento',''), valor=valor, descricao=descricao, data=date_obj)
+        try:
+            db.session.add(desp)
+            db.session.commit()
+            flash("Despesa registrada!", "success")
+            return redirect(url_for('caixa.listar_despesas'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao registrar despesa: {e}", "danger")
+    return render_template('despesas/form.html', despesa=None)
+
+
+@bp.route('/despesas/editar/<int:id>', methods=['GET','POST'])
+@login_required
+def editar_despesa(id):
+    desp = MovimentoCaixa.query.get_or_404(id)
+    if desp.tipo != 'saida':
+        flash("Despesa não encontrada.", "warning")
+        return redirect(url_for('caixa.listar_despesas'))
+    if request.method == 'POST':
+        desp.descricao = request.form.get('descricao','').strip()
+        try:
+            desp.valor = ler_dinheiro(request.form.get('valor', '0'))
+        except Exception:
+            desp.valor = 0
+        desp.forma_pagamento = request.form.get('forma_pagamento','')
+        try:
+            data = request.form.get('data')
+            desp.data = datetime.strptime(data, "%Y-%m-%d %H:%M") if ' ' in data else datetime.strptime(data, "%Y-%m-%d")
+        except Exception:
+            pass
+        try:
+            db.session.commit()
+            flash("Despesa atualizada!", "success")
+            return redirect(url_for('caixa.listar_despesas'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar despesa: {e}", "danger")
+    return render_template('despesas/form.html', despesa=desp)
+
+
+@bp.route('/despesas/excluir/<int:id>')
+@login_required
+def excluir_despesa(id):
+    desp = MovimentoCaixa.query.get_or_404(id)
+    if desp.tipo != 'saida':
+        flash("Despesa inválida.", "warning")
+        return redirect(url_for('caixa.listar_despesas'))
+    try:
+        db.session.delete(desp)
+        db.session.commit()
+        flash("Despesa excluída!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir despesa: {e}", "danger")
+    return redirect(url_for('caixa.listar_despesas'))
+
+
+# ---------------- CAIXA ---------------- #
+@bp.route('/caixa')
+@login_required
+@orcamento_lazy_loads(0)
+def caixa():
+    # Admin vê todos, usuário comum só os seus movimentos
+    filtros = ler_filtros()
+    condicoes = condicoes_periodo(MovimentoCaixa.data, filtros)
+    if current_user.role != 'admin':
+        condicoes.append(MovimentoCaixa.usuario_id == current_user.id)
+    if filtros['tipo']:
+        condicoes.append(MovimentoCaixa.tipo == filtros['tipo'])
+    texto = condicao_texto(filtros, MovimentoCaixa.descricao)
+    if texto is not None:
+        condicoes.append(texto)
+    pagina = paginar(MovimentoCaixa.query.filter(*condicoes), MovimentoCaixa.data, MovimentoCaixa.id,
+                     cursor=request.args.get('cursor'))
+
+    # Saldo de todos os movimentos filtrados (não só da página), calculado no banco
+    saldo = totais_caixa(condicoes=condicoes)['saldo']
+
+    caixa_aberto = Caixa.query.filter_by(status='aberto').first()
+    return render_template('caixa/listar.html', movimentos=pagina.itens, pagina=pagina, filtros=filtros,
+                           saldo=saldo, caixa_aberto=caixa_aberto)
+
+
+@bp.route('/caixa/abrir', methods=['GET', 'POST'])
+@login_required
+def abrir_caixa():
+    if request.method == 'POST':
+        try:
+            saldo_inicial = ler_dinheiro(request.form.get('saldo_inicial', '0'))
+        except Exception:
+            saldo_inicial = 0
+
+        caixa_aberto = Caixa.query.filter_by(status='aberto').first()
+        if caixa_aberto:
+            flash('Já existe um caixa aberto. Feche antes de abrir outro.', 'warning')
+            return redirect(url_for('caixa.caixa'))
+
+        novo_caixa = Caixa(
+            saldo_inicial=saldo_inicial,
+            usuario_abertura=current_user.id,
+            status='aberto'
+        )
+        try:
+            db.session.add(novo_caixa)
+            db.session.commit()
+            flash('Caixa aberto com sucesso!', 'success')
+            return redirect(url_for('caixa.caixa'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao abrir caixa: {e}', 'danger')
+
+    return render_template('caixa/abrir.html')
+
+
+@bp.route('/caixa/fechar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def fechar_caixa(id):
+    caixa = Caixa.query.get_or_404(id)
+    if caixa.status == 'fechado':
+        flash('Este caixa já está fechado.', 'info')
+        return redirect(url_for('caixa.caixa'))
+
+    if request.method == 'POST':
+        try:
+            caixa.saldo_final = ler_dinheiro(request.form.get('saldo_final', '0'))
+        except Exception:
+            caixa.saldo_final = 0
+        caixa.data_fechamento = datetime.utcnow()
+        caixa.status = 'fechado'
+        caixa.usuario_fechamento = current_user.id
+        caixa.observacoes = request.form.get('observacoes', '')
+        try:
+            db.session.commit()
+            flash('Caixa fechado com sucesso!', 'success')
+            return redirect(url_for('caixa.caixa'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao fechar caixa: {e}', 'danger')
+
+    return render_template('caixa/fechar.html', caixa=caixa)
+
+
+@bp.route('/caixa/novo', methods=['GET', 'POST'])
+@login_required
+@idempotente
+def novo_movimento():
+    produtos = listas_referencia('produtos',
+                                 usuario_id=None if current_user.role == 'admin' else current_user.id)['produtos']
+    if request.method == 'POST':
+        tipo = request.form.get('tipo')
+        forma_pagamento = request.form.get('forma_pagamento', '')
+        descricao = request.form.get('descricao', '').strip()
+        try:
+            valor = ler_dinheiro(request.form.get('valor', '0'))
+        except Exception:
+            valor = 0
+        produto_id = request.form.get('produto_id')
+        try:
+            quantidade_vendida = int(request.form.get('quantidade', 0))
+        except Exception:
+            quantidade_vendida = 0
+
+        try:
+            if produto_id and int(produto_id) > 0 and quantidade_vendida > 0:
+                # venda: mesmo caminho do carrinho (estoque, VendaProduto e caixa numa transação)
+                _, baixos = vender_itens(
+                    db.session, [(int(produto_id), quantidade_vendida)], current_user.id,
+                    forma_pagamento=forma_pagamento,
+                    dono_id=None if current_user.role == 'admin' else current_user.id)
+                db.session.commit()
+                for nome in baixos:
+                    flash(f'Estoque baixo para o produto: {nome}', 'warning')
+                flash("Venda registrada com sucesso!", "success")
+                return redirect(url_for('caixa.caixa'))
+
+            movimento = MovimentoCaixa(
+                tipo=tipo,
+                forma_pagamento=forma_pagamento,
+                valor=valor,
+                descricao=descricao,
+                usuario_id=current_user.id  # <- essencial
+            )
+            db.session.add(movimento)
+            db.session.commit()
+            flash("Movimentação registrada com sucesso!", "success")
+            return redirect(url_for('caixa.caixa'))
+        except ValueError as e:
+            # estoque insuficiente, produto de outro usuário ou quantidade inválida
+            db.session.rollback()
+            flash(str(e), "danger")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao registrar movimentação: {e}", "danger")
+
+    return render_template('caixa/form.html', movimento=None, produtos=produtos)
+
+
+@bp.route('/caixa/vender', methods=['POST'])
+@login_required
+@idempotente
+def vender_produto():
+    try:
+        produto_id = int(request.form['produto_id'])
+        quantidade = int(request.form['quantidade'])
+    except Exception:
+        flash('Dados inválidos.', 'danger')
+        return redirect(url_for('caixa.caixa'))
+
+    try:
+        _, baixos = vender_itens(db.session, [(produto_id, quantidade)], current_user.id,
+                                 forma_pagamento=request.form.get('forma_pagamento', ''))
+        db.session.commit()
+        for nome in baixos:
+            flash(f'Estoque baixo para o produto: {nome}', 'warning')
+        flash('Venda realizada com sucesso!', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao processar venda: {e}', 'danger')
+
+    return redirect(url_for('caixa.caixa'))
+
+
+def _itens_do_carrinho():
+    # JSON {"itens": [{"produto_id": 1, "quantidade": 2}, ...], "forma_pagamento", "desconto"}
+    # ou o formulário, com produto_id e quantidade repetidos por linha
+    try:
+        if request.is_json:
+            dados = request.get_json(silent=True) or {}
+            itens = [(int(i['produto_id']), int(i['quantidade'])) for i in dados.get('itens') or []]
+            return itens, dados.get('forma_pagamento', ''), float(dados.get('desconto') or 0)
+        linhas = zip(request.form.getlist('produto_id'), request.form.getlist('quantidade'))
+        itens = [(int(p), int(q)) for p, q in linhas if p and q]
+        return itens, request.form.get('forma_pagamento', ''), float(request.form.get('desconto') or 0)
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Dados inválidos.')
+
+
+@bp.route('/caixa/venda', methods=['GET', 'POST'])
+@login_required
+@idempotente
+def finalizar_venda():
+    # Carrinho com vários produtos: uma venda, um lançamento no caixa, um commit
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    if request.method == 'POST':
+        try:
+            itens, forma_pagamento, desconto = _itens_do_carrinho()
+            movimento, baixos = vender_itens(db.session, itens, current_user.id, forma_pagamento=forma_pagamento,
+                                             desconto_percentual=desconto, dono_id=usuario_id)
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            if request.is_json:
+                return jsonify({'erro': str(e)}), 409 if isinstance(e, EstoqueInsuficiente) else 400
+            flash(str(e), 'danger')
+        except Exception as e:
+            db.session.rollback()
+            if request.is_json:
+                return jsonify({'erro': str(e)}), 500
+            flash(f'Erro ao processar venda: {e}', 'danger')
+        else:
+            if request.is_json:
+                return jsonify({'movimento_id': movimento.id, 'total': movimento.valor, 'estoque_baixo': baixos})
+            for nome in baixos:
+                flash(f'Estoque baixo para o produto: {nome}', 'warning')
+            flash('Venda realizada com sucesso!', 'success')
+            return redirect(url_for('caixa.caixa'))
+
+    produtos = listas_referencia('produtos', usuario_id=usuario_id)['produtos']
+    return render_template('caixa/venda_produto.html', produtos=produtos)
+
+
+@bp.route('/caixa/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_movimento(id):
+    movimento = MovimentoCaixa.query.get_or_404(id)
+    if request.method == 'POST':
+        movimento.tipo = request.form.get('tipo')
+        try:
+            movimento.valor = ler_dinheiro(request.form.get('valor', '0'))
+        except Exception:
+            movimento.valor = 0
+        movimento.descricao = request.form.get('descricao', '').strip()
+        try:
+            db.session.commit()
+            flash("Movimentação atualizada!", "success")
+            return redirect(url_for('caixa.caixa'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar movimentação: {e}", "danger")
+
+    return render_template('caixa/form.html', movimento=movimento)
+
+
+@bp.route('/caixa/excluir/<int:id>')
+@login_required
+def excluir_movimento(id):
+    movimento = MovimentoCaixa.query.get_or_404(id)
+    try:
+        db.session.delete(movimento)
+        db.session.commit()
+        flash("Movimentação excluída!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir movimentação: {e}", "danger")
+    return redirect(url_for('caixa.caixa'))
@@ -0,0 +1,145 @@
+# app/rotas/estoque.py
+# Produtos e controle de estoque.
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Produto, MovimentacaoEstoque
+from app.dinheiro import ler_dinheiro
+from app.estoque import movimentar_estoque, ENTRADA, SAIDA
+from app.paginacao import paginar, ler_filtros, condicoes_periodo, condicao_texto
+from app.carregamento import orcamento_lazy_loads
+
+bp = Blueprint('estoque', __name__)
+
+
+# ---------------- ESTOQUE ---------------- #
+@bp.route('/estoque')
+@login_required
+def estoque():
+    # lista só o que tem > 0 (disponível)
+    produtos_disponiveis = Produto.query.filter(Produto.quantidade > 0).order_by(Produto.nome).all()
+    return render_template('estoque/listar.html', produtos=produtos_disponiveis)
+
+
+# Rota corrigida para movimentações (não conflitar com /estoque)
+@bp.route('/estoque/movimentacoes')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_movimentacoes_estoque():
+    filtros = ler_filtros()
+    query = MovimentacaoEstoque.query.filter(*condicoes_periodo(MovimentacaoEstoque.data, filtros))\
+        .options(joinedload(MovimentacaoEstoque.produto))
+    if filtros['tipo']:
+        query = query.filter(MovimentacaoEstoque.tipo == filtros['tipo'])
+    texto = condicao_texto(filtros, MovimentacaoEstoque.observacao)
+    if texto is not None:
+        query = query.filter(texto)
+    pagina = paginar(query, MovimentacaoEstoque.data, MovimentacaoEstoque.id, cursor=request.args.get('cursor'))
+    return render_template('estoque/movimentacoes.html', movimentacoes=pagina.itens, pagina=pagina,
+                           filtros=filtros, active_page='estoque')
+
+
+@bp.route('/estoque/configurar/<int:produto_id>', methods=['GET','POST'])
+@login_required
+def configurar_estoque(produto_id):
+    produto = Produto.query.get_or_404(produto_id)
+    if request.method == 'POST':
+        tipo = request.form.get('tipo')  # 'entrada' ou 'saida'
+        quantidade = int(request.form.get('quantidade', 0))
+        observacao = request.form.get('observacao', '').strip()
+
+        if quantidade <= 0:
+            flash('Quantidade inválida.', 'warning')
+            return redirect(url_for('estoque.configurar_estoque', produto_id=produto_id))
+
+        # Baixa/entrada
+        try:
+            if not movimentar_estoque(db.session, produto, ENTRADA if tipo == ENTRADA else SAIDA,
+                                      quantidade, observacao):
+                db.session.rollback()
+                flash('Estoque insuficiente para retirada.', 'danger')
+                return redirect(url_for('estoque.configurar_estoque', produto_id=produto_id))
+            db.session.commit()
+            flash('Estoque atualizado!', 'success')
+            return redirect(url_for('estoque.estoque'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar estoque: {e}', 'danger')
+
+    # GET
+    return render_template('estoque/configurar.html', produto=produto)
+
+
+# ---------------- PRODUTOS ---------------- #
+@bp.route('/produtos')
+@login_required
+@orcamento_lazy_loads(0)
+def listar_produtos():
+    filtros = ler_filtros()
+    query = Produto.query.filter_by(usuario_id=current_user.id)
+    texto = condicao_texto(filtros, Produto.nome, Produto.descricao)
+    if texto is not None:
+        query = query.filter(texto)
+    pagina = paginar(query, Produto.nome, Produto.id, desc=False, cursor=request.args.get('cursor'))
+    return render_template('produtos/listar.html', produtos=pagina.itens, pagina=pagina, filtros=filtros)
+
+@bp.route('/produtos/novo', methods=['GET', 'POST'])
+@login_required
+def novo_produto():
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        preco = request.form.get('preco', '0').replace(',', '.')
+        descricao = request.form.get('descricao', '').strip()
+        quantidade = request.form.get('quantidade', 0)
+        if not nome or not preco:
+            flash("Nome e preço são obrigatórios.", "warning")
+            return render_template('produtos/form.html', produto=None)
+        p = Produto(
+            nome=nome,
+            preco=ler_dinheiro(preco),
+            descricao=descricao,
+            quantidade=int(quantidade),
+            usuario_id=current_user.id
+        )
+        try:
+            db.session.add(p)
+            db.session.commit()
+            flash("Produto cadastrado!", "success")
+            return redirect(url_for('estoque.listar_produtos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao cadastrar produto: {e}", "danger")
+    return render_template('produtos/form.html', produto=None)
+
+@bp.route('/produtos/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_produto(id):
+    produto = Produto.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    if request.method == 'POST':
+        produto.nome = request.form.get('nome', '').strip()
+        produto.preco = ler_dinheiro(request.form.get('preco', '0'))
+        produto.descricao = request.form.get('descricao', '').strip()
+        produto.quantidade = int(request.form.get('quantidade', 0))
+        try:
+            db.session.commit()
+            flash("Produto atualizado!", "success")
+            return redirect(url_for('estoque.listar_produtos'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao atualizar produto: {e}", "danger")
+    return render_template('produtos/form.html', produto=produto)
+
+@bp.route('/produtos/excluir/<int:id>')
+@login_required
+def excluir_produto(id):
+    produto = Produto.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    try:
+        db.session.delete(produto)
+        db.session.commit()
+        flash("Produto excluído!", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao excluir produto: {e}", "danger")
+    return redirect(url_for('estoque.listar_produtos'))
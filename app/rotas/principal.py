@@ -0,0 +1,58 @@
+# app/rotas/principal.py
+# Página inicial e dashboard.
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from datetime import datetime, date, timedelta
+
+from app.metricas import calcular_metricas
+
+bp = Blueprint('principal', __name__)
+
+
+# ---------------- ROTA RAIZ ---------------- #
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('principal.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+# ---------------- DASHBOARD ---------------- #
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    hoje = date.today()
+    periodo = request.args.get('periodo', 'mes')
+
+    # ---------------- Filtro de período ---------------- #
+    data_inicio = data_fim = hoje
+    if periodo == 'dia':
+        data_inicio = data_fim = hoje
+    elif periodo == 'semana':
+        data_inicio = hoje - timedelta(days=hoje.weekday())
+        data_fim = hoje
+    elif periodo == 'mes':
+        data_inicio = hoje.replace(day=1)
+        data_fim = hoje
+    elif periodo == 'ano':
+        data_inicio = date(hoje.year, 1, 1)
+        data_fim = hoje
+    elif periodo == 'personalizado':
+        try:
+            data_inicio = datetime.strptime(request.args.get('data_inicio'), "%Y-%m-%d").date()
+            data_fim = datetime.strptime(request.args.get('data_fim'), "%Y-%m-%d").date()
+        except Exception:
+            flash("Datas inválidas, exibindo o dia atual.", "warning")
+            data_inicio = data_fim = hoje
+
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    metricas = calcular_metricas(data_inicio, data_fim, hoje, usuario_id=usuario_id)
+
+    # ---------------- Renderização ---------------- #
+    return render_template(
+        'dashboard.html',
+        periodo=periodo,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        **metricas
+    )
@@ -0,0 +1,326 @@
+# app/rotas/relatorios.py
+# Relatórios em PDF (gerados em segundo plano) e exportação para planilha.
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, Response,
+    stream_with_context, current_app
+)
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from datetime import datetime, date, timedelta
+
+from app import db
+from app.models import Cliente, Agendamento, MovimentoCaixa, Servico, STATUS_CONCLUIDO
+from app.paginacao import paginar, ler_filtros
+from app.totais import totais_caixa
+from app.relatorios import (
+    chave_relatorio, resposta_relatorio, enfileirar, enfileirar_em_partes, obter_tarefa, estado,
+    PENDENTE, EXPIRADO
+)
+from app.exportacao import EXPORTACOES, FORMATOS, GERADORES, linhas_em_lotes
+
+bp = Blueprint('relatorios', __name__)
+
+
+# ---------------- RELATÓRIOS ---------------- #
+# O PDF é gerado em segundo plano (app/relatorios.py): se já estiver pronto volta
+# na hora; senão a rota enfileira a geração e redireciona para a página de espera.
+# montar_partes, se informado, devolve (htmls, total_partes) para relatórios grandes
+# ou None para gerar num PDF só com montar_html.
+# A página de espera leva a URL do relatório (origem): se a tarefa sumir (limpeza
+# da pasta), o pedido é refeito em vez de cair num 404.
+def _relatorio_pdf(tipo, inicio, fim, nome_arquivo, montar_html, montar_partes=None):
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    ident = chave_relatorio(tipo, inicio, fim, usuario_id)
+    resposta = resposta_relatorio(ident, nome_arquivo)
+    if resposta is not None:
+        return resposta
+    origem = request.full_path.rstrip('?')
+    partes = montar_partes() if montar_partes else None
+    if partes is not None:
+        enfileirar_em_partes(ident, usuario_id, nome_arquivo, *partes, origem=origem)
+    else:
+        enfileirar(ident, usuario_id, nome_arquivo, montar_html(), origem=origem)
+    resposta = resposta_relatorio(ident, nome_arquivo)  # já pronto quando RELATORIOS_SINCRONO
+    if resposta is not None:
+        return resposta
+    return redirect(url_for('relatorios.acompanhar_relatorio', ident=ident, origem=origem))
+
+
+def _origem(tarefa=None):
+    # URL que gera o relatório de novo; só caminhos dos próprios relatórios
+    origem = tarefa.origem if tarefa is not None and tarefa.origem else request.args.get('origem', '')
+    if origem.startswith('/relatorio/') and not origem.startswith('//'):
+        return origem
+    return None
+
+
+def _tarefa_ou_refazer(ident):
+    # (tarefa, None) ou (None, resposta): sem a tarefa, refaz o pedido ou 404
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    tarefa = obter_tarefa(ident, usuario_id)
+    if tarefa is not None:
+        return tarefa, None
+    origem = _origem()
+    if origem is None:
+        abort(404)
+    return None, redirect(origem)
+
+
+def _partes_faturamento_geral(inicio, fim, usuario_id, resumo, total_partes, linhas_por_parte):
+    # Resumo e depois uma página de movimentos por vez (paginação por chave).
+    # Roda na thread da tarefa: nada de current_user/request aqui.
+    yield render_template('relatorios/faturamento_geral_resumo_pdf.html', **resumo)
+    cursor = None
+    parte = 0
+    while True:
+        query = MovimentoCaixa.query.filter(MovimentoCaixa.data >= inicio, MovimentoCaixa.data < fim)
+        if usuario_id is not None:
+            query = query.filter(MovimentoCaixa.usuario_id == usuario_id)
+        pagina = paginar(query, MovimentoCaixa.data, MovimentoCaixa.id, desc=False,
+                         cursor=cursor, por_pagina=linhas_por_parte)
+        parte += 1
+        html = render_template(
+            'relatorios/faturamento_geral_parte_pdf.html',
+            relatorio=pagina.itens,
+            inicio=resumo['inicio'],
+            fim=resumo['fim'],
+            parte=parte,
+            total_partes=max(parte, total_partes)
+        )
+        db.session.expunge_all()  # solta os movimentos da parte já renderizada
+        yield html
+        if pagina.proximo is None:
+            break
+        cursor = pagina.proximo
+
+
+@bp.route('/relatorio/faturamento/geral/pdf')
+@login_required
+def relatorio_faturamento_geral_pdf():
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+
+    hoje = datetime.now()
+    if not data_inicio or not data_fim:
+        # dia inteiro, para a chave do cache não mudar a cada segundo
+        inicio = datetime.combine(hoje.date() - timedelta(days=30), datetime.min.time())
+        fim = datetime.combine(hoje.date() + timedelta(days=1), datetime.min.time())
+    else:
+        inicio = datetime.strptime(data_inicio, "%Y-%m-%d")
+        fim = datetime.strptime(data_fim, "%Y-%m-%d") + timedelta(days=1)
+
+    def montar_html():
+        query = MovimentoCaixa.query.filter(
+            MovimentoCaixa.data >= inicio,
+            MovimentoCaixa.data < fim
+        )
+        # Usuário comum só vê os próprios movimentos
+        if current_user.role != 'admin':
+            query = query.filter(MovimentoCaixa.usuario_id == current_user.id)
+
+        relatorio = query.order_by(MovimentoCaixa.data.asc()).all()
+
+        usuario_id = None if current_user.role == 'admin' else current_user.id
+        totais = totais_caixa(usuario_id=usuario_id, inicio=inicio, fim=fim)
+
+        return render_template(
+            'relatorios/faturamento_geral_pdf.html',
+            relatorio=relatorio,
+            inicio=inicio.date(),
+            fim=(fim - timedelta(days=1)).date(),
+            total_entradas=totais['entradas'],
+            total_saidas=totais['saidas'],
+            lucro=totais['saldo']
+        )
+
+    def montar_partes():
+        usuario_id = None if current_user.role == 'admin' else current_user.id
+        query = MovimentoCaixa.query.filter(MovimentoCaixa.data >= inicio, MovimentoCaixa.data < fim)
+        if usuario_id is not None:
+            query = query.filter(MovimentoCaixa.usuario_id == usuario_id)
+        quantidade = query.count()
+        linhas_por_parte = current_app.config['RELATORIOS_LINHAS_POR_PARTE']
+        if quantidade <= linhas_por_parte:
+            return None
+        totais = totais_caixa(usuario_id=usuario_id, inicio=inicio, fim=fim)
+        total_partes = -(-quantidade // linhas_por_parte)
+        resumo = {
+            'inicio': inicio.date(),
+            'fim': (fim - timedelta(days=1)).date(),
+            'quantidade': quantidade,
+            'total_partes': total_partes,
+            'total_entradas': totais['entradas'],
+            'total_saidas': totais['saidas'],
+            'lucro': totais['saldo'],
+        }
+        htmls = _partes_faturamento_geral(inicio, fim, usuario_id, resumo, total_partes, linhas_por_parte)
+        return htmls, total_partes + 1
+
+    return _relatorio_pdf('geral', inicio, fim, 'faturamento_geral.pdf', montar_html, montar_partes)
+
+
+@bp.route('/relatorios/tarefa/<ident>')
+@login_required
+def acompanhar_relatorio(ident):
+    tarefa, resposta = _tarefa_ou_refazer(ident)
+    if resposta is not None:
+        return resposta
+    return render_template('relatorios/aguardando.html', tarefa=tarefa, active_page='relatorios')
+
+
+@bp.route('/relatorios/tarefa/<ident>/estado')
+@login_required
+def estado_relatorio(ident):
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    tarefa = obter_tarefa(ident, usuario_id)
+    if tarefa is None:
+        # limpa da pasta: a página de espera refaz o pedido, se souber a origem
+        return jsonify({'estado': EXPIRADO, 'erro': None, 'partes': None, 'url': None,
+                        'refazer': _origem()})
+    return jsonify({
+        'estado': estado(tarefa),
+        'erro': tarefa.erro,
+        'partes': [tarefa.partes_prontas, tarefa.partes_total] if tarefa.partes_total else None,
+        'url': url_for('relatorios.baixar_relatorio', ident=ident),
+        'refazer': _origem(tarefa),
+    })
+
+
+@bp.route('/relatorios/tarefa/<ident>/pdf')
+@login_required
+def baixar_relatorio(ident):
+    tarefa, resposta = _tarefa_ou_refazer(ident)
+    if resposta is not None:
+        return resposta
+    resposta = resposta_relatorio(ident, tarefa.nome_arquivo)
+    if resposta is not None:
+        return resposta
+    if estado(tarefa) == PENDENTE:
+        return redirect(url_for('relatorios.acompanhar_relatorio', ident=ident))
+    if estado(tarefa) == EXPIRADO and _origem(tarefa):
+        return redirect(_origem(tarefa))
+    flash("O relatório não está mais disponível. Gere novamente.", "warning")
+    return redirect(url_for('relatorios.pagina_relatorios'))
+
+
+# ---------------- EXPORTAÇÃO (CSV / XLSX) ---------------- #
+@bp.route('/exportar/<tipo>.<formato>')
+@login_required
+def exportar(tipo, formato):
+    # extratos completos do período para a contabilidade, enviados em streaming
+    if tipo not in EXPORTACOES or formato not in FORMATOS:
+        abort(404)
+    usuario_id = None if current_user.role == 'admin' else current_user.id
+    cabecalho, consulta = EXPORTACOES[tipo](ler_filtros(), usuario_id)
+    conteudo = GERADORES[formato](cabecalho, linhas_em_lotes(consulta))
+    return Response(
+        stream_with_context(conteudo),
+        mimetype=FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename={tipo}.{formato}'}
+    )
+
+
+# ---------------- RELATÓRIO PDF ---------------- #
+@bp.route('/relatorios', methods=['GET'])
+@login_required
+def pagina_relatorios():
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    active_page = 'relatorios'
+
+    # Padrão: últimos 7 dias
+    hoje = date.today()
+    if not data_inicio or not data_fim:
+        data_inicio = (hoje - timedelta(days=7)).strftime('%Y-%m-%d')
+        data_fim = hoje.strftime('%Y-%m-%d')
+
+    return render_template(
+        'relatorios/index.html',
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        active_page=active_page
+    )
+
+
+# ---------------- RELATÓRIO POR CLIENTE ---------------- #
+@bp.route('/relatorio/faturamento/por-cliente/pdf')
+@login_required
+def relatorio_faturamento_por_cliente_pdf():
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    hoje = date.today()
+
+    if not data_inicio or not data_fim:
+        inicio = hoje - timedelta(days=30)
+        fim = hoje
+    else:
+        inicio = datetime.strptime(data_inicio, "%Y-%m-%d").date()
+        fim = datetime.strptime(data_fim, "%Y-%m-%d").date()
+
+    def montar_html():
+        query = db.session.query(
+            Cliente.nome,
+            func.sum(Agendamento.valor_pago).label('total'),
+            func.count(Agendamento.id).label('qtd')
+        ).join(Cliente, Cliente.id == Agendamento.cliente_id)\
+         .filter(Agendamento.status == STATUS_CONCLUIDO)\
+         .filter(Agendamento.data.between(inicio, fim))
+
+        # Usuário comum só vê os seus agendamentos
+        if current_user.role != 'admin':
+            query = query.filter(Agendamento.usuario_id == current_user.id)
+
+        agendamentos = query.group_by(Cliente.nome)\
+                            .order_by(func.sum(Agendamento.valor_pago).desc().nulls_last())\
+                            .all()
+
+        return render_template(
+            'relatorios/faturamento_por_cliente_pdf.html',
+            agendamentos=agendamentos,
+            inicio=inicio,
+            fim=fim
+        )
+
+    return _relatorio_pdf('por_cliente', inicio, fim, 'faturamento_por_cliente.pdf', montar_html)
+
+
+# ---------------- RELATÓRIO POR SERVIÇO ---------------- #
+@bp.route('/relatorio/faturamento/por-servico/pdf')
+@login_required
+def relatorio_faturamento_por_servico_pdf():
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    hoje = date.today()
+
+    if not data_inicio or not data_fim:
+        inicio = hoje - timedelta(days=30)
+        fim = hoje
+    else:
+        inicio = datetime.strptime(data_inicio, "%Y-%m-%d").date()
+        fim = datetime.strptime(data_fim, "%Y-%m-%d").date()
+
+    def montar_html():
+        query = db.session.query(
+            Servico.nome,
+            func.sum(Agendamento.valor_pago).label('total'),
+            func.count(Agendamento.id).label('qtd')
+        ).join(Servico, Servico.id == Agendamento.servico_id)\
+         .filter(Agendamento.status == STATUS_CONCLUIDO)\
+         .filter(Agendamento.data.between(inicio, fim))
+
+        # Usuário comum só vê os seus agendamentos
+        if current_user.role != 'admin':
+            query = query.filter(Agendamento.usuario_id == current_user.id)
+
+        fatur_por_servico = query.group_by(Servico.nome)\
+                                 .order_by(func.sum(Agendamento.valor_pago).desc().nulls_last())\
+                                 .all()
+
+        return render_template(
+            'relatorios/faturamento_por_servico_pdf.html',
+            fatur_por_servico=fatur_por_servico,
+            inicio=inicio,
+            fim=fim
+        )
+
+    return _relatorio_pdf('por_servico', inicio, fim, 'faturamento_por_servico.pdf', montar_html)
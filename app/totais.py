@@ -0,0 +1,27 @@
+# app/totais.py
+# Totais do caixa (entradas, saídas e saldo) calculados no banco com um único
+# SUM ... GROUP BY tipo, para as telas não precisarem carregar e somar os movimentos.
+from sqlalchemy import func
+
+from app import db
+from app.models import MovimentoCaixa
+
+
+def totais_caixa(usuario_id=None, inicio=None, fim=None, condicoes=()):
+    # usuario_id=None = visão de admin; inicio/fim são datetimes (fim exclusivo);
+    # condicoes = filtros extras da tela (tipo, busca, período do formulário)
+    q = db.session.query(
+        MovimentoCaixa.tipo,
+        func.sum(func.coalesce(MovimentoCaixa.valor, 0))
+    ).filter(*condicoes)
+    if usuario_id is not None:
+        q = q.filter(MovimentoCaixa.usuario_id == usuario_id)
+    if inicio is not None:
+        q = q.filter(MovimentoCaixa.data >= inicio)
+    if fim is not None:
+        q = q.filter(MovimentoCaixa.data < fim)
+    por_tipo = dict(q.group_by(MovimentoCaixa.tipo).all())
+
+    entradas = por_tipo.get('entrada') or 0
+    saidas = por_tipo.get('saida') or 0
+    return {'entradas': entradas, 'saidas': saidas, 'saldo': entradas - saidas}
@@ -0,0 +1,150 @@
+# app/transferencia.py
+# Cópia dos dados de um banco existente (o instance/site.db do SQLite) para o banco
+# configurado em DATABASE_URL, normalmente um PostgreSQL novo. As tabelas são
+# criadas pelo metadata e preenchidas em ordem de dependência, em lotes lidos com
+# cursor de servidor (stream_results) e gravados com executemany. Antes de copiar,
+# procura o que o PostgreSQL recusaria e o SQLite aceitava: chave estrangeira
+# apontando para registro inexistente e texto maior que o tamanho da coluna.
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Integer, String, create_engine, func, inspect, select, text
+
+from app import db
+from app.migracoes import colunas_em_reais
+from app.resumo import reconstruir_resumo
+
+LOTE_PADRAO = 5000
+
+
+def _url_origem(origem):
+    # aceita a URL completa ou o caminho do arquivo do SQLite
+    return origem if '://' in origem else f'sqlite:///{origem}'
+
+
+def _colunas_faltando(conn):
+    existentes = inspect(conn)
+    faltando = []
+    for tabela in db.metadata.sorted_tables:
+        if not existentes.has_table(tabela.name):
+            faltando.append(tabela.name)
+            continue
+        nomes = {c['name'] for c in existentes.get_columns(tabela.name)}
+        faltando += [f'{tabela.name}.{c.name}' for c in tabela.columns if c.name not in nomes]
+    return faltando
+
+
+def _orfaos(conn):
+    # [(tabela, coluna, tabela referida, quantidade)] de FKs sem registro correspondente
+    encontrados = []
+    for tabela in db.metadata.sorted_tables:
+        for fk in tabela.foreign_keys:
+            coluna, alvo = fk.parent, fk.column
+            q = (select(func.count()).select_from(tabela)
+                 .where(coluna.is_not(None), coluna.not_in(select(alvo))))
+            quantidade = conn.scalar(q)
+            if quantidade:
+                encontrados.append((tabela, coluna, alvo, quantidade))
+    return encontrados
+
+
+def _textos_longos(conn):
+    # [(tabela, coluna, quantidade)] de textos maiores que o String(n) da coluna
+    encontrados = []
+    for tabela in db.metadata.sorted_tables:
+        for coluna in tabela.columns:
+            if isinstance(coluna.type, String) and coluna.type.length:
+                q = select(func.count()).select_from(tabela).where(func.length(coluna) > coluna.type.length)
+                quantidade = conn.scalar(q)
+                if quantidade:
+                    encontrados.append((tabela, coluna, quantidade))
+    return encontrados
+
+
+def _anular_orfaos(linha, orfas):
+    # orfas: {coluna: set de ids existentes na tabela referida}
+    for coluna, existentes in orfas.items():
+        if linha[coluna] is not None and linha[coluna] not in existentes:
+            linha[coluna] = None
+    return linha
+
+
+def _copiar_tabela(origem, destino, tabela, lote, orfas):
+    total = 0
+    resultado = origem.execution_options(stream_results=True, yield_per=lote).execute(
+        select(tabela).order_by(*tabela.primary_key.columns))
+    for parte in resultado.mappings().partitions():
+        linhas = [_anular_orfaos(dict(l), orfas) for l in parte]
+        destino.execute(tabela.insert(), linhas)
+        total += len(linhas)
+    return total
+
+
+def _ajustar_sequencias(conn):
+    # ids copiados explicitamente: a sequência do PostgreSQL continua em 1
+    if conn.dialect.name != 'postgresql':
+        return
+    for tabela in db.metadata.sorted_tables:
+        pk = list(tabela.primary_key.columns)
+        if len(pk) != 1 or not pk[0].autoincrement or not isinstance(pk[0].type, Integer):
+            continue
+        sequencia = conn.scalar(text('SELECT pg_get_serial_sequence(:t, :c)'),
+                                {'t': tabela.name, 'c': pk[0].name})
+        if sequencia:
+            conn.execute(text('SELECT setval(:s, COALESCE((SELECT max({c}) FROM {t}), 0) + 1, false)'
+                              .format(c=pk[0].name, t=tabela.name)), {'s': sequencia})
+
+
+@click.command('copiar-banco')
+@click.option('--origem', required=True, help='URL ou caminho do banco de origem (ex.: instance/site.db).')
+@click.option('--lote', default=LOTE_PADRAO, show_default=True, help='Linhas por inserção.')
+@click.option('--anular-orfaos', is_flag=True, help='Grava NULL nas chaves estrangeiras sem registro correspondente.')
+@with_appcontext
+def copiar_banco_command(origem, lote, anular_orfaos):
+    """Copia todos os dados de outro banco para o DATABASE_URL atual (ex.: SQLite -> PostgreSQL)."""
+    engine_origem = create_engine(_url_origem(origem))
+    destino = db.engine
+    if engine_origem.url == destino.url:
+        raise click.ClickException('Origem e destino são o mesmo banco.')
+    try:
+        with engine_origem.connect() as conn_origem:
+            faltando = _colunas_faltando(conn_origem)
+            if faltando:
+                raise click.ClickException(
+                    f'Origem sem {", ".join(faltando)}; rode `flask atualizar-banco` nela antes de copiar.')
+            if colunas_em_reais(conn_origem):
+                # as colunas Dinheiro leriam os reais como centavos
+                raise click.ClickException(
+                    'Origem com valores ainda em reais; rode `flask atualizar-banco` nela antes de copiar.')
+            longos = _textos_longos(conn_origem)
+            for tabela, coluna, quantidade in longos:
+                click.echo(f'{tabela.name}.{coluna.name}: {quantidade} valores maiores que '
+                           f'{coluna.type.length} caracteres', err=True)
+            orfaos = _orfaos(conn_origem)
+            for tabela, coluna, alvo, quantidade in orfaos:
+                click.echo(f'{tabela.name}.{coluna.name}: {quantidade} sem {alvo.table.name} correspondente', err=True)
+            if longos or (orfaos and not anular_orfaos):
+                raise click.ClickException('Corrija os dados na origem'
+                                           + ('' if longos else ' ou use --anular-orfaos') + '.')
+
+            db.metadata.create_all(destino)
+            with destino.begin() as conn_destino:
+                for tabela in db.metadata.sorted_tables:
+                    if conn_destino.scalar(select(func.count()).select_from(tabela)):
+                        raise click.ClickException(f'Destino já tem dados em {tabela.name}; use um banco vazio.')
+
+                orfas_por_tabela = {}
+                for tabela, coluna, alvo, _ in orfaos:
+                    existentes = set(conn_origem.scalars(select(alvo)))
+                    orfas_por_tabela.setdefault(tabela.name, {})[coluna.name] = existentes
+
+                for tabela in db.metadata.sorted_tables:
+                    total = _copiar_tabela(conn_origem, conn_destino, tabela, lote,
+                                           orfas_por_tabela.get(tabela.name, {}))
+                    click.echo(f'{tabela.name}: {total} linhas')
+                _ajustar_sequencias(conn_destino)
+    finally:
+        engine_origem.dispose()
+    if orfaos:
+        # vendas sem produto saem dos totais: o resumo copiado não vale mais
+        click.echo(f'Resumo diário reconstruído: {reconstruir_resumo()} linhas.')
+    click.echo('Cópia concluída.')
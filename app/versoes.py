@@ -0,0 +1,41 @@
+# app/versoes.py
+# Versão dos dados por tabela: cada flush que insere, altera ou exclui registros
+# incrementa, na mesma transação, o contador das tabelas tocadas. Caches usam as
+# versões na chave para saber se algo mudou sem reler os lançamentos.
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import VersaoDados, ChaveIdempotencia
+
+# tabelas derivadas, mantidas pelos próprios listeners, e controle de envios repetidos
+IGNORADAS = {VersaoDados.__tablename__, 'resumo_diario', ChaveIdempotencia.__tablename__}
+
+
+def versoes(*tabelas):
+    # {tabela: versão}; tabela nunca alterada = 0
+    atuais = dict(db.session.execute(
+        select(VersaoDados.tabela, VersaoDados.versao).where(VersaoDados.tabela.in_(tabelas))
+    ).all())
+    return {tabela: atuais.get(tabela, 0) for tabela in tabelas}
+
+
+@event.listens_for(Session, 'after_flush')
+def _versoes_after_flush(session, flush_context):
+    tabelas = {obj.__table__.name for obj in list(session.new) + list(session.deleted)}
+    tabelas |= {obj.__table__.name for obj in session.dirty
+                if session.is_modified(obj, include_collections=False)}
+    tabelas -= IGNORADAS
+    if tabelas:
+        incrementar_versoes(session.connection(), tabelas)
+
+
+def incrementar_versoes(conn, tabelas):
+    # também para alterações feitas com UPDATE direto, que não passam pelo flush
+    tabela_versao = VersaoDados.__table__
+    for tabela in sorted(tabelas):
+        resultado = conn.execute(tabela_versao.update()
+                                 .where(tabela_versao.c.tabela == tabela)
+                                 .values(versao=tabela_versao.c.versao + 1))
+        if resultado.rowcount == 0:
+            conn.execute(tabela_versao.insert().values(tabela=tabela, versao=1))
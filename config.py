@@ -1,4 +1,109 @@
+# config.py
+# Configuração da aplicação, lida de variáveis de ambiente (ou de um .env, que o
+# `flask` carrega com python-dotenv). create_app(config) aceita uma subclasse para
+# testes ou instâncias com ajustes próprios.
+import os
+
+
+def _inteiro(nome, padrao):
+    return int(os.environ.get(nome, padrao))
+
+
+def _booleano(nome, padrao=False):
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+def _url_banco():
+    url = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
+    # provedores ainda entregam postgres://, que o SQLAlchemy não aceita
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _opcoes_pool():
+    # só repassa ao SQLAlchemy o que foi definido: o pool padrão do SQLite não aceita pool_size
+    opcoes = {}
+    for variavel, opcao in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'),
+                            ('DB_POOL_TIMEOUT', 'pool_timeout'), ('DB_POOL_RECYCLE', 'pool_recycle')):
+        if os.environ.get(variavel):
+            opcoes[opcao] = _inteiro(variavel, 0)
+    if _booleano('DB_POOL_PRE_PING'):
+        opcoes['pool_pre_ping'] = True
+    return opcoes
+
+
+def _pragmas_sqlite():
+    # aplicados a cada conexão (app/banco.py); SQLITE_PERFIL=0 volta ao padrão do SQLite
+    if not _booleano('SQLITE_PERFIL', True):
+        return {}
+    return {
+        'busy_timeout': _inteiro('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': -_inteiro('SQLITE_CACHE_KB', 20000),      # negativo = KiB
+        'mmap_size': _inteiro('SQLITE_MMAP_MB', 128) * 1024 * 1024,
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+        'analysis_limit': 1000,     # limita o ANALYZE feito pelo PRAGMA optimize
+    }
+
+
 class Config:
-    SECRET_KEY = 'sua_chave_secreta_aqui'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///sistema.db'
+    # secret key should come from environment in production
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'mude_esta_chave_em_producao')
+    SQLALCHEMY_DATABASE_URI = _url_banco()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _opcoes_pool()
+    SQLITE_PRAGMAS = _pragmas_sqlite()
+    SQLITE_OTIMIZAR_INTERVALO = _inteiro('SQLITE_OTIMIZAR_INTERVALO', 3600)  # segundos; 0 desliga
+
+    # cache das listas de seleção (app/referencias.py); TTL 0 desliga
+    CACHE_REFERENCIA_MAX = _inteiro('CACHE_REFERENCIA_MAX', 256)
+    CACHE_REFERENCIA_TTL = _inteiro('CACHE_REFERENCIA_TTL', 300)
+
+    # relatórios em PDF (app/relatorios.py)
+    RELATORIOS_PROCESSOS = _inteiro('RELATORIOS_PROCESSOS', 2)
+    RELATORIOS_CACHE_MB = _inteiro('RELATORIOS_CACHE_MB', 64)
+    RELATORIOS_LINHAS_POR_PARTE = _inteiro('RELATORIOS_LINHAS_POR_PARTE', 2000)
+    RELATORIOS_SINCRONO = _booleano('RELATORIOS_SINCRONO')
+    # estado das tarefas e PDFs prontos, lidos por todos os workers; padrão instance/relatorios
+    RELATORIOS_PASTA = os.environ.get('RELATORIOS_PASTA', '')
+    RELATORIOS_DISCO_MB = _inteiro('RELATORIOS_DISCO_MB', 512)    # tamanho máximo da pasta
+
+    # agenda (app/agenda.py): expediente de quem não preencheu a disponibilidade
+    # e intervalo entre os horários oferecidos, em minutos
+    AGENDA_EXPEDIENTE_PADRAO = os.environ.get('AGENDA_EXPEDIENTE_PADRAO', 'seg-sab 09:00-18:00')
+    AGENDA_PASSO_MINUTOS = _inteiro('AGENDA_PASSO_MINUTOS', 15)
+
+    # lembretes de agendamento (app/lembretes.py): enviador ('arquivo' ou 'modulo:Classe'),
+    # envios por minuto (0 = sem limite), tentativas e espera antes da segunda, em segundos.
+    # Campos da mensagem: {cliente}, {data}, {hora}, {servico} e {profissional}
+    LEMBRETES_ENVIADOR = os.environ.get('LEMBRETES_ENVIADOR', 'arquivo')
+    LEMBRETES_ARQUIVO = os.environ.get('LEMBRETES_ARQUIVO', '')     # padrão instance/lembretes.jsonl
+    LEMBRETES_POR_MINUTO = _inteiro('LEMBRETES_POR_MINUTO', 20)
+    LEMBRETES_TENTATIVAS = _inteiro('LEMBRETES_TENTATIVAS', 3)
+    LEMBRETES_ESPERA = _inteiro('LEMBRETES_ESPERA', 60)
+    LEMBRETES_SINCRONO = _booleano('LEMBRETES_SINCRONO')
+    LEMBRETES_MENSAGEM = os.environ.get(
+        'LEMBRETES_MENSAGEM', 'Olá, {cliente}! Lembrete: você tem um agendamento no nosso salão em {data} às {hora}.')
+
+    # chaves de envios repetidos (app/idempotencia.py), em segundos
+    IDEMPOTENCIA_TTL = _inteiro('IDEMPOTENCIA_TTL', 24 * 3600)
+
+    LAZY_LOADS_ESTRITO = _booleano('LAZY_LOADS_ESTRITO')
+    IMPORTACAO_LIMITE_MS = _inteiro('IMPORTACAO_LIMITE_MS', 1000)
+
+
+class TesteConfig(Config):
+    # banco em memória e tudo na própria requisição: várias instâncias em paralelo
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    RELATORIOS_SINCRONO = True
+    RELATORIOS_PASTA = None     # pasta temporária por aplicação
+    LEMBRETES_SINCRONO = True
+    LEMBRETES_POR_MINUTO = 0
+    LAZY_LOADS_ESTRITO = True
@@ -1,5 +1,6 @@
-from app import app
+from app import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5000)
-    
\ No newline at end of file